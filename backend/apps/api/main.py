@@ -1,12 +1,50 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import secrets
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from apps.core.config import settings
-from apps.api.routers import auth, me, tenants, customers, vehicles, invoices, inventory, subscriptions, reports, features, dashboard, leads, saas_admin
+from apps.api.routers import auth, me, tenants, customers, vehicles, invoices, inventory, subscriptions, reports, features, dashboard, leads, saas_admin, tax_reports
 
+from apps.core import cache
+from apps.core.access import access_table
+from apps.core.db import engine, pool_stats, prewarm_pool, read_engine, replica
+from apps.core.metrics import MetricsMiddleware, instrument_engine, registry as metrics
 from apps.core.middleware import TenantMiddleware
+from apps.core import querybudget
+from apps.core.security import login_gate, token_cache
+from apps.services.dealers.service import tenant_lookup
+from apps.core.logging import logger
+from workers.pdf_worker import pdf_renderer
+from fastapi.responses import PlainTextResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if (warning := cache.startup_warning()) is not None:
+        logger.warning(warning)
+    # Open the pool's connections before the worker accepts traffic
+    if settings.DB_POOL_PREWARM > 0:
+        opened = await prewarm_pool(settings.DB_POOL_PREWARM)
+        logger.info("DB pool prewarmed: %d connections", opened)
+        if read_engine is not None:
+            opened = await prewarm_pool(settings.DB_POOL_PREWARM, read_engine)
+            logger.info("DB read pool prewarmed: %d connections", opened)
+    if read_engine is not None:
+        # Measure lag once so the first reads can already use the replica
+        await replica.refresh()
+    await access_table.start()
+    try:
+        yield
+    finally:
+        await access_table.stop()
+        pdf_renderer.shutdown()
+        await engine.dispose()
+        if read_engine is not None:
+            await read_engine.dispose()
+
 
 app = FastAPI(title="AutoServe360 API", version="0.1.0",
-              openapi_url=f"{settings.API_PREFIX}/openapi.json")
+              openapi_url=f"{settings.API_PREFIX}/openapi.json", lifespan=lifespan)
 
 from fastapi.staticfiles import StaticFiles
 import os
@@ -21,8 +59,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+if settings.QUERY_BUDGET_MODE != "off":
+    app.add_middleware(querybudget.QueryBudgetMiddleware, mode=settings.QUERY_BUDGET_MODE)
+    querybudget.instrument_engine(engine)
+    if read_engine is not None:
+        querybudget.instrument_engine(read_engine)
+
+if settings.METRICS_ENABLED:
+    # Outermost, so latency covers CORS and tenant handling too
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    if read_engine is not None:
+        instrument_engine(read_engine)
+    metrics.register_gauges("auth_token_cache", "Verified-token cache", token_cache.stats)
+    metrics.register_gauges("login_gate", "Login backpressure", login_gate.stats)
+    metrics.register_gauges("tenant_lookup", "Login tenant code/UUID cache", tenant_lookup.stats)
+    metrics.register_gauges("access_table", "Tenant suspension / token revocation table", access_table.stats)
+    metrics.register_gauges("db_pool", "SQLAlchemy connection pool", pool_stats)
+    metrics.register_gauges("db_replica", "Read replica routing", replica.stats)
+    if read_engine is not None:
+        metrics.register_gauges("db_read_pool", "SQLAlchemy read replica connection pool",
+                                lambda: pool_stats(read_engine))
+
 app.include_router(auth.router, prefix=settings.API_PREFIX)
 app.include_router(me.router, prefix=settings.API_PREFIX)
 app.include_router(saas_admin.router, prefix=settings.API_PREFIX)  # New SaaS Admin API
@@ -36,8 +97,22 @@ app.include_router(vehicles.router, prefix=settings.API_PREFIX)
 app.include_router(invoices.router, prefix=settings.API_PREFIX)
 app.include_router(inventory.router, prefix=settings.API_PREFIX)
 app.include_router(dashboard.router, prefix=settings.API_PREFIX)
+app.include_router(tax_reports.router, prefix=settings.API_PREFIX)
 
 
 @app.get("/")
 async def root():
     return {"ok": True, "app": "AutoServe360 API"}
+
+
+if settings.METRICS_ENABLED:
+    if not settings.METRICS_TOKEN:
+        logger.warning("METRICS_ENABLED without METRICS_TOKEN: GET /metrics is unauthenticated")
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics(authorization: str = Header(default="")):
+        if settings.METRICS_TOKEN and not secrets.compare_digest(
+            authorization.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()
+        ):
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from apps.core.access import access_table
 from apps.core.db import get_session
-from apps.core.security import create_access_token, verify_password
+from apps.core.security import UserClaims, create_access_token, get_current_user, login_gate, verify_password_async
 from apps.services.auth.models import User
 from apps.services.dealers.models import Tenant
+from apps.services.dealers.service import tenant_lookup
+from typing import Optional
 import uuid
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -23,6 +26,11 @@ class LoginIn(BaseModel):
 
 @router.post("/login", response_model=TokenOut)
 async def login(payload: LoginIn, session: AsyncSession = Depends(get_session)):
+    # Shed excess logins before touching the database or bcrypt
+    with login_gate.slot():
+        return await _login(payload, session)
+
+async def _login(payload: LoginIn, session: AsyncSession) -> dict:
     # Resolve identifier (email or tenant_code)
     identifier = payload.identifier
     if not identifier:
@@ -33,38 +41,10 @@ async def login(payload: LoginIn, session: AsyncSession = Depends(get_session)):
     if not identifier:
         raise HTTPException(status_code=400, detail="Missing identifier (email or tenant_code)")
 
-    user = None
-    tenant = None
-
-    # Strategy 1: treat identifier as email
-    if "@" in identifier:
-        stmt = select(User).where(User.email == identifier.lower())
-        result = await session.execute(stmt)
-        user = result.scalars().first()
-        if user:
-            stmt_tenant = select(Tenant).where(Tenant.id == user.tenant_id)
-            tenant_res = await session.execute(stmt_tenant)
-            tenant = tenant_res.scalar_one_or_none()
-
-    # Strategy 2: treat identifier as tenant code
-    if not user:
-        stmt = select(Tenant).where(Tenant.code == identifier)
-        result = await session.execute(stmt)
-        tenant = result.scalar_one_or_none()
-        if not tenant:
-            try:
-                stmt = select(Tenant).where(Tenant.id == uuid.UUID(identifier))
-                result = await session.execute(stmt)
-                tenant = result.scalar_one_or_none()
-            except Exception:
-                pass
-        if tenant:
-            stmt_user = select(User).where(User.tenant_id == tenant.id, User.role == "dealer_admin")
-            user_res = await session.execute(stmt_user)
-            user = user_res.scalars().first()
+    user, tenant = await _resolve_login(session, identifier)
 
     # Verify credentials
-    if not user or not tenant or not verify_password(payload.password, user.hashed_password):
+    if not user or not tenant or not await verify_password_async(payload.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     # Generate JWT token
@@ -76,3 +56,48 @@ async def login(payload: LoginIn, session: AsyncSession = Depends(get_session)):
     )
 
     return {"access_token": token, "token_type": "bearer"}
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(current: UserClaims = Depends(get_current_user), session: AsyncSession = Depends(get_session)):
+    # Revokes every token issued to this user so far, on every device
+    await access_table.revoke(session, uuid.UUID(current.sub), "user")
+    await session.commit()
+    await access_table.changed()
+
+async def _resolve_login(session: AsyncSession, identifier: str) -> tuple[Optional[User], Optional[Tenant]]:
+    """
+    (user, tenant) for an email, tenant code or tenant UUID, in one joined query.
+
+    Codes/UUIDs resolve to the tenant's dealer admin; the identifier -> tenant id
+    mapping is cached (see dealers.service.tenant_lookup).
+    """
+    query = select(User, Tenant).join(Tenant, Tenant.id == User.tenant_id)
+
+    # Strategy 1: treat identifier as email
+    if "@" in identifier:
+        row = (await session.execute(query.where(User.email == identifier.lower()))).first()
+        if row:
+            return row.User, row.Tenant
+
+    # Strategy 2: treat identifier as tenant code or tenant id
+    admins = query.where(User.role == "dealer_admin").order_by(User.created_at).limit(1)
+    tenant_id = tenant_lookup.get(identifier)
+    if tenant_id is not None:
+        row = (await session.execute(admins.where(Tenant.id == tenant_id))).first()
+        if row:
+            return row.User, row.Tenant
+        tenant_lookup.discard(identifier)
+
+    match = Tenant.code == identifier
+    try:
+        match = or_(match, Tenant.id == uuid.UUID(identifier))
+    except ValueError:
+        pass
+    # Prefer a code match over a UUID match, as the sequential lookups did
+    row = (await session.execute(
+        admins.where(match).order_by(None).order_by((Tenant.code == identifier).desc(), User.created_at)
+    )).first()
+    if not row:
+        return None, None
+    tenant_lookup.put(identifier, row.Tenant.id)
+    return row.User, row.Tenant
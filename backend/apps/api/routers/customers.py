@@ -1,15 +1,18 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from apps.core.db import get_session
+from apps.core.cache import dashboard_cache
+from apps.core.db import get_read_session, get_session
+from apps.core.idempotency import IdempotentRoute
 from apps.services.crm.models import Customer
 from apps.core.security import get_current_user
 import uuid
 import datetime as dt
 
-router = APIRouter(prefix="/customers", tags=["customers"])
+router = APIRouter(prefix="/customers", tags=["customers"], route_class=IdempotentRoute)
 
 class CustomerIn(BaseModel):
     tenant_id: str
@@ -28,7 +31,7 @@ class CustomerOut(CustomerIn):
     updated_at: dt.datetime
 
 @router.get("", response_model=list[CustomerOut])
-async def list_customers(session: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
+async def list_customers(session: AsyncSession = Depends(get_read_session), user=Depends(get_current_user)):
     res = await session.execute(select(Customer).where(Customer.tenant_id==user.tenant_id).order_by(Customer.created_at.desc()))
     customers = res.scalars().all()
     
@@ -60,7 +63,12 @@ async def create_customer(payload: CustomerIn, session: AsyncSession = Depends(g
     
     c = Customer(id=str(uuid.uuid4()), **customer_data)
     session.add(c)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(409, "A customer with this name and phone already exists")
+    await dashboard_cache.invalidate(user.tenant_id)
     return {"ok": True, "id": c.id}
 
 @router.get("/{customer_id}", response_model=CustomerOut)
@@ -102,7 +110,12 @@ async def update_customer(customer_id: str, payload: CustomerIn, session: AsyncS
             setattr(customer, key, value)
     
     customer.updated_at = dt.datetime.utcnow()
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(409, "A customer with this name and phone already exists")
+    await dashboard_cache.invalidate(user.tenant_id)
     
     return {"ok": True}
 
@@ -116,5 +129,6 @@ async def delete_customer(customer_id: str, session: AsyncSession = Depends(get_
     
     await session.delete(customer)
     await session.commit()
+    await dashboard_cache.invalidate(user.tenant_id)
     
     return None
@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, and_, cast, literal, literal_column, Date
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from apps.core.cache import dashboard_cache
 from apps.core.db import get_session
+from apps.core.querybudget import query_budget
 from apps.core.security import get_current_user
-from apps.services.billing.models import Invoice
+from apps.services.billing.models import Invoice, DailySalesRollup
+from apps.services.billing.service import PENDING_STATUSES
 from apps.services.crm.models import Customer
-from apps.services.inventory.models import InventoryItem
+from apps.services.inventory.models import InventoryItem, LOW_STOCK_LIMIT
 from pydantic import BaseModel
 import datetime as dt
+import uuid
 from typing import List
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
@@ -21,65 +26,121 @@ class DashboardStats(BaseModel):
     top_products: List[dict]
     low_stock_items: List[dict]
 
+
+def _stats_query(
+    tenant_id: uuid.UUID,
+    today_start: dt.datetime,
+    week_start: dt.datetime,
+    thirty_days_ago: dt.datetime,
+):
+    """
+    Build the single aggregate statement behind the dashboard headline numbers.
+
+    Sales figures are read from the tenant's daily sales rollup rather than
+    summed over invoices: FILTER clauses give today's sales and pending payments
+    in one pass, while new leads and the 7-day series ride along as uncorrelated
+    scalar subqueries, the latter left-joined onto a generate_series day spine so
+    days without sales still come back as 0.
+    """
+    today = today_start.date()
+    spine = (
+        func.generate_series(week_start, today_start, literal_column("interval '1 day'"))
+        .table_valued("day")
+        .render_derived(name="spine")
+    )
+    spine_day = cast(spine.c.day, Date)
+    daily = (
+        select(
+            spine_day.label("day"),
+            func.coalesce(func.sum(DailySalesRollup.total_amount), 0).label("amount"),
+        )
+        .select_from(
+            spine.outerjoin(
+                DailySalesRollup,
+                and_(
+                    DailySalesRollup.tenant_id == tenant_id,
+                    DailySalesRollup.status == 'paid',
+                    DailySalesRollup.day == spine_day,
+                ),
+            )
+        )
+        .group_by(spine_day)
+        .subquery("daily")
+    )
+
+    new_leads = (
+        select(func.count(Customer.id))
+        .where(
+            Customer.tenant_id == tenant_id,
+            Customer.created_at >= thirty_days_ago
+        )
+        .scalar_subquery()
+    )
+    daily_sales = (
+        select(func.array_agg(aggregate_order_by(daily.c.amount, daily.c.day)))
+        .scalar_subquery()
+    )
+
+    return select(
+        func.coalesce(
+            func.sum(DailySalesRollup.total_amount).filter(
+                DailySalesRollup.status == 'paid',
+                DailySalesRollup.day == today
+            ),
+            0,
+        ).label("today_sales"),
+        func.coalesce(
+            func.sum(DailySalesRollup.total_amount).filter(
+                DailySalesRollup.status.in_(PENDING_STATUSES)
+            ),
+            0,
+        ).label("pending_payments"),
+        new_leads.label("new_leads"),
+        daily_sales.label("daily_sales"),
+    ).where(DailySalesRollup.tenant_id == tenant_id)
+
+
 @router.get("/stats", response_model=DashboardStats)
+@query_budget(3)
 async def get_dashboard_stats(
+    # The primary, not the replica: a result is cached under the generation read
+    # below, so it must not predate writes that bumped it (a lagging replica's
+    # would be served for the whole cache TTL). Hits never reach the database.
     session: AsyncSession = Depends(get_session),
     user=Depends(get_current_user)
 ):
     """Get dashboard statistics for the current tenant"""
-    
-    # Today's sales (sum of paid invoices from today)
-    today_start = dt.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_sales_query = select(func.sum(Invoice.total_amount)).where(
-        Invoice.tenant_id == user.tenant_id,
-        Invoice.status == 'paid',
-        Invoice.issued_at >= today_start
-    )
-    today_sales_result = await session.execute(today_sales_query)
-    today_sales = float(today_sales_result.scalar() or 0)
-    
-    # New leads (customers created in last 30 days)
-    thirty_days_ago = dt.datetime.utcnow() - dt.timedelta(days=30)
-    new_leads_query = select(func.count(Customer.id)).where(
-        Customer.tenant_id == user.tenant_id,
-        Customer.created_at >= thirty_days_ago
-    )
-    new_leads_result = await session.execute(new_leads_query)
-    new_leads = int(new_leads_result.scalar() or 0)
-    
-    # Pending payments (sum of unpaid/partial invoices)
-    pending_query = select(func.sum(Invoice.total_amount)).where(
-        Invoice.tenant_id == user.tenant_id,
-        Invoice.status.in_(['draft', 'partial'])
+    tenant_id = uuid.UUID(user.tenant_id)
+    now = dt.datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - dt.timedelta(days=6)
+    thirty_days_ago = now - dt.timedelta(days=30)
+
+    # Served from the per-tenant cache unless a write has invalidated it
+    cached, cache_version = await dashboard_cache.get(tenant_id)
+    if cached and cached.get('day') == today_start.date().isoformat():
+        return DashboardStats(**cached['stats'])
+
+    # Headline numbers and the 7-day sales series in a single round trip
+    stats_result = await session.execute(
+        _stats_query(tenant_id, today_start, week_start, thirty_days_ago)
     )
-    pending_result = await session.execute(pending_query)
-    pending_payments = float(pending_result.scalar() or 0)
-    
-    # Sales overview (last 7 days)
-    sales_overview = []
-    for i in range(6, -1, -1):
-        day_start = (dt.datetime.utcnow() - dt.timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + dt.timedelta(days=1)
-        
-        day_sales_query = select(func.sum(Invoice.total_amount)).where(
-            Invoice.tenant_id == user.tenant_id,
-            Invoice.status == 'paid',
-            Invoice.issued_at >= day_start,
-            Invoice.issued_at < day_end
-        )
-        day_sales_result = await session.execute(day_sales_query)
-        day_sales = float(day_sales_result.scalar() or 0)
-        
-        sales_overview.append({
-            'date': day_start.strftime('%a'),  # Mon, Tue, etc.
-            'amount': day_sales
-        })
-    
+    stats = stats_result.one()
+
+    daily_sales = stats.daily_sales or []
+    sales_overview = [
+        {
+            'date': (week_start + dt.timedelta(days=i)).strftime('%a'),  # Mon, Tue, etc.
+            'amount': float(amount or 0)
+        }
+        for i, amount in enumerate(daily_sales)
+    ]
+
     # Recent activity (last 10 invoices)
     recent_invoices_query = (
         select(Invoice, Customer)
         .outerjoin(Customer, Invoice.customer_id == Customer.id)
-        .where(Invoice.tenant_id == user.tenant_id)
+        .where(Invoice.tenant_id == tenant_id)
         .order_by(Invoice.issued_at.desc())
         .limit(10)
     )
@@ -101,29 +162,36 @@ async def get_dashboard_stats(
     
     # Low stock items (inventory below 10 units)
     low_stock_query = (
-        select(InventoryItem)
+        select(InventoryItem.name, InventoryItem.stock_quantity, InventoryItem.sku)
         .where(
-            InventoryItem.tenant_id == user.tenant_id,
-            InventoryItem.stock_quantity < 10
+            InventoryItem.tenant_id == tenant_id,
+            # Inlined so the partial index ix_inventory_items_tenant_low_stock applies
+            InventoryItem.stock_quantity < literal(LOW_STOCK_LIMIT, literal_execute=True)
         )
         .limit(5)
     )
     low_stock_result = await session.execute(low_stock_query)
-    low_stock_items = []
+    low_stock_items = [
+        {
+            'name': name,
+            'stock': stock,
+            'sku': sku or 'N/A'
+        }
+        for name, stock, sku in low_stock_result.all()
+    ]
     
-    for item in low_stock_result.scalars().all():
-        low_stock_items.append({
-            'name': item.name,
-            'stock': item.stock_quantity,
-            'sku': item.sku or 'N/A'
-        })
-    
-    return DashboardStats(
-        today_sales=today_sales,
-        new_leads=new_leads,
-        pending_payments=pending_payments,
+    result = DashboardStats(
+        today_sales=float(stats.today_sales),
+        new_leads=int(stats.new_leads or 0),
+        pending_payments=float(stats.pending_payments),
         sales_overview=sales_overview,
         recent_activity=recent_activity,
         top_products=top_products,
         low_stock_items=low_stock_items
     )
+    await dashboard_cache.set(
+        tenant_id,
+        cache_version,
+        {'day': today_start.date().isoformat(), 'stats': result.model_dump()}
+    )
+    return result
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
-from apps.core.db import get_session
+from apps.core.cache import dashboard_cache
+from apps.core.db import get_read_session, get_session
 from apps.core.security import get_current_user
 from apps.services.inventory.models import InventoryItem
 from pydantic import BaseModel
@@ -33,7 +34,7 @@ class InventoryItemResponse(InventoryItemBase):
 
 @router.get("", response_model=list[InventoryItemResponse])
 async def list_inventory(
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(get_current_user)
 ):
     """List inventory items for the current tenant"""
@@ -79,6 +80,7 @@ async def create_inventory_item(
         )
         session.add(new_item)
         await session.commit()
+        await dashboard_cache.invalidate(user.tenant_id)
         await session.refresh(new_item)
         
         return InventoryItemResponse(
@@ -119,6 +121,7 @@ async def update_inventory_item(
         item.image_url = item_update.image_url
         
         await session.commit()
+        await dashboard_cache.invalidate(user.tenant_id)
         await session.refresh(item)
         
         return InventoryItemResponse(
@@ -155,6 +158,7 @@ async def delete_inventory_item(
             
         await session.delete(item)
         await session.commit()
+        await dashboard_cache.invalidate(user.tenant_id)
         
         return {"ok": True}
     except HTTPException:
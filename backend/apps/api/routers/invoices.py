@@ -1,34 +1,54 @@
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from apps.core.db import get_session
+from sqlalchemy import JSON, func, literal_column, select, or_, tuple_
+from apps.core.cache import dashboard_cache
+from apps.core.config import settings
+from apps.core.db import async_session, get_session
+from apps.core.idempotency import IdempotentRoute
+from apps.core.querybudget import query_budget
 from apps.services.billing.models import Invoice, InvoiceItem
+from apps.services.billing.ingest import ingest_invoices
+from apps.services.billing.numbering import invoice_numbers
+from apps.services.billing.pricing import price_basket
+from apps.services.billing.service import apply_invoice_to_rollup
 from apps.services.crm.models import Customer, Vehicle
+from apps.services.crm.service import normalize_vin, upsert_customers, upsert_vehicles
+from apps.services.dealers.models import Tenant
+from apps.services.inventory.service import decrement_stock, InsufficientStock
 from apps.core.security import get_current_user
+from workers.pdf_worker import pdf_renderer
+import base64
+import csv
+import io
+import json
 import uuid
-from decimal import Decimal
-from typing import Optional
+from typing import Literal, Optional, Union
 import datetime as dt
 
-router = APIRouter(prefix="/invoices", tags=["invoices"])
+router = APIRouter(prefix="/invoices", tags=["invoices"], route_class=IdempotentRoute)
 
 # Request models
+# String limits match the columns they are stored in (invoice_items.name,
+# customers.name / phone / email, vehicles.vin, invoices.number)
 class InvoiceItemRequest(BaseModel):
     product_id: Optional[str] = None
-    name: str
+    name: str = Field(max_length=200)
     qty: int
     rate: float
     tax_rate: float = 18.0
+    discount_pct: float = Field(default=0.0, ge=0, le=100)
 
 class CreateInvoiceRequest(BaseModel):
-    customer_name: str
-    mobile: Optional[str] = None
-    email: Optional[str] = None
-    vehicle_no: Optional[str] = None
+    customer_name: str = Field(max_length=255)
+    mobile: Optional[str] = Field(default=None, max_length=20)
+    email: Optional[str] = Field(default=None, max_length=255)
+    vehicle_no: Optional[str] = Field(default=None, max_length=64)
     items: list[InvoiceItemRequest]
     status: str = "DUE"  # DUE, PAID, PARTIAL
+    prices_include_tax: bool = False  # item rates already include GST
 
 # Response models
 class InvoiceSummaryResponse(BaseModel):
@@ -38,7 +58,18 @@ class InvoiceSummaryResponse(BaseModel):
     amount: float
     status: str  # DUE, PAID, PARTIAL
 
-@router.post("", status_code=201, response_model=InvoiceSummaryResponse)
+class StockUpdateResponse(BaseModel):
+    product_id: str
+    requested: int
+    previous: Optional[int] = None
+    remaining: Optional[int] = None
+    status: str  # ok, clamped, backordered, not_found
+
+class CreateInvoiceResponse(InvoiceSummaryResponse):
+    stock: list[StockUpdateResponse] = []
+
+@router.post("", status_code=201, response_model=CreateInvoiceResponse)
+@query_budget(7)  # 6, plus one when a new block of invoice numbers is reserved
 async def create_invoice(
     payload: CreateInvoiceRequest, 
     session: AsyncSession = Depends(get_session), 
@@ -46,80 +77,32 @@ async def create_invoice(
 ):
     """Create a new invoice with line items, auto-creating customer if needed"""
     
-    # Find or create customer
+    tenant_id = uuid.UUID(user.tenant_id)
+
+    # Find or create customer: one upsert on (name, normalized phone)
     customer_id = None
     if payload.customer_name:
-        # Try to find existing customer by name and phone
-        query = select(Customer).where(
-            Customer.tenant_id == uuid.UUID(user.tenant_id),
-            Customer.name == payload.customer_name
-        )
-        if payload.mobile:
-            query = query.where(Customer.phone == payload.mobile)
-        
-        result = await session.execute(query)
-        customer = result.scalar_one_or_none()
-        
-        if not customer:
-            # Create new customer
-            customer = Customer(
-                id=uuid.uuid4(),
-                tenant_id=uuid.UUID(user.tenant_id),
-                name=payload.customer_name,
-                phone=payload.mobile,
-                email=payload.email
-            )
-            session.add(customer)
-            await session.flush()  # Get the customer ID
-        
-        customer_id = customer.id
+        [customer_id] = await upsert_customers(session, tenant_id, [{
+            "name": payload.customer_name,
+            "phone": payload.mobile,
+            "email": payload.email
+        }])
     
-    # Find or create vehicle if provided
+    # Find or create vehicle if provided: one upsert on the case-folded registration
     vehicle_id = None
     if payload.vehicle_no and customer_id:
-        result = await session.execute(
-            select(Vehicle).where(
-                Vehicle.tenant_id == uuid.UUID(user.tenant_id),
-                Vehicle.vin == payload.vehicle_no
-            )
-        )
-        vehicle = result.scalar_one_or_none()
-        
-        if not vehicle:
-            # Create basic vehicle record
-            vehicle = Vehicle(
-                id=uuid.uuid4(),
-                tenant_id=uuid.UUID(user.tenant_id),
-                customer_id=customer_id,
-                vin=payload.vehicle_no,
-                active=True
-            )
-            session.add(vehicle)
-            await session.flush()
-        
-        vehicle_id = vehicle.id
+        vehicles = await upsert_vehicles(session, tenant_id, [{
+            "vin": payload.vehicle_no,
+            "customer_id": customer_id
+        }])
+        vehicle_id = vehicles.get(normalize_vin(payload.vehicle_no))
     
-    # Generate invoice number
-    timestamp = int(dt.datetime.utcnow().timestamp() * 1000)
-    invoice_number = f"INV-{timestamp}"
+    # Allocate the next per-tenant invoice number (from this worker's reserved block)
+    invoice_number = await invoice_numbers.next_number(uuid.UUID(user.tenant_id))
     
-    # Calculate total amount from items
-    total_amount = Decimal("0.00")
-    invoice_items = []
-    
-    for item in payload.items:
-        # Calculate item amount: qty * rate * (1 + tax_rate/100)
-        item_amount = Decimal(str(item.qty)) * Decimal(str(item.rate)) * (1 + Decimal(str(item.tax_rate)) / 100)
-        total_amount += item_amount
-        
-        invoice_items.append({
-            "product_id": item.product_id,
-            "name": item.name,
-            "qty": item.qty,
-            "rate": item.rate,
-            "tax_rate": item.tax_rate,
-            "amount": float(item_amount)
-        })
+    # Price the whole basket: exact per-line amounts and the invoice total
+    basket = price_basket(payload.items, prices_include_tax=payload.prices_include_tax)
+    total_amount = basket.total
     
     # Map status
     db_status = "paid" if payload.status == "PAID" else "draft"
@@ -137,8 +120,11 @@ async def create_invoice(
     session.add(invoice)
     await session.flush()
     
+    # Keep the daily sales rollup in step, inside the same transaction
+    await apply_invoice_to_rollup(session, invoice)
+    
     # Create invoice items
-    for item_data in invoice_items:
+    for item_data in basket.rows():
         invoice_item = InvoiceItem(
             id=uuid.uuid4(),
             invoice_id=invoice.id,
@@ -149,25 +135,24 @@ async def create_invoice(
             invoice_item.product_id = uuid.UUID(invoice_item.product_id)
         session.add(invoice_item)
     
-    # Reduce inventory stock for items with product_id
-    from apps.services.inventory.models import InventoryItem
-    for item in payload.items:
-        if item.product_id:
-            # Find inventory item
-            inv_query = select(InventoryItem).where(
-                InventoryItem.id == uuid.UUID(item.product_id),
-                InventoryItem.tenant_id == uuid.UUID(user.tenant_id)
-            )
-            result = await session.execute(inv_query)
-            inv_item = result.scalar_one_or_none()
-            
-            if inv_item:
-                # Reduce stock quantity
-                inv_item.stock_quantity -= item.qty
-                if inv_item.stock_quantity < 0:
-                    inv_item.stock_quantity = 0
+    # Reduce inventory stock for items with product_id, in one statement; the
+    # policy is the server's, so a client cannot opt out of rejection
+    try:
+        stock_results = await decrement_stock(
+            session,
+            uuid.UUID(user.tenant_id),
+            [(uuid.UUID(item.product_id), item.qty) for item in payload.items if item.product_id],
+            policy=settings.STOCK_POLICY
+        )
+    except InsufficientStock as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Insufficient stock", "items": e.shortfalls}
+        )
     
     await session.commit()
+    await dashboard_cache.invalidate(invoice.tenant_id)
     
     # Validate customer name presence
     if not payload.customer_name:
@@ -177,12 +162,142 @@ async def create_invoice(
     # ... (existing code unchanged up to line 174)
 
     # Return response using stored customer name
-    return InvoiceSummaryResponse(
+    return CreateInvoiceResponse(
         id=str(invoice.id),
-        customer=customer.name if customer else "Walk-in Customer",
+        customer=payload.customer_name or "Walk-in Customer",
         date=invoice.issued_at.isoformat(),
         amount=float(total_amount),
-        status=payload.status
+        status=payload.status,
+        stock=[StockUpdateResponse(**r) for r in stock_results]
+    )
+
+class BulkInvoiceIn(CreateInvoiceRequest):
+    number: Optional[str] = Field(default=None, max_length=32)  # legacy invoice number; allocated if omitted
+    issued_at: Optional[dt.datetime] = None  # historical issue date; now if omitted
+
+class BulkInvoiceRequest(BaseModel):
+    invoices: list[BulkInvoiceIn]
+    apply_stock: bool = True  # set False when importing history that must not move stock
+
+class BulkInvoiceRowResult(BaseModel):
+    index: int
+    ok: bool
+    id: Optional[str] = None
+    number: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkInvoiceResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkInvoiceRowResult]
+
+@router.post("/bulk", response_model=BulkInvoiceResponse)
+@query_budget(None, allow_repeats=True)  # one set of statements per chunk
+async def create_invoices_bulk(
+    payload: BulkInvoiceRequest,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(get_current_user)
+):
+    """Ingest many invoices at once, committing in chunks and reporting per-row results"""
+    if len(payload.invoices) > settings.BULK_INVOICE_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BULK_INVOICE_MAX_ROWS} invoices per request"
+        )
+
+    results = await ingest_invoices(
+        session,
+        uuid.UUID(user.tenant_id),
+        payload.invoices,
+        chunk_size=settings.BULK_INVOICE_CHUNK_SIZE,
+        stock_policy=settings.STOCK_POLICY if payload.apply_stock else None
+    )
+    created = sum(1 for r in results if r["ok"])
+    return BulkInvoiceResponse(
+        created=created,
+        failed=len(results) - created,
+        results=[BulkInvoiceRowResult(**r) for r in results]
+    )
+
+EXPORT_COLUMNS = [
+    "number", "issued_at", "status", "amount",
+    "customer_name", "customer_phone", "customer_email", "vehicle_no",
+]
+EXPORT_BATCH_SIZE = 1000
+
+@router.get("/export")
+async def export_invoices(
+    export_format: Literal["csv", "ndjson"] = Query(default="csv", alias="format"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    user=Depends(get_current_user)
+):
+    """
+    Stream the tenant's invoices (oldest first) as CSV or NDJSON.
+
+    Rows come off a server-side cursor in batches of EXPORT_BATCH_SIZE and are
+    written out as they arrive, so memory stays flat for any date range.
+    """
+    query = (
+        select(
+            Invoice.number,
+            Invoice.issued_at,
+            Invoice.status,
+            Invoice.total_amount,
+            Customer.name,
+            Customer.phone,
+            Customer.email,
+            Vehicle.vin,
+        )
+        .outerjoin(Customer, Invoice.customer_id == Customer.id)
+        .outerjoin(Vehicle, Invoice.vehicle_id == Vehicle.id)
+        .where(Invoice.tenant_id == uuid.UUID(user.tenant_id))
+    )
+    query = _apply_invoice_filters(
+        query, start_date, end_date, status, customer_id, min_amount, max_amount
+    )
+    query = query.order_by(Invoice.issued_at, Invoice.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    def to_record(row) -> dict:
+        number, issued_at, db_status, amount, name, phone, email, vin = row
+        return {
+            "number": number,
+            "issued_at": issued_at.isoformat() if issued_at else None,
+            "status": "PAID" if db_status == "paid" else "PARTIAL" if db_status == "partial" else "DUE",
+            "amount": str(amount),
+            "customer_name": name or "Walk-in Customer",
+            "customer_phone": phone,
+            "customer_email": email,
+            "vehicle_no": vin,
+        }
+
+    async def rows():
+        # Own session: the stream outlives the request-scoped dependency
+        async with async_session() as s:
+            result = await s.stream(query)
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+                writer.writeheader()
+                yield buffer.getvalue()
+            async for batch in result.partitions():
+                if export_format == "csv":
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(to_record(row) for row in batch)
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(json.dumps(to_record(row)) + "\n" for row in batch)
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="invoices.{export_format}"'}
     )
 
 class InvoiceDetailResponse(InvoiceSummaryResponse):
@@ -191,6 +306,69 @@ class InvoiceDetailResponse(InvoiceSummaryResponse):
     customer_email: Optional[str] = None
     customer_phone: Optional[str] = None
 
+MAX_BATCH_IDS = 200
+# Larger ?limit= values are clamped, not rejected: older clients asked for everything at once
+MAX_PAGE_SIZE = 200
+
+def _invoice_detail_query(tenant_id: uuid.UUID, invoice_ids: list[uuid.UUID]):
+    """Invoice, customer, vehicle and line items (as one json array) in a single round trip"""
+    items = (
+        select(func.coalesce(
+            func.json_agg(func.json_build_object(
+                "id", InvoiceItem.id,
+                "name", InvoiceItem.name,
+                "qty", InvoiceItem.qty,
+                "rate", InvoiceItem.rate,
+                "amount", InvoiceItem.amount,
+                "tax_rate", InvoiceItem.tax_rate,
+                "taxable_value", InvoiceItem.taxable_value
+            )),
+            literal_column("'[]'::json"),
+            type_=JSON
+        ))
+        .where(InvoiceItem.invoice_id == Invoice.id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            Invoice.id,
+            Invoice.issued_at,
+            Invoice.total_amount,
+            Invoice.status,
+            Customer.name,
+            Customer.email,
+            Customer.phone,
+            Vehicle.vin,
+            items
+        )
+        .outerjoin(Customer, Invoice.customer_id == Customer.id)
+        .outerjoin(Vehicle, Invoice.vehicle_id == Vehicle.id)
+        .where(
+            Invoice.id.in_(invoice_ids),
+            Invoice.tenant_id == tenant_id
+        )
+    )
+
+def _to_detail(row) -> InvoiceDetailResponse:
+    invoice_id, issued_at, total_amount, db_status, name, email, phone, vin, items = row
+    return InvoiceDetailResponse(
+        id=str(invoice_id),
+        customer=name or "Walk-in Customer",
+        customer_email=email,
+        customer_phone=phone,
+        vehicle_no=vin,
+        date=issued_at.isoformat() if issued_at else dt.datetime.utcnow().isoformat(),
+        amount=float(total_amount),
+        status="PAID" if db_status == "paid" else "PARTIAL" if db_status == "partial" else "DUE",
+        items=[{
+            "id": item["id"],
+            "name": item["name"],
+            "qty": item["qty"],
+            "rate": float(item["rate"]),
+            "amount": float(item["amount"])
+        } for item in items]
+    )
+
 @router.get("/{invoice_id}", response_model=InvoiceDetailResponse)
 async def get_invoice(
     invoice_id: str,
@@ -199,96 +377,221 @@ async def get_invoice(
 ):
     """Get full details of a specific invoice"""
     try:
-        # Fetch invoice with related data
-        query = (
-            select(Invoice, Customer, Vehicle)
-            .outerjoin(Customer, Invoice.customer_id == Customer.id)
-            .outerjoin(Vehicle, Invoice.vehicle_id == Vehicle.id)
-            .where(
-                Invoice.id == uuid.UUID(invoice_id),
-                Invoice.tenant_id == uuid.UUID(user.tenant_id)
-            )
+        result = await session.execute(
+            _invoice_detail_query(uuid.UUID(user.tenant_id), [uuid.UUID(invoice_id)])
         )
-        result = await session.execute(query)
         row = result.first()
         
         if not row:
             raise HTTPException(status_code=404, detail="Invoice not found")
-            
-        invoice, customer, vehicle = row
         
-        # Fetch items
-        items_query = select(InvoiceItem).where(InvoiceItem.invoice_id == invoice.id)
-        items_result = await session.execute(items_query)
-        items = items_result.scalars().all()
-        
-        return InvoiceDetailResponse(
-            id=str(invoice.id),
-            customer=customer.name if customer else "Walk-in Customer",
-            customer_email=customer.email if customer else None,
-            customer_phone=customer.phone if customer else None,
-            vehicle_no=vehicle.vin if vehicle else None,
-            date=invoice.issued_at.isoformat() if invoice.issued_at else dt.datetime.utcnow().isoformat(),
-            amount=float(invoice.total_amount),
-            status="PAID" if invoice.status == "paid" else "PARTIAL" if invoice.status == "partial" else "DUE",
-            items=[{
-                "id": str(item.id),
-                "name": item.name,
-                "qty": item.qty,
-                "rate": float(item.rate),
-                "amount": float(item.amount)
-            } for item in items]
-        )
+        return _to_detail(row)
     except HTTPException:
         raise
     except Exception as e:
         print(f"Error fetching invoice: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("", response_model=list[InvoiceSummaryResponse])
+@router.get("/{invoice_id}/pdf")
+async def get_invoice_pdf(
+    invoice_id: str,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    user=Depends(get_current_user)
+):
+    """
+    Download the invoice as a PDF.
+
+    Rendering happens in the PDF process pool; the file is cached on disk under
+    a hash of the invoice content, which doubles as the ETag, so repeat
+    downloads are served straight from disk (or answered 304).
+    """
+    query = (
+        _invoice_detail_query(uuid.UUID(user.tenant_id), [uuid.UUID(invoice_id)])
+        .add_columns(Invoice.number, Tenant.name)
+        .join(Tenant, Invoice.tenant_id == Tenant.id)
+    )
+    row = (await session.execute(query)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+
+    detail = _to_detail(row[:9])
+    number, dealer = row[9], row[10]
+    doc = {
+        "dealer": dealer,
+        "number": number,
+        "date": detail.date[:10],
+        "status": detail.status,
+        "customer": detail.customer,
+        "customer_phone": detail.customer_phone,
+        "customer_email": detail.customer_email,
+        "vehicle_no": detail.vehicle_no,
+        "amount": str(row[2]),
+        "items": [{
+            "name": item["name"],
+            "qty": item["qty"],
+            "rate": str(item["rate"]),
+            "tax_rate": str(item.get("tax_rate") or 0),
+            "taxable_value": str(item["taxable_value"]),
+            "amount": str(item["amount"])
+        } for item in row[8]]
+    }
+    # Release the connection before waiting on the render
+    await session.close()
+
+    path, digest = await pdf_renderer.render(doc)
+    etag = f'"{digest}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=f"{(number or invoice_id).replace('/', '-')}.pdf",
+        headers={"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    )
+
+async def _batch_invoice_details(session: AsyncSession, tenant_id: uuid.UUID, ids: str) -> list[InvoiceDetailResponse]:
+    """Resolve ?ids=a,b,c in one query; unknown ids are skipped, order follows the request"""
+    try:
+        invoice_ids = list(dict.fromkeys(uuid.UUID(v.strip()) for v in ids.split(",") if v.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma separated invoice UUIDs")
+    if len(invoice_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    if not invoice_ids:
+        return []
+
+    result = await session.execute(_invoice_detail_query(tenant_id, invoice_ids))
+    by_id = {row[0]: row for row in result.all()}
+    return [_to_detail(by_id[i]) for i in invoice_ids if i in by_id]
+
+def _encode_cursor(issued_at: dt.datetime, invoice_id) -> str:
+    raw = json.dumps({"t": issued_at.isoformat(), "id": str(invoice_id)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[dt.datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return dt.datetime.fromisoformat(data["t"]), uuid.UUID(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _status_filter(statuses: str):
+    """PAID / PARTIAL / DUE (comma separated) -> condition on invoices.status"""
+    conditions = []
+    for value in (v.strip().upper() for v in statuses.split(",") if v.strip()):
+        if value == "PAID":
+            conditions.append(Invoice.status == "paid")
+        elif value == "PARTIAL":
+            conditions.append(Invoice.status == "partial")
+        elif value == "DUE":
+            conditions.append(Invoice.status.notin_(["paid", "partial"]))
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown status: {value}")
+    return or_(*conditions)
+
+def _apply_invoice_filters(
+    query,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None
+):
+    """Shared by the invoice register and export so both see exactly the same rows"""
+    if start_date:
+        try:
+            # Parse and convert to naive UTC
+            start = dt.datetime.fromisoformat(start_date.replace('Z', '+00:00'))
+            start = start.astimezone(dt.timezone.utc).replace(tzinfo=None)
+            query = query.where(Invoice.issued_at >= start)
+        except ValueError:
+            pass # Ignore invalid dates
+
+    if end_date:
+        try:
+            # Parse and convert to naive UTC
+            end = dt.datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+            end = end.astimezone(dt.timezone.utc).replace(tzinfo=None)
+            
+            # Add one day to include the end date fully if it's just a date
+            if 'T' not in end_date:
+                 end = end + dt.timedelta(days=1)
+            query = query.where(Invoice.issued_at <= end)
+        except ValueError:
+            pass
+
+    if status:
+        query = query.where(_status_filter(status))
+    if customer_id:
+        query = query.where(Invoice.customer_id == customer_id)
+    if min_amount is not None:
+        query = query.where(Invoice.total_amount >= min_amount)
+    if max_amount is not None:
+        query = query.where(Invoice.total_amount <= max_amount)
+    return query
+
+@router.get("", response_model=list[Union[InvoiceDetailResponse, InvoiceSummaryResponse]])
 async def list_invoices(
+    response: Response,
+    ids: Optional[str] = None,
     limit: int = 20,
+    cursor: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    status: Optional[str] = None,
+    customer_id: Optional[uuid.UUID] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
     session: AsyncSession = Depends(get_session), 
     user=Depends(get_current_user)
 ):
-    """List invoices for the current tenant with optional date filtering"""
+    """
+    List invoices for the current tenant, newest first, with optional filters.
+
+    Keyset-paginated on (issued_at, id): when more rows exist, the X-Next-Cursor
+    response header carries an opaque cursor to pass back as ?cursor= for the
+    next page, so every page costs the same however deep the user scrolls.
+    ?limit= is clamped to 1..MAX_PAGE_SIZE.
+
+    With ?ids=<uuid>,<uuid>,... (up to MAX_BATCH_IDS) the full details of just
+    those invoices are returned instead, e.g. for reprinting a day's bills, and
+    the paging and filter parameters are ignored.
+    """
     try:
+        if ids is not None:
+            return await _batch_invoice_details(session, uuid.UUID(user.tenant_id), ids)
+
         query = (
             select(Invoice, Customer)
             .outerjoin(Customer, Invoice.customer_id == Customer.id)
             .where(Invoice.tenant_id == uuid.UUID(user.tenant_id))
         )
 
-        if start_date:
-            try:
-                # Parse and convert to naive UTC
-                start = dt.datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                start = start.astimezone(dt.timezone.utc).replace(tzinfo=None)
-                query = query.where(Invoice.issued_at >= start)
-            except ValueError:
-                pass # Ignore invalid dates
-
-        if end_date:
-            try:
-                # Parse and convert to naive UTC
-                end = dt.datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                end = end.astimezone(dt.timezone.utc).replace(tzinfo=None)
-                
-                # Add one day to include the end date fully if it's just a date
-                if 'T' not in end_date:
-                     end = end + dt.timedelta(days=1)
-                query = query.where(Invoice.issued_at <= end)
-            except ValueError:
-                pass
-
-        query = query.order_by(Invoice.issued_at.desc()).limit(limit)
+        query = _apply_invoice_filters(
+            query, start_date, end_date, status, customer_id, min_amount, max_amount
+        )
+
+        if cursor:
+            after_issued_at, after_id = _decode_cursor(cursor)
+            query = query.where(tuple_(Invoice.issued_at, Invoice.id) < tuple_(after_issued_at, after_id))
+
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        # Fetch one extra row to learn whether another page exists
+        query = query.order_by(Invoice.issued_at.desc(), Invoice.id.desc()).limit(limit + 1)
 
         result = await session.execute(query)
+        rows = result.all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            if last.issued_at is not None:
+                response.headers["X-Next-Cursor"] = _encode_cursor(last.issued_at, last.id)
         
         invoices = []
-        for invoice, customer in result.all():
+        for invoice, customer in rows:
             # Map status
             status = "PAID" if invoice.status == "paid" else "PARTIAL" if invoice.status == "partial" else "DUE"
             
@@ -301,6 +604,8 @@ async def list_invoices(
             ))
         
         return invoices
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in list_invoices: {str(e)}")
         import traceback
@@ -325,7 +630,9 @@ async def delete_invoice(
     if not invoice:
         raise HTTPException(404, "Invoice not found")
     
+    await apply_invoice_to_rollup(session, invoice, sign=-1)
     await session.delete(invoice)
     await session.commit()
+    await dashboard_cache.invalidate(invoice.tenant_id)
     
     return None
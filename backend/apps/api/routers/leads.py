@@ -1,14 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from apps.core.db import get_session
+from apps.core.cache import dashboard_cache
+from apps.core.db import get_read_session, get_session
+from apps.core.idempotency import IdempotentRoute
 from apps.services.crm.models import Lead, LeadStatus, LeadSource, Customer
 from apps.core.security import get_current_user
 import uuid
 import datetime as dt
 
-router = APIRouter(prefix="/leads", tags=["leads"])
+router = APIRouter(prefix="/leads", tags=["leads"], route_class=IdempotentRoute)
 
 class LeadIn(BaseModel):
     tenant_id: str
@@ -52,7 +55,7 @@ async def create_lead(payload: LeadIn, session: AsyncSession = Depends(get_sessi
 async def list_leads(
     status: str | None = None,
     source: str | None = None,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     user=Depends(get_current_user)
 ):
     query = select(Lead).where(Lead.tenant_id == user.tenant_id)
@@ -166,7 +169,12 @@ async def convert_lead(
     lead.converted_at = dt.datetime.utcnow()
     
     session.add(customer)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(409, "A customer with this name and phone already exists")
+    await dashboard_cache.invalidate(user.tenant_id)
     
     return {"ok": True, "customer_id": customer_id}
 
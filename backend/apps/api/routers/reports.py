@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy import select, func
-from apps.core.db import async_session
+from sqlalchemy import select, func, cast, Date
+from apps.core.db import async_session, read_session
+from apps.core.querybudget import query_budget
 from apps.core.security import require_roles
 from apps.services.dealers.models import Tenant
-from apps.services.billing.models import Invoice, SubscriptionPlan
+from apps.services.billing.models import DailySalesRollup, SubscriptionPlan
 from apps.services.crm.models import Customer
 import datetime as dt
 
@@ -11,9 +12,10 @@ router = APIRouter(prefix="/saas", tags=["saas-admin"])
 
 
 @router.get("/reports/stats", dependencies=[Depends(require_roles("superadmin", "saas_admin"))])
+@query_budget(6)
 async def get_admin_stats():
     """Get key metrics for SaaS admin dashboard"""
-    async with async_session() as s:
+    async with read_session() as s:
         # Total dealers
         total_dealers = await s.scalar(select(func.count(Tenant.id)))
         
@@ -29,17 +31,20 @@ async def get_admin_stats():
         )
         plan_distribution = {row[0] or "none": row[1] for row in dealers_by_plan}
         
-        # Total revenue (sum of all invoices with status='paid')
-        total_revenue = await s.scalar(
-            select(func.sum(Invoice.total_amount)).where(Invoice.status == "paid")
-        ) or 0
-        
-        # Revenue this month
+        # Total revenue and revenue this month (paid invoices, from the daily rollup)
         first_day_of_month = dt.datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_revenue = await s.scalar(
-            select(func.sum(Invoice.total_amount))
-            .where(Invoice.status == "paid", Invoice.issued_at >= first_day_of_month)
-        ) or 0
+        revenue = (await s.execute(
+            select(
+                func.coalesce(func.sum(DailySalesRollup.total_amount), 0),
+                func.coalesce(
+                    func.sum(DailySalesRollup.total_amount).filter(
+                        DailySalesRollup.day >= first_day_of_month.date()
+                    ),
+                    0,
+                ),
+            ).where(DailySalesRollup.status == "paid")
+        )).one()
+        total_revenue, monthly_revenue = revenue
         
         # Expiring soon (next 30 days)
         thirty_days_from_now = dt.datetime.utcnow() + dt.timedelta(days=30)
@@ -71,54 +76,50 @@ async def get_admin_stats():
 
 
 @router.get("/reports/revenue-trend", dependencies=[Depends(require_roles("superadmin", "saas_admin"))])
+@query_budget(1)
 async def get_revenue_trend(months: int = 6):
     """Get revenue trend for the last N months"""
-    async with async_session() as s:
-        # Calculate revenue per month for the last N months
-        result = []
+    async with read_session() as s:
+        # Month buckets for the last N months
         now = dt.datetime.utcnow()
-        
+        first_days = []
         for i in range(months - 1, -1, -1):
-            # Calculate first day of the month
             target_month = now - dt.timedelta(days=30 * i)
-            first_day = target_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Calculate last day of the month
-            if first_day.month == 12:
-                last_day = first_day.replace(year=first_day.year + 1, month=1, day=1)
-            else:
-                last_day = first_day.replace(month=first_day.month + 1, day=1)
-            
-            # Get revenue for this month
-            revenue = await s.scalar(
-                select(func.sum(Invoice.total_amount))
-                .where(
-                    Invoice.status == "paid",
-                    Invoice.issued_at >= first_day,
-                    Invoice.issued_at < last_day
-                )
-            ) or 0
-            
-            result.append({
-                "month": first_day.strftime("%b %Y"),
-                "revenue": float(revenue)
-            })
+            first_days.append(target_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
         
-        return result
+        # Revenue per month in one grouped read over the daily rollup
+        month = cast(func.date_trunc("month", DailySalesRollup.day), Date)
+        res = await s.execute(
+            select(month, func.sum(DailySalesRollup.total_amount))
+            .where(
+                DailySalesRollup.status == "paid",
+                DailySalesRollup.day >= first_days[0].date()
+            )
+            .group_by(month)
+        )
+        revenue_by_month = {m: revenue for m, revenue in res.all()}
+        
+        return [{
+            "month": first_day.strftime("%b %Y"),
+            "revenue": float(revenue_by_month.get(first_day.date()) or 0)
+        } for first_day in first_days]
 
 
 @router.get("/reports/dealers-expiring", dependencies=[Depends(require_roles("superadmin", "saas_admin"))])
+@query_budget(1)
 async def get_expiring_dealers(days: int = 30):
     """Get list of dealers whose subscriptions are expiring soon"""
-    async with async_session() as s:
-        cutoff_date = dt.datetime.utcnow() + dt.timedelta(days=days)
+    async with read_session() as s:
+        # subscription_end is timezone-aware
+        now = dt.datetime.now(dt.timezone.utc)
+        cutoff_date = now + dt.timedelta(days=days)
         
         res = await s.execute(
             select(Tenant)
             .where(
                 Tenant.subscription_end.isnot(None),
                 Tenant.subscription_end <= cutoff_date,
-                Tenant.subscription_end >= dt.datetime.utcnow()
+                Tenant.subscription_end >= now
             )
             .order_by(Tenant.subscription_end)
         )
@@ -129,5 +130,5 @@ async def get_expiring_dealers(days: int = 30):
             "name": d.name,
             "plan": d.plan_id,
             "subscription_end": d.subscription_end,
-            "days_remaining": (d.subscription_end - dt.datetime.utcnow()).days if d.subscription_end else None
+            "days_remaining": (d.subscription_end - now).days if d.subscription_end else None
         } for d in dealers]
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy import select, func, and_, extract
-from apps.core.db import async_session
-from apps.core.security import require_roles, hash_password
+from apps.core.access import access_table
+from apps.core.db import async_session, read_session
+from apps.core.querybudget import query_budget
+from apps.core.security import require_roles, hash_password_async
 from apps.services.dealers.models import Tenant
+from apps.services.dealers.service import tenant_lookup
 from apps.services.auth.models import User
 from apps.services.billing.models import SubscriptionPlan
+from apps.services.billing.numbering import invoice_numbers
 from apps.services.features.service import initialize_features_for_tenant
 import datetime as dt
 import random
@@ -32,6 +36,8 @@ class DealerUpdateIn(BaseModel):
     plan: str | None = None
     status: str | None = None
     is_active: bool | None = None
+    invoice_prefix: str | None = Field(default=None, max_length=12)
+    fiscal_year_start_month: int | None = Field(default=None, ge=1, le=12)
 
 
 class AdminStats(BaseModel):
@@ -56,9 +62,10 @@ class RevenueTrend(BaseModel):
 # ============================================================================
 
 @router.get("/reports/stats", dependencies=[Depends(require_roles("superadmin", "saas_admin"))])
+@query_budget(7)
 async def get_admin_stats() -> AdminStats:
     """Get comprehensive admin dashboard statistics"""
-    async with async_session() as s:
+    async with read_session() as s:
         # Total dealers
         total_result = await s.execute(select(func.count(Tenant.id)))
         total_dealers = total_result.scalar() or 0
@@ -144,53 +151,44 @@ async def get_admin_stats() -> AdminStats:
 
 
 @router.get("/reports/revenue-trend", dependencies=[Depends(require_roles("superadmin", "saas_admin"))])
+@query_budget(1)
 async def get_revenue_trend(months: int = Query(default=6, ge=1, le=12)) -> List[RevenueTrend]:
     """Get revenue trend for the last N months"""
-    async with async_session() as s:
-        # Get plan prices
-        plans_result = await s.execute(select(SubscriptionPlan))
-        plans = {p.id: float(p.price) for p in plans_result.scalars().all()}
-        
-        # Calculate revenue for each month
-        trends = []
-        now = dt.datetime.utcnow()
-        
-        for i in range(months - 1, -1, -1):
-            # Calculate the target month
-            target_date = now - dt.timedelta(days=30 * i)
-            month_start = dt.datetime(target_date.year, target_date.month, 1)
-            
-            # Get next month start
-            if target_date.month == 12:
-                month_end = dt.datetime(target_date.year + 1, 1, 1)
-            else:
-                month_end = dt.datetime(target_date.year, target_date.month + 1, 1)
-            
-            # Get dealers active in this month
-            dealers_result = await s.execute(
-                select(Tenant).where(
-                    and_(
-                        Tenant.subscription_start <= month_end,
-                        (Tenant.subscription_end.is_(None) | (Tenant.subscription_end >= month_start))
-                    )
-                )
+    now = dt.datetime.now(dt.timezone.utc)
+    # [start, end) of each calendar month, oldest first
+    windows = []
+    for i in range(months - 1, -1, -1):
+        index = now.year * 12 + now.month - 1 - i
+        month_start = dt.datetime(index // 12, index % 12 + 1, 1, tzinfo=dt.timezone.utc)
+        month_end = dt.datetime((index + 1) // 12, (index + 1) % 12 + 1, 1, tzinfo=dt.timezone.utc)
+        windows.append((month_start, month_end))
+
+    async with read_session() as s:
+        # Every priced subscription overlapping the whole window, in one query;
+        # the per-month split happens below
+        result = await s.execute(
+            select(Tenant.subscription_start, Tenant.subscription_end, SubscriptionPlan.price)
+            .join(SubscriptionPlan, SubscriptionPlan.id == Tenant.plan_id)
+            .where(
+                Tenant.subscription_start <= windows[-1][1],
+                Tenant.subscription_end.is_(None) | (Tenant.subscription_end >= windows[0][0])
             )
-            
-            monthly_revenue = 0.0
-            dealer_count = 0
-            
-            for tenant in dealers_result.scalars().all():
-                if tenant.plan_id and tenant.plan_id in plans:
-                    monthly_revenue += plans[tenant.plan_id]
-                    dealer_count += 1
-            
-            trends.append(RevenueTrend(
-                month=target_date.strftime("%b %Y"),
-                revenue=monthly_revenue,
-                dealers=dealer_count
-            ))
-        
-        return trends
+        )
+        subscriptions = result.all()
+
+    trends = []
+    for month_start, month_end in windows:
+        # Dealers active in this month
+        active = [
+            float(price) for start, end, price in subscriptions
+            if start <= month_end and (end is None or end >= month_start)
+        ]
+        trends.append(RevenueTrend(
+            month=month_start.strftime("%b %Y"),
+            revenue=sum(active),
+            dealers=len(active)
+        ))
+    return trends
 
 
 # ============================================================================
@@ -255,7 +253,7 @@ async def create_dealer(payload: DealerCreateIn, background_tasks: BackgroundTas
             username="dealer_admin",
             display_name=payload.admin_name,
             role="dealer_admin",
-            password_hash=hash_password(payload.admin_password),
+            password_hash=await hash_password_async(payload.admin_password),
         )
         s.add(u)
         
@@ -288,8 +286,19 @@ async def update_dealer(tenant_id: str, payload: DealerUpdateIn):
             t.status = payload.status
         if payload.is_active is not None:
             t.is_active = payload.is_active
+        if payload.invoice_prefix is not None:
+            t.invoice_prefix = payload.invoice_prefix
+        if payload.fiscal_year_start_month is not None:
+            t.fiscal_year_start_month = payload.fiscal_year_start_month
+        access_changed = payload.status is not None or payload.is_active is not None
+        if access_changed:
+            await access_table.bump(s)
         
         await s.commit()
+        invoice_numbers.forget(t.id)
+        tenant_lookup.invalidate(t.id)
+        if access_changed:
+            await access_table.changed()
         return {"ok": True}
 
 
@@ -303,7 +312,11 @@ async def delete_dealer(tenant_id: str):
             raise HTTPException(404, "Tenant not found")
         
         await s.delete(t)
+        # Tokens already issued to the dealer's users must stop working too
+        await access_table.revoke(s, t.id, "tenant")
         await s.commit()
+        tenant_lookup.invalidate(t.id)
+        await access_table.changed()
         return {"ok": True}
 
 
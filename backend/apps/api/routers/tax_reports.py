@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from apps.core.config import settings
+from apps.core.db import get_read_session
+from apps.core.security import get_current_user
+from apps.services.billing.tax_summary import tax_summary
+from decimal import Decimal
+from typing import Literal
+import datetime as dt
+import uuid
+
+# Dealer-facing, tenant-scoped reports. routers/reports.py is the SaaS admin's
+# cross-tenant reporting under /saas/reports (superadmin roles only), so these
+# live in their own router at /reports rather than behind its prefix.
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+class TaxSummaryRowResponse(BaseModel):
+    period: str  # first day of the period, YYYY-MM-DD
+    tax_rate: float
+    lines: int
+    taxable_value: float
+    tax: float
+    gross: float
+
+class TaxSummaryTotals(BaseModel):
+    lines: int
+    taxable_value: float
+    tax: float
+    gross: float
+
+class TaxSummaryResponse(BaseModel):
+    start_date: str
+    end_date: str
+    period: str
+    engine: str  # sql, columnar
+    rows: list[TaxSummaryRowResponse]
+    totals: TaxSummaryTotals
+
+@router.get("/tax-summary", response_model=TaxSummaryResponse)
+async def get_tax_summary(
+    start_date: dt.date,
+    end_date: dt.date,
+    period: Literal["month", "quarter"] = Query(default="month"),
+    session: AsyncSession = Depends(get_read_session),
+    user=Depends(get_current_user)
+):
+    """
+    GST summary of invoice lines issued between start_date and end_date (inclusive):
+    taxable value, tax and gross per period and tax rate, exact to the paisa.
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    start = dt.datetime.combine(start_date, dt.time.min)
+    end = dt.datetime.combine(end_date + dt.timedelta(days=1), dt.time.min)
+    engine, rows = await tax_summary(
+        session,
+        uuid.UUID(user.tenant_id),
+        start,
+        end,
+        period=period,
+        columnar_after_days=settings.TAX_SUMMARY_COLUMNAR_DAYS
+    )
+
+    # Totals are summed as Decimal before the one conversion to float
+    taxable = sum((r.taxable_value for r in rows), Decimal("0"))
+    tax = sum((r.tax for r in rows), Decimal("0"))
+    return TaxSummaryResponse(
+        start_date=start_date.isoformat(),
+        end_date=end_date.isoformat(),
+        period=period,
+        engine=engine,
+        rows=[TaxSummaryRowResponse(
+            period=r.period.isoformat(),
+            tax_rate=float(r.tax_rate),
+            lines=r.lines,
+            taxable_value=float(r.taxable_value),
+            tax=float(r.tax),
+            gross=float(r.gross)
+        ) for r in rows],
+        totals=TaxSummaryTotals(
+            lines=sum(r.lines for r in rows),
+            taxable_value=float(taxable),
+            tax=float(tax),
+            gross=float(taxable + tax)
+        )
+    )
@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy import select, update, delete
+from apps.core.access import access_table
 from apps.core.db import async_session
-from apps.core.security import require_roles, hash_password
+from apps.core.security import require_roles, hash_password_async
 from apps.services.dealers.models import Tenant
+from apps.services.dealers.service import tenant_lookup
 from apps.services.auth.models import User
+from apps.services.billing.numbering import invoice_numbers
 import datetime as dt
 from apps.services.features.service import initialize_features_for_tenant
 
@@ -24,6 +27,8 @@ class DealerUpdateIn(BaseModel):
     plan: str | None = None
     status: str | None = None # active, suspended
     is_active: bool | None = None
+    invoice_prefix: str | None = Field(default=None, max_length=12)
+    fiscal_year_start_month: int | None = Field(default=None, ge=1, le=12)
 
 @router.get("/dealers", dependencies=[Depends(require_roles("superadmin", "saas_admin"))])
 async def list_dealers():
@@ -92,7 +97,7 @@ async def create_dealer(payload: DealerCreateIn, background_tasks: BackgroundTas
             username="dealer_admin",
             display_name=payload.admin_name,
             role="dealer_admin",
-            password_hash=hash_password(payload.admin_password),
+            password_hash=await hash_password_async(payload.admin_password),
         )
         s.add(u)
         await s.commit()
@@ -130,8 +135,19 @@ async def update_dealer(tenant_id: str, payload: DealerUpdateIn):
             t.status = payload.status
         if payload.is_active is not None:
             t.is_active = payload.is_active
+        if payload.invoice_prefix is not None:
+            t.invoice_prefix = payload.invoice_prefix
+        if payload.fiscal_year_start_month is not None:
+            t.fiscal_year_start_month = payload.fiscal_year_start_month
+        access_changed = payload.status is not None or payload.is_active is not None
+        if access_changed:
+            await access_table.bump(s)
             
         await s.commit()
+        invoice_numbers.forget(t.id)
+        tenant_lookup.invalidate(t.id)
+        if access_changed:
+            await access_table.changed()
         return {"ok": True}
 
 @router.delete("/dealers/{tenant_id}", dependencies=[Depends(require_roles("superadmin", "saas_admin"))])
@@ -146,5 +162,9 @@ async def delete_dealer(tenant_id: str):
             raise HTTPException(404, "Tenant not found")
         
         await s.delete(t)
+        # Tokens already issued to the dealer's users must stop working too
+        await access_table.revoke(s, t.id, "tenant")
         await s.commit()
+        tenant_lookup.invalidate(t.id)
+        await access_table.changed()
         return {"ok": True}
@@ -1,9 +1,12 @@
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from apps.core.db import get_session
+from apps.core.db import get_read_session, get_session
+from apps.core.idempotency import IdempotentRoute
+from apps.core.querybudget import query_budget
 from apps.services.crm.models import Vehicle
 from apps.core.security import get_current_user
 import uuid
@@ -13,7 +16,7 @@ from sqlalchemy.orm import joinedload
 
 from apps.services.inventory.vehicle_models import VehicleInventory, VehicleStatus
 
-router = APIRouter(prefix="/vehicles", tags=["vehicles"])
+router = APIRouter(prefix="/vehicles", tags=["vehicles"], route_class=IdempotentRoute)
 
 class VehicleIn(BaseModel):
     tenant_id: str
@@ -49,11 +52,16 @@ async def create_vehicle(payload: VehicleIn, session: AsyncSession = Depends(get
     
     v = Vehicle(id=str(uuid.uuid4()), **payload.model_dump())
     session.add(v)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(409, "A vehicle with this registration/VIN already exists")
     return {"ok": True, "id": v.id}
 
 @router.get("", response_model=list[VehicleOut])
-async def list_vehicles(session: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
+@query_budget(1)
+async def list_vehicles(session: AsyncSession = Depends(get_read_session), user=Depends(get_current_user)):
     stmt = select(Vehicle).options(joinedload(Vehicle.customer)).where(Vehicle.tenant_id == user.tenant_id)
     res = await session.execute(stmt)
     vehicles = res.scalars().all()
@@ -84,7 +92,7 @@ async def create_inventory(payload: InventoryIn, session: AsyncSession = Depends
     return {"ok": True, "id": inv.id}
 
 @router.get("/inventory", response_model=list[InventoryIn])
-async def list_inventory(session: AsyncSession = Depends(get_session), user=Depends(get_current_user)):
+async def list_inventory(session: AsyncSession = Depends(get_read_session), user=Depends(get_current_user)):
     res = await session.execute(select(VehicleInventory).where(VehicleInventory.tenant_id == user.tenant_id))
     return [
         InventoryIn(
@@ -135,6 +143,10 @@ async def sell_vehicle(id: str, payload: SellVehicleRequest, session: AsyncSessi
         active=True
     )
     session.add(vehicle)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(409, "A vehicle with this registration/VIN already exists")
     
     return {"ok": True, "vehicle_id": vehicle.id}
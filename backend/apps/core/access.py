@@ -0,0 +1,204 @@
+# apps/core/access.py
+"""
+Tenant suspension and token revocation, enforced on every request without a query.
+
+Each API worker holds an AccessTable in memory: the ids of tenants that may not
+use the API (status suspended/cancelled, or is_active false) and, per user or
+tenant id, the time before which issued tokens are revoked. get_current_user
+checks verified claims against it with a couple of dict/set lookups.
+
+Keeping it current:
+
+- Writers change tenants / token_revocations and call `bump(session)` in the
+  same transaction, which increments auth_state.version; after commit they call
+  `changed()`, which reloads this worker right away and, with REDIS_URL set,
+  publishes on ACCESS_CHANNEL so every other worker reloads too.
+- Every worker also polls auth_state.version each ACCESS_POLL_SECONDS (one
+  single-row primary key read) and reloads when it moved, so without Redis, or
+  if a message is lost, enforcement lags a write by at most one poll interval.
+
+Until the first load finishes (or if the database is unreachable at startup)
+the table is empty and requests are authorised from the token alone, as before.
+"""
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.core.config import settings
+from apps.core.db import async_session
+from apps.core.logging import logger
+from apps.services.auth.models import AuthState, TokenRevocation
+from apps.services.dealers.models import Tenant
+
+try:  # optional dependency, only needed when REDIS_URL is set
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+ACCESS_CHANNEL = "as360:access"
+BLOCKED_STATUSES = ("suspended", "cancelled")
+# Roles that work across tenants are not locked out by their own tenant's status
+PLATFORM_ROLES = ("superadmin", "saas_admin")
+# Revocations older than the longest token lifetime can no longer match a live token
+REVOCATION_RETENTION = dt.timedelta(days=2)
+
+
+class AccessTable:
+    """
+    Example:
+        # per request (get_current_user does this)
+        reason = access_table.denies(claims)
+
+        # in a write path
+        t.status = "suspended"
+        await access_table.bump(s)
+        await s.commit()
+        await access_table.changed()
+    """
+
+    def __init__(self, poll_seconds: float) -> None:
+        self.poll_seconds = poll_seconds
+        self.version = -1
+        self.refreshes = 0
+        self._blocked_tenants: frozenset[str] = frozenset()
+        self._revoked_before: dict[str, int] = {}  # subject id -> tokens with iat < this are revoked
+        self._lock = asyncio.Lock()
+        self._tasks: list[asyncio.Task] = []
+        self._redis = None
+
+    # --- per request -----------------------------------------------------
+
+    def denies(self, claims) -> Optional[str]:
+        """None if the claims may be used, else "suspended" or "revoked"."""
+        if claims.tenant_id in self._blocked_tenants and claims.role not in PLATFORM_ROLES:
+            return "suspended"
+        revoked = self._revoked_before
+        if revoked and (claims.iat < revoked.get(claims.sub, 0) or claims.iat < revoked.get(claims.tenant_id, 0)):
+            return "revoked"
+        return None
+
+    # --- loading ---------------------------------------------------------
+
+    async def refresh(self) -> None:
+        """Reload the whole table; it is small (blocked tenants + recent revocations)."""
+        async with self._lock:
+            cutoff = dt.datetime.now(dt.timezone.utc) - REVOCATION_RETENTION
+            async with async_session() as session:
+                version = await session.scalar(select(AuthState.version).where(AuthState.id == 1))
+                blocked = (await session.scalars(
+                    select(Tenant.id).where(or_(Tenant.status.in_(BLOCKED_STATUSES), Tenant.is_active.is_(False)))
+                )).all()
+                revoked = (await session.execute(
+                    select(TokenRevocation.subject_id, TokenRevocation.revoked_before)
+                    .where(TokenRevocation.revoked_before > cutoff)
+                )).all()
+            self._blocked_tenants = frozenset(str(tenant_id) for tenant_id in blocked)
+            self._revoked_before = {str(subject): int(before.timestamp()) for subject, before in revoked}
+            self.version = version or 0
+            self.refreshes += 1
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error("access table refresh failed: %s", e)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                async with async_session() as session:
+                    version = await session.scalar(select(AuthState.version).where(AuthState.id == 1))
+            except Exception as e:
+                logger.warning("access table poll failed: %s", e)
+                continue
+            if (version or 0) != self.version:
+                await self._refresh_quietly()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(ACCESS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message" and int(message["data"]) != self.version:
+                        await self._refresh_quietly()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("access channel listener failed, retrying: %s", e)
+                await asyncio.sleep(self.poll_seconds)
+
+    async def start(self) -> None:
+        """Load the table and keep it current; call once per worker at startup."""
+        await self._refresh_quietly()
+        if settings.REDIS_URL:
+            if aioredis is None:
+                logger.warning("REDIS_URL is set but the 'redis' package is not installed; "
+                               "access changes propagate by polling only")
+            else:
+                self._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+                self._tasks.append(asyncio.create_task(self._listen()))
+        self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    # --- writers ---------------------------------------------------------
+
+    async def bump(self, session: AsyncSession) -> None:
+        """Call inside the writing transaction, before commit."""
+        await session.execute(update(AuthState).where(AuthState.id == 1).values(version=AuthState.version + 1))
+
+    async def changed(self) -> None:
+        """Call after the write has committed."""
+        await self._refresh_quietly()
+        if self._redis is not None:
+            try:
+                await self._redis.publish(ACCESS_CHANNEL, self.version)
+            except Exception as e:
+                logger.error("access change publish failed: %s", e)
+
+    async def revoke(self, session: AsyncSession, subject_id: uuid.UUID, kind: str) -> None:
+        """
+        Revoke every token issued so far for a user (kind="user") or a whole
+        tenant (kind="tenant"). Call before commit, then changed() after.
+        """
+        # Token iat has one-second resolution: revoke through the current second
+        before = dt.datetime.fromtimestamp(int(time.time()) + 1, dt.timezone.utc)
+        await session.execute(
+            pg_insert(TokenRevocation)
+            .values(subject_id=subject_id, kind=kind, revoked_before=before)
+            .on_conflict_do_update(index_elements=[TokenRevocation.subject_id], set_={"revoked_before": before})
+        )
+        await session.execute(
+            delete(TokenRevocation).where(
+                TokenRevocation.revoked_before < dt.datetime.now(dt.timezone.utc) - REVOCATION_RETENTION
+            )
+        )
+        await self.bump(session)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "version": self.version,
+            "refreshes": self.refreshes,
+            "blocked_tenants": len(self._blocked_tenants),
+            "revocations": len(self._revoked_before),
+        }
+
+
+access_table = AccessTable(settings.ACCESS_POLL_SECONDS)
@@ -0,0 +1,152 @@
+# apps/core/cache.py
+"""
+Per-tenant result cache with write-driven invalidation.
+
+Every (namespace, tenant) pair carries a generation counter. Readers note the
+generation before computing a result and store the result under it; writers bump
+the generation *after* their transaction commits. A result computed from
+pre-write data is therefore filed under a generation nobody reads again, so
+invalidation stays exact even when a recompute races a write. The TTL only
+bounds how long an idle entry lingers.
+
+Generations must be shared by every worker that serves the tenant: a bump in one
+worker's memory leaves the others serving stale results. So the cache only runs
+with REDIS_URL set, or with CACHE_IN_PROCESS for a single-worker deployment;
+otherwise it is off (a warning is logged at startup) and every read recomputes.
+"""
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Optional
+
+from apps.core.config import settings
+from apps.core.logging import logger
+
+try:  # optional dependency, only needed when REDIS_URL is set
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+
+class _MemoryBackend:
+    """Single-process backend: one slot per (namespace, tenant)."""
+
+    def __init__(self) -> None:
+        self._versions: dict[str, int] = {}
+        self._entries: dict[str, tuple[int, float, Any]] = {}
+
+    async def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    async def get(self, key: str, version: int) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_version, expires_at, value = entry
+        if stored_version != version or expires_at <= time.monotonic():
+            return None
+        return value
+
+    async def set(self, key: str, version: int, value: Any, ttl: int) -> None:
+        # Drop results computed against a generation that has since moved on
+        if self._versions.get(key, 0) != version:
+            return
+        self._entries[key] = (version, time.monotonic() + ttl, value)
+
+    async def bump(self, key: str) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._entries.pop(key, None)
+
+
+class _RedisBackend:
+    """Shared backend: generation counter plus generation-suffixed result keys."""
+
+    def __init__(self, url: str) -> None:
+        self._redis = aioredis.from_url(url, decode_responses=True)
+
+    async def version(self, key: str) -> int:
+        return int(await self._redis.get(f"{key}:gen") or 0)
+
+    async def get(self, key: str, version: int) -> Any:
+        raw = await self._redis.get(f"{key}:v{version}")
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, version: int, value: Any, ttl: int) -> None:
+        await self._redis.set(f"{key}:v{version}", json.dumps(value), ex=ttl)
+
+    async def bump(self, key: str) -> None:
+        await self._redis.incr(f"{key}:gen")
+
+
+def _make_backend():
+    if settings.REDIS_URL:
+        if aioredis is None:
+            logger.warning("REDIS_URL is set but the 'redis' package is not installed")
+        else:
+            return _RedisBackend(settings.REDIS_URL)
+    return _MemoryBackend()
+
+
+_backend = _make_backend()
+# In-process generations are only exact when this is the only worker
+enabled = isinstance(_backend, _RedisBackend) or settings.CACHE_IN_PROCESS
+
+
+def startup_warning() -> Optional[str]:
+    if enabled:
+        return None
+    return ("result caches are off: no shared REDIS_URL backend, and CACHE_IN_PROCESS is not set "
+            "(set it only when running a single worker)")
+
+
+class TenantCache:
+    """
+    Example:
+        cached, version = await dashboard_cache.get(tenant_id)
+        if cached is None:
+            cached = await compute(...)
+            await dashboard_cache.set(tenant_id, version, cached)
+
+        # in a write path, after session.commit():
+        await dashboard_cache.invalidate(tenant_id)
+    """
+
+    def __init__(self, namespace: str, ttl: int, backend=None) -> None:
+        self.namespace = namespace
+        self.ttl = ttl if backend is not None or enabled else 0
+        self.backend = backend or _backend
+
+    def _key(self, tenant_id: Any) -> str:
+        return f"as360:{self.namespace}:{tenant_id}"
+
+    async def get(self, tenant_id: Any) -> tuple[Optional[Any], int]:
+        """Return (cached value or None, generation to pass back to set())."""
+        key = self._key(tenant_id)
+        try:
+            version = await self.backend.version(key)
+            return await self.backend.get(key, version), version
+        except Exception as e:
+            logger.warning("cache get failed for %s: %s", key, e)
+            return None, -1
+
+    async def set(self, tenant_id: Any, version: int, value: Any) -> None:
+        if self.ttl <= 0 or version < 0:
+            return
+        key = self._key(tenant_id)
+        try:
+            await self.backend.set(key, version, value, self.ttl)
+        except Exception as e:
+            logger.warning("cache set failed for %s: %s", key, e)
+
+    async def invalidate(self, tenant_id: Any) -> None:
+        """Call after the write has committed."""
+        key = self._key(tenant_id)
+        try:
+            await self.backend.bump(key)
+        except Exception as e:
+            logger.error("cache invalidation failed for %s: %s", key, e)
+
+
+# Dashboard stats, invalidated by invoice, customer and inventory writes
+dashboard_cache = TenantCache("dashboard", ttl=settings.DASHBOARD_CACHE_TTL)
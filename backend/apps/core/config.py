@@ -1,7 +1,7 @@
 # apps/core/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl, field_validator
-from typing import List, Union
+from typing import List, Literal, Union
 
 
 class Settings(BaseSettings):
@@ -15,8 +15,79 @@ class Settings(BaseSettings):
     JWT_SECRET: str
 
     # --- Optional / Nice-to-have ---
+
+    # SQLAlchemy pool per worker process: steady connections, burst connections above
+    # that, seconds to wait for a free one, max connection age, liveness check on checkout
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Connections opened during startup, before the worker takes traffic (capped at DB_POOL_SIZE)
+    DB_POOL_PREWARM: int = 10
+
+    # Read replica for reporting / list endpoints (get_read_session). Reads go back to the
+    # primary while the replica lags more than DB_READ_MAX_LAG_SECONDS or is unreachable;
+    # lag is re-checked every DB_READ_LAG_CHECK_SECONDS. Unset: everything reads the primary.
+    DB_READ_URL: str | None = None
+    DB_READ_MAX_LAG_SECONDS: float = 2
+    DB_READ_LAG_CHECK_SECONDS: float = 1
+
     REDIS_URL: str | None = None
 
+    # Seconds a cached /dashboard/stats result may be served (0 disables the cache). Caching
+    # needs REDIS_URL, or CACHE_IN_PROCESS=true when exactly one worker process serves the API
+    DASHBOARD_CACHE_TTL: int = 30
+    CACHE_IN_PROCESS: bool = False
+
+    # Sale quantity above stock on hand: "reject", "clamp" (floor at 0) or "backorder", for every sale
+    STOCK_POLICY: Literal["reject", "clamp", "backorder"] = "clamp"
+
+    # Invoice numbers reserved per round trip by each worker (unused ones become gaps)
+    INVOICE_NUMBER_BLOCK_SIZE: int = 50
+
+    # POST /invoices/bulk: rows per request, and rows per committed chunk
+    BULK_INVOICE_MAX_ROWS: int = 10000
+    BULK_INVOICE_CHUNK_SIZE: int = 500
+
+    # How long a stored Idempotency-Key response is replayed, and how long an in-flight
+    # claim blocks retries if it is never finished (keep above the slowest POST)
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_LEASE_SECONDS: int = 300
+
+    # Verified access tokens kept per worker so repeat requests skip HMAC + validation (0 disables)
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+
+    # bcrypt threads per worker, and in-flight logins per worker before /auth/login answers 503
+    BCRYPT_THREADS: int = 2
+    LOGIN_MAX_CONCURRENT: int = 16
+
+    # Login: tenant code/UUID -> tenant id entries per worker, and their lifetime in seconds
+    TENANT_LOOKUP_CACHE_SIZE: int = 5000
+    TENANT_LOOKUP_CACHE_TTL: int = 300
+
+    # Seconds between auth_state version polls that keep tenant suspensions / token revocations current
+    ACCESS_POLL_SECONDS: int = 5
+
+    # GET /metrics (Prometheus text), Server-Timing headers and SQL statement counting. Off by
+    # default: they expose per-route latency and pool data. With METRICS_TOKEN set, /metrics
+    # requires "Authorization: Bearer <METRICS_TOKEN>"; without it, only bind it internally
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str | None = None
+
+    # Per-request SQL budgets / N+1 detection: "off", "warn" (log) or "raise" (tests)
+    QUERY_BUDGET_MODE: str = "off"
+
+    # Invoice PDFs: content-addressed cache directory, and render processes per API worker
+    PDF_CACHE_DIR: str = "var/pdf"
+    PDF_RENDER_WORKERS: int = 2
+
+    # Month-end statement PDFs: {STATEMENT_DIR}/{tenant}/{YYYY-MM}/{customer}.pdf
+    STATEMENT_DIR: str = "var/statements"
+
+    # GET /reports/tax-summary: ranges longer than this many days use the NumPy columnar engine
+    TAX_SUMMARY_COLUMNAR_DAYS: int = 93
+
     # Accept either a single URL or a comma-separated list
     CORS_ORIGINS: Union[str, List[AnyHttpUrl]] = "http://localhost:3000"
 
@@ -1,4 +1,4 @@
-from contextvars import ContextVar
+from contextvars import ContextVar, Token
 from typing import Optional
 import uuid
 
@@ -8,8 +8,12 @@ _tenant_id_ctx: ContextVar[Optional[uuid.UUID]] = ContextVar("tenant_id", defaul
 def get_tenant_id() -> Optional[uuid.UUID]:
     return _tenant_id_ctx.get()
 
-def set_tenant_id(tenant_id: uuid.UUID) -> None:
-    _tenant_id_ctx.set(tenant_id)
+def set_tenant_id(tenant_id: uuid.UUID) -> Token:
+    return _tenant_id_ctx.set(tenant_id)
 
-def reset_tenant_id() -> None:
-    _tenant_id_ctx.set(None)
+def reset_tenant_id(token: Optional[Token] = None) -> None:
+    # With the token from set_tenant_id the previous value is restored exactly
+    if token is not None:
+        _tenant_id_ctx.reset(token)
+    else:
+        _tenant_id_ctx.set(None)
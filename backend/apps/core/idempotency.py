@@ -0,0 +1,255 @@
+# apps/core/idempotency.py
+"""
+Idempotency-Key support for POST endpoints.
+
+Routers opt in with `APIRouter(..., route_class=IdempotentRoute)`. A POST that
+carries an `Idempotency-Key` header is claimed in the idempotency_keys table
+before the handler runs and its response is stored afterwards; a retry with the
+same key (per tenant) gets the stored response back without touching the write
+path again. Requests without the header behave exactly as before.
+
+    - same key, same request, finished   -> stored response, Idempotent-Replayed: true
+    - same key, same request, in flight  -> 409
+    - same key, different request body   -> 422
+    - handler failed with 5xx / raised   -> claim released so the client can retry
+    - response cannot be stored (no body, e.g. streamed, or not text)
+      or storing it failed               -> claim released likewise
+    - handler committed, but its response
+      was never stored                   -> 409, the write is not run again
+
+Every commit the handler makes on the primary also marks the claim committed,
+in the same transaction, so its writes and the record that they happened
+cannot come apart: a committed claim is never released or taken over, even if
+the process dies before the response is stored. An uncommitted claim is only
+held for IDEMPOTENCY_LEASE_SECONDS; one left behind by a worker that died
+mid-request (or could not release it) therefore blocks retries for the lease
+at most, after which the next retry takes it over. Committed claims and stored
+responses live IDEMPOTENCY_TTL_HOURS.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import time
+import uuid
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from contextvars import ContextVar
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+from apps.core.config import settings
+from apps.core.db import async_session, engine
+from apps.core.logging import logger
+from apps.core.querybudget import uncounted
+from apps.core.security import authenticate
+from apps.services.idempotency.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+PURGE_INTERVAL_SECONDS = 600
+
+
+_last_purge = 0.0
+
+# (tenant_id, key) of the claim the running handler holds
+_held: ContextVar[Optional[tuple[uuid.UUID, str]]] = ContextVar("idempotency_claim", default=None)
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_committed(session: Session) -> None:
+    """Record the handler's commit in its own transaction"""
+    held = _held.get()
+    if held is None or session.bind is not engine.sync_engine:
+        return
+    tenant_id, key = held
+    now = dt.datetime.utcnow()
+    with uncounted():
+        session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key)
+            .values(committed_at=now, expires_at=now + dt.timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS))
+        )
+
+
+async def _purge_expired() -> None:
+    """Evict expired keys, at most once per PURGE_INTERVAL_SECONDS per process."""
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = now
+    async with async_session() as s:
+        await s.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < dt.datetime.utcnow()))
+        await s.commit()
+
+
+async def _claim(tenant_id: uuid.UUID, key: str, fingerprint: str) -> Optional[IdempotencyKey]:
+    """
+    Try to claim the key. Returns None when this request now owns it, otherwise
+    the existing (live) row. Expired rows, including in-flight claims whose
+    lease has run out, are taken over in the same statement.
+    """
+    now = dt.datetime.utcnow()
+    stmt = pg_insert(IdempotencyKey).values(
+        tenant_id=tenant_id,
+        key=key,
+        fingerprint=fingerprint,
+        expires_at=now + dt.timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.tenant_id, IdempotencyKey.key],
+        set_={
+            "fingerprint": stmt.excluded.fingerprint,
+            "status_code": None,
+            "content_type": None,
+            "response_body": None,
+            "committed_at": None,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at < now,
+    ).returning(IdempotencyKey.key)
+
+    async with async_session() as s:
+        claimed = (await s.execute(stmt)).first()
+        await s.commit()
+        if claimed:
+            return None
+        res = await s.execute(
+            select(IdempotencyKey).where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key)
+        )
+        return res.scalar_one_or_none()
+
+
+def _stored_body(response: Optional[Response]) -> Optional[str]:
+    """The body to replay for this response, or None if it must not be stored"""
+    if response is None or response.status_code >= 500:
+        return None
+    body = getattr(response, "body", None)  # streamed and file responses have none
+    if body is None:
+        return None
+    try:
+        return bytes(body).decode()
+    except UnicodeDecodeError:
+        return None
+
+
+async def _finish(tenant_id: uuid.UUID, key: str, response: Optional[Response]) -> None:
+    """Store the response for replay, or release the claim if it cannot be replayed"""
+    body = _stored_body(response)
+    if body is None:
+        await _release(tenant_id, key)
+        return
+    async with async_session() as s:
+        await s.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key)
+            .values(
+                status_code=response.status_code,
+                content_type=response.headers.get("content-type"),
+                response_body=body,
+                expires_at=dt.datetime.utcnow() + dt.timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+            )
+        )
+        await s.commit()
+
+
+async def _release(tenant_id: uuid.UUID, key: str) -> None:
+    """Drop the claim so the client can retry, unless the handler's writes committed"""
+    async with async_session() as s:
+        await s.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.tenant_id == tenant_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.committed_at.is_(None),
+            )
+        )
+        await s.commit()
+
+
+def _tenant_from_request(request: Request) -> Optional[uuid.UUID]:
+    """
+    The caller's tenant, with the same checks as get_current_user (so a revoked
+    token or suspended dealer is refused before anything is replayed), or None
+    without a bearer token or tenant.
+    """
+    auth = request.headers.get("authorization", "")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    claims = authenticate(token)
+    try:
+        return uuid.UUID(claims.tenant_id)
+    except ValueError:  # not a tenant user: nothing to key on
+        return None
+
+
+class IdempotentRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(HEADER)
+            if request.method != "POST" or not key:
+                return await handler(request)
+            if len(key) > 255:
+                raise HTTPException(status_code=400, detail=f"{HEADER} too long")
+
+            # Requests without a bearer token fall through and get the usual 401
+            tenant_id = _tenant_from_request(request)
+            if tenant_id is None:
+                return await handler(request)
+
+            body = await request.body()  # cached on the request for the handler
+            fingerprint = hashlib.sha256(
+                request.method.encode() + b" " + request.url.path.encode() + b"\n" + body
+            ).hexdigest()
+
+            # Bookkeeping is the same for every route: keep it out of their query budgets
+            with uncounted():
+                existing = await _claim(tenant_id, key, fingerprint)
+            if existing is not None:
+                if existing.fingerprint != fingerprint:
+                    raise HTTPException(status_code=422, detail=f"{HEADER} reused with a different request")
+                if existing.status_code is None and existing.committed_at is not None:
+                    raise HTTPException(
+                        status_code=409,
+                        detail="A request with this idempotency key was already processed; its response is not available",
+                    )
+                if existing.status_code is None:
+                    raise HTTPException(status_code=409, detail="A request with this idempotency key is in progress")
+                return Response(
+                    content=existing.response_body,
+                    status_code=existing.status_code,
+                    media_type=existing.content_type,
+                    headers={"Idempotent-Replayed": "true"},
+                )
+
+            response = None
+            held = _held.set((tenant_id, key))
+            try:
+                response = await handler(request)
+                return response
+            finally:
+                _held.reset(held)
+                with uncounted():
+                    try:
+                        await _finish(tenant_id, key, response)
+                    except Exception as e:
+                        logger.error("idempotency bookkeeping failed for key %s, releasing it: %s", key, e)
+                        try:
+                            await _release(tenant_id, key)
+                        except Exception as e:
+                            # The claim's lease still expires on its own
+                            logger.error("idempotency release failed for key %s: %s", key, e)
+                    try:
+                        await _purge_expired()
+                    except Exception as e:
+                        logger.warning("idempotency purge failed: %s", e)
+
+        return idempotent_handler
@@ -0,0 +1,210 @@
+# apps/core/metrics.py
+"""
+Per-route request and database metrics, in process and dependency-free.
+
+- MetricsMiddleware (pure ASGI, outermost) times every HTTP request, tracks the
+  in-flight count, and adds a Server-Timing header:
+
+      Server-Timing: app;dur=12.4, db;dur=3.1;desc="4 queries"
+
+- instrument_engine() hooks SQLAlchemy cursor events on the engine and charges
+  each statement's count and time to the request that issued it (a ContextVar,
+  which SQLAlchemy's async greenlets share with the calling task).
+- render() produces the Prometheus text exposition served at GET /metrics:
+  latency histograms and SQL totals per (method, route template, status), plus
+  gauges from registered stats callbacks (caches, login gate, ...).
+
+Labels use the route template ("/api/invoices/{invoice_id}"), so cardinality is
+bounded by the number of routes. The per-request cost is a few perf_counter()
+calls, one bisect and a dict lookup. Each worker process keeps its own numbers;
+scrape every worker (or sum by instance) as with any per-process exporter.
+"""
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    __slots__ = ("started", "statements", "db_seconds")
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+class _RouteSeries:
+    """Everything recorded for one (method, route, status)"""
+    __slots__ = ("latency", "latency_sum", "statements", "statements_sum", "db_seconds", "count")
+
+    def __init__(self) -> None:
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)  # last slot is +Inf
+        self.latency_sum = 0.0
+        self.statements = [0] * (len(STATEMENT_BUCKETS) + 1)
+        self.statements_sum = 0
+        self.db_seconds = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self._series: dict[tuple[str, str, int], _RouteSeries] = {}
+        self._gauges: list[tuple[str, str, Callable[[], dict]]] = []
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route, status)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _RouteSeries()
+        series.latency[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        series.latency_sum += seconds
+        series.statements[bisect_left(STATEMENT_BUCKETS, stats.statements)] += 1
+        series.statements_sum += stats.statements
+        series.db_seconds += stats.db_seconds
+        series.count += 1
+
+    def register_gauges(self, prefix: str, help_text: str, collect: Callable[[], dict]) -> None:
+        """Expose each numeric value of collect() as gauge as360_{prefix}_{key}"""
+        self._gauges.append((prefix, help_text, collect))
+
+    def render(self) -> str:
+        lines = [
+            "# HELP as360_http_requests_in_flight HTTP requests currently being served",
+            "# TYPE as360_http_requests_in_flight gauge",
+            f"as360_http_requests_in_flight {self.in_flight}",
+        ]
+        series = sorted(self._series.items())
+
+        def labels(method: str, route: str, status: int) -> str:
+            route = route.replace("\\", "\\\\").replace('"', '\\"')
+            return f'method="{method}",route="{route}",status="{status}"'
+
+        lines += [
+            "# HELP as360_http_request_duration_seconds Request latency, first byte received to last byte sent",
+            "# TYPE as360_http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), s in series:
+            base = labels(method, route, status)
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, s.latency):
+                cumulative += n
+                lines.append(f'as360_http_request_duration_seconds_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'as360_http_request_duration_seconds_bucket{{{base},le="+Inf"}} {s.count}')
+            lines.append(f"as360_http_request_duration_seconds_sum{{{base}}} {s.latency_sum:.6f}")
+            lines.append(f"as360_http_request_duration_seconds_count{{{base}}} {s.count}")
+
+        lines += [
+            "# HELP as360_db_statements_per_request SQL statements executed per request",
+            "# TYPE as360_db_statements_per_request histogram",
+        ]
+        for (method, route, status), s in series:
+            base = labels(method, route, status)
+            cumulative = 0
+            for bound, n in zip(STATEMENT_BUCKETS, s.statements):
+                cumulative += n
+                lines.append(f'as360_db_statements_per_request_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'as360_db_statements_per_request_bucket{{{base},le="+Inf"}} {s.count}')
+            lines.append(f"as360_db_statements_per_request_sum{{{base}}} {s.statements_sum}")
+            lines.append(f"as360_db_statements_per_request_count{{{base}}} {s.count}")
+
+        lines += [
+            "# HELP as360_db_seconds_total Time spent executing SQL statements",
+            "# TYPE as360_db_seconds_total counter",
+        ]
+        for (method, route, status), s in series:
+            lines.append(f"as360_db_seconds_total{{{labels(method, route, status)}}} {s.db_seconds:.6f}")
+
+        for prefix, help_text, collect in self._gauges:
+            for key, value in collect().items():
+                if isinstance(value, (int, float)):
+                    name = f"as360_{prefix}_{key}"
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Charge every statement run on `engine` to the current request, if any"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("as360_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["as360_query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_seconds += time.perf_counter() - started
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        # after_cursor_execute does not fire for a failed statement
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("as360_query_start"):
+            conn.info["as360_query_start"].pop()
+
+
+class MetricsMiddleware:
+    """Register outermost so the timing covers the whole middleware stack."""
+
+    def __init__(self, app: ASGIApp, registry: MetricsRegistry = registry) -> None:
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(time.perf_counter())
+        token = _current.set(stats)
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - stats.started) * 1000
+                timing = (f'app;dur={elapsed_ms:.1f}, '
+                          f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries"')
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        self.registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            self.registry.in_flight -= 1
+            _current.reset(token)
+            route = scope.get("route")
+            self.registry.observe(
+                scope["method"],
+                getattr(route, "path", None) or UNMATCHED_ROUTE,
+                status_code,
+                time.perf_counter() - stats.started,
+                stats,
+            )
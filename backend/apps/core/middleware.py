@@ -1,25 +1,44 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 from apps.core.context import set_tenant_id, reset_tenant_id
 import uuid
 
-class TenantMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next) -> Response:
-        tenant_id_header = request.headers.get("X-Tenant-Id")
-        
-        if tenant_id_header:
-            try:
-                # Validate UUID format
-                tenant_uuid = uuid.UUID(tenant_id_header)
-                set_tenant_id(tenant_uuid)
-            except ValueError:
-                # Invalid UUID, ignore or raise? 
-                # For middleware, maybe just ignore and let dependency injection handle validation error if strict
-                pass
-        
+_TENANT_HEADER = b"x-tenant-id"
+
+
+class TenantMiddleware:
+    """
+    Pure ASGI middleware: binds the X-Tenant-Id header to the tenant ContextVar
+    for the duration of the request.
+
+    Unlike BaseHTTPMiddleware it adds no task or memory stream per request and
+    passes streaming responses straight through.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tenant_uuid = None
+        for name, value in scope["headers"]:
+            if name == _TENANT_HEADER:
+                try:
+                    # Validate UUID format
+                    tenant_uuid = uuid.UUID(value.decode("latin-1"))
+                except ValueError:
+                    # Invalid UUID: leave it unset and let dependencies reject the request if strict
+                    pass
+                break
+
+        if tenant_uuid is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = set_tenant_id(tenant_uuid)
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send)
         finally:
-            reset_tenant_id()
+            reset_tenant_id(token)
@@ -0,0 +1,155 @@
+# apps/core/querybudget.py
+"""
+Query budgets and N+1 detection, for development and tests.
+
+Endpoints declare how many SQL statements one request may issue:
+
+    @router.get("", response_model=list[VehicleOut])
+    @query_budget(1)
+    async def list_vehicles(...):
+
+With QUERY_BUDGET_MODE set to "warn" or "raise", QueryBudgetMiddleware
+records every statement executed on the engine during a request (statement
+text with bind placeholders and IN-list lengths folded, i.e. its "shape") and,
+when the response starts:
+
+- flags the request if it issued more statements than its route's budget;
+- flags any shape executed N_PLUS_ONE_THRESHOLD times or more, the signature of
+  a per-row query loop, whether or not the route declares a budget.
+
+"warn" logs the finding; "raise" raises QueryBudgetExceeded, which fails the
+request (and, under TestClient, the test). Both modes add an X-Query-Count
+header. With the default "off" nothing is installed and nothing is recorded.
+"""
+from __future__ import annotations
+
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.core.logging import logger
+
+MODES = ("off", "warn", "raise")
+N_PLUS_ONE_THRESHOLD = 3
+
+F = TypeVar("F", bound=Callable)
+
+
+def query_budget(max_statements: Optional[int], allow_repeats: bool = False) -> Callable[[F], F]:
+    """
+    Declare the most SQL statements one request to this endpoint may issue
+    (None: no limit). allow_repeats=True exempts endpoints that repeat a
+    statement on purpose, e.g. chunked bulk writes, from the N+1 check.
+    """
+    def decorate(endpoint: F) -> F:
+        endpoint.query_budget = max_statements
+        endpoint.query_repeats_ok = allow_repeats
+        return endpoint
+    return decorate
+
+
+def budget_of(endpoint: Callable) -> Optional[int]:
+    return getattr(endpoint, "query_budget", None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_PLACEHOLDERS = re.compile(r"\$\d+")
+_IN_LISTS = re.compile(r"IN \(\?(::\w+)?(, \?(::\w+)?)*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL text with bind placeholders and IN-list lengths folded away"""
+    return _IN_LISTS.sub("IN (?...)", _PLACEHOLDERS.sub("?", " ".join(statement.split())))
+
+
+class QueryLog:
+    __slots__ = ("statements",)
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        """(shape, times) for every statement shape run at least `threshold` times"""
+        counts = Counter(statement_shape(s) for s in self.statements)
+        return [(shape, n) for shape, n in counts.most_common() if n >= threshold]
+
+    def problems(self, endpoint: Optional[Callable]) -> list[str]:
+        found = []
+        budget = budget_of(endpoint)
+        if budget is not None and self.count > budget:
+            found.append(f"{self.count} SQL statements, budget is {budget}")
+        if not getattr(endpoint, "query_repeats_ok", False):
+            for shape, n in self.repeated():
+                found.append(f"possible N+1: executed {n} times: {shape[:300]}")
+        return found
+
+
+_current: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+
+
+@contextmanager
+def uncounted() -> Iterator[None]:
+    """Leave statements out of the request's log: fixed per-request overhead, not the endpoint's work"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Log every statement run on `engine` into the current request's QueryLog, if any"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        log = _current.get()
+        if log is not None:
+            log.statements.append(statement)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app: ASGIApp, mode: str = "warn") -> None:
+        if mode not in MODES:
+            raise ValueError(f"QUERY_BUDGET_MODE must be one of {MODES}")
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _current.set(log)
+
+        async def send_checked(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # The endpoint has finished by the time a (non-streaming) response starts
+                route = scope.get("route")
+                problems = log.problems(scope.get("endpoint"))
+                if problems:
+                    where = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+                    report = f"{where}: " + "; ".join(problems)
+                    if self.mode == "raise":
+                        raise QueryBudgetExceeded(report)
+                    logger.warning("query budget: %s", report)
+                message["headers"] = [*message.get("headers", ()), (b"x-query-count", str(log.count).encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_checked)
+        finally:
+            _current.reset(token)
@@ -1,15 +1,22 @@
 # apps/core/security.py
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
-from typing import Any, Callable, Optional
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, ConfigDict, ValidationError
 import bcrypt
 from apps.core.config import settings
+from apps.core.access import access_table
 
 # -----------------------------
 # Password hashing (bcrypt)
@@ -29,6 +36,50 @@ def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(pwd_bytes, hashed_bytes)
 
 
+# bcrypt costs ~250 ms of CPU and releases the GIL, so request handlers run it
+# on this small pool instead of the event loop. The pool size caps how many
+# hashes run at once per worker; further calls queue.
+_bcrypt_pool = ThreadPoolExecutor(max_workers=settings.BCRYPT_THREADS, thread_name_prefix="bcrypt")
+
+
+async def hash_password_async(plain: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, hash_password, plain)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, verify_password, plain, hashed)
+
+
+class _LoginGate:
+    """Backpressure for login bursts: past `limit` in-flight logins, fail fast with 503."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.active = 0
+        self.rejected = 0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        if self.active >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+
+    def stats(self) -> dict[str, int]:
+        return {"active": self.active, "limit": self.limit, "rejected": self.rejected}
+
+
+login_gate = _LoginGate(settings.LOGIN_MAX_CONCURRENT)
+
+
 # -----------------------------
 # JWT helpers
 # -----------------------------
@@ -37,11 +88,15 @@ JWT_EXPIRE_MIN = 60 * 24  # 24h default
 
 
 class UserClaims(BaseModel):
+    # Instances are shared between requests through the verified-token cache
+    model_config = ConfigDict(frozen=True)
+
     sub: str                # user id
     tenant_id: str
     role: str
     email: str
     exp: int
+    iat: int = 0
 
 
 def _now_utc() -> dt.datetime:
@@ -92,6 +147,73 @@ def create_jwt(
     )
 
 
+class _VerifiedTokenCache:
+    """
+    Bounded LRU of verified claims, keyed by SHA-256 of the raw token.
+
+    Only tokens that passed signature and claim validation are stored, and an
+    entry is dropped once its `exp` passes, so expired or tampered tokens take
+    the full decode path and fail exactly as before.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[bytes, UserClaims] = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[UserClaims]:
+        claims = self._entries.get(key)
+        if claims is None:
+            self.misses += 1
+            return None
+        # Same rule as PyJWT: the token is valid while now < exp
+        if time.time() >= claims.exp:
+            del self._entries[key]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, key: bytes, claims: UserClaims) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = claims
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+token_cache = _VerifiedTokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+def decode_access_token(token: str) -> UserClaims:
+    """Verify a token and return its claims; raises jwt.InvalidTokenError / ValidationError."""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(key)
+    if claims is None:
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[ALGORITHM])
+        claims = UserClaims(**payload)
+        token_cache.put(key, claims)
+    return claims
+
+
 # -----------------------------
 # Auth dependency
 # -----------------------------
@@ -104,18 +226,27 @@ async def get_current_user(
     if creds is None or not creds.scheme.lower() == "bearer":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return authenticate(creds.credentials)
 
-    token = creds.credentials
+
+def authenticate(token: str) -> UserClaims:
+    """Claims of a bearer token that may still be used; raises 401 / 403 HTTPException otherwise."""
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET,
-                             algorithms=[ALGORITHM])
-        claims = UserClaims(**payload)
-        # Optional: future place to check token revocation/tenant suspension, etc.
-        return claims
+        claims = decode_access_token(token)
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
 
+    # Tenant suspension / token revocation, from the in-process access table
+    denied = access_table.denies(claims)
+    if denied == "suspended":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Dealer account is suspended")
+    if denied == "revoked":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked")
+    return claims
+
 # -----------------------------
 # Role guard (use in routers)
 # -----------------------------
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import BigInteger, DateTime, Integer, String, ForeignKey, UUID
 from apps.core.db import Base, BaseMixin
+import datetime as dt
+import uuid
 
 class User(BaseMixin, Base):
     __tablename__ = "users"
@@ -26,3 +28,17 @@ class User(BaseMixin, Base):
     role: Mapped[str] = mapped_column(String(32), nullable=False, default="dealer_admin")
 
     tenant = relationship("Tenant", back_populates="users")
+
+
+class AuthState(Base):
+    """Bumped with every tenant suspension or token revocation, see apps.core.access"""
+    __tablename__ = "auth_state"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)  # single row, id = 1
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class TokenRevocation(Base):
+    __tablename__ = "token_revocations"
+    subject_id: Mapped[uuid.UUID] = mapped_column(UUID, primary_key=True)  # user id or tenant id
+    kind: Mapped[str] = mapped_column(String(10), nullable=False)  # "user" | "tenant"
+    revoked_before: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
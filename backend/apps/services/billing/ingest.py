@@ -0,0 +1,221 @@
+"""
+Bulk invoice ingestion for dealers migrating history from legacy DMS systems.
+
+Rows are processed in chunks, each in its own transaction. Per chunk the work is
+set-based: one upsert statement each for customers and vehicles (which also
+reads back the existing ones), one duplicate-number probe, multi-row inserts for
+invoices and items, one rollup upsert and one aggregate stock decrement,
+whatever the chunk size. Rows without a legacy number take the next number one
+by one from invoice_numbers, which costs a round trip (on its own connection)
+only when the worker's reserved block runs out, i.e. once per
+INVOICE_NUMBER_BLOCK_SIZE rows. A chunk that fails in the database is retried
+in halves until the failing rows are isolated, so a bad row costs about
+log2(chunk size) extra transactions.
+"""
+from typing import Any, Optional
+import datetime as dt
+import uuid
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.core.cache import dashboard_cache
+from apps.core.logging import logger
+from apps.services.billing.models import Invoice, InvoiceItem
+from apps.services.billing.numbering import invoice_numbers
+from apps.services.billing.pricing import price_basket
+from apps.services.billing.service import apply_rollup_deltas
+from apps.services.crm.service import normalize_vin, upsert_customers, upsert_vehicles
+from apps.services.inventory.service import decrement_stock, InsufficientStock, StockPolicy
+
+
+async def ingest_invoices(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    rows: list,
+    chunk_size: int,
+    stock_policy: Optional[StockPolicy] = "clamp"
+) -> list[dict]:
+    """
+    Ingest invoice rows (CreateInvoiceRequest-shaped, plus optional `number` and
+    `issued_at`) and return one result dict per row, in input order.
+
+    A chunk that fails as a whole (stock rejected under the 'reject' policy, a
+    constraint violation or any other database error, e.g. a value too long for
+    its column) is rolled back and retried in halves, each in its own
+    transaction, down to the single rows that fail: those are reported with
+    their own reason and every other row still commits. Earlier chunks stay
+    committed, and later chunks are still attempted. Pass stock_policy=None to
+    skip stock movements entirely.
+    """
+    results: list[Optional[dict]] = [None] * len(rows)
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = list(enumerate(rows[start:start + chunk_size], start))
+        for result in await _ingest_bisecting(session, tenant_id, chunk, stock_policy):
+            results[result["index"]] = result
+        await dashboard_cache.invalidate(tenant_id)
+
+    return results
+
+
+async def _ingest_bisecting(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    chunk: list[tuple[int, Any]],
+    stock_policy: Optional[StockPolicy]
+) -> list[dict]:
+    """Commit the chunk, or split a failing one until the failing rows are isolated."""
+    try:
+        results = await _ingest_chunk(session, tenant_id, chunk, stock_policy)
+        await session.commit()
+        return results
+    except InsufficientStock as e:
+        await session.rollback()
+        error = f"Insufficient stock for {len(e.shortfalls)} item(s)"
+    except DBAPIError as e:
+        await session.rollback()
+        logger.warning("bulk invoice rows %s-%s failed: %s", chunk[0][0], chunk[-1][0], e.orig)
+        error = "Constraint violation" if isinstance(e, IntegrityError) else "Database error"
+
+    if len(chunk) == 1:
+        return [{"index": chunk[0][0], "ok": False, "error": error}]
+    middle = len(chunk) // 2
+    return (
+        await _ingest_bisecting(session, tenant_id, chunk[:middle], stock_policy)
+        + await _ingest_bisecting(session, tenant_id, chunk[middle:], stock_policy)
+    )
+
+
+def _validate(row) -> Optional[str]:
+    if not row.customer_name:
+        return "Customer name is required"
+    if not row.items:
+        return "At least one item is required"
+    for item in row.items:
+        if item.product_id:
+            try:
+                uuid.UUID(item.product_id)
+            except ValueError:
+                return f"Invalid product_id: {item.product_id}"
+    return None
+
+
+def _to_naive_utc(value: Optional[dt.datetime]) -> dt.datetime:
+    if value is None:
+        return dt.datetime.utcnow()
+    if value.tzinfo is not None:
+        value = value.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+async def _ingest_chunk(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    chunk: list[tuple[int, Any]],
+    stock_policy: Optional[StockPolicy]
+) -> list[dict]:
+    results = []
+    valid = []
+    for index, row in chunk:
+        error = _validate(row)
+        if error:
+            results.append({"index": index, "ok": False, "error": error})
+        else:
+            valid.append((index, row))
+
+    # Legacy invoice numbers must not collide with existing ones or each other
+    wanted = [row.number for _, row in valid if row.number]
+    existing = set()
+    if wanted:
+        res = await session.execute(
+            select(Invoice.number).where(Invoice.tenant_id == tenant_id, Invoice.number.in_(wanted))
+        )
+        existing = set(res.scalars().all())
+    accepted = []
+    for index, row in valid:
+        if row.number and row.number in existing:
+            results.append({"index": index, "ok": False, "error": f"Duplicate invoice number: {row.number}"})
+            continue
+        if row.number:
+            existing.add(row.number)
+        accepted.append((index, row))
+
+    if not accepted:
+        return results
+
+    rows = [row for _, row in accepted]
+    customer_ids = await _resolve_customers(session, tenant_id, rows)
+    vehicle_ids = await _resolve_vehicles(session, tenant_id, rows, customer_ids)
+
+    invoices = []
+    invoice_items = []
+    rollup: dict[tuple[dt.date, str], tuple[int, Any]] = {}
+    stock_lines = []
+
+    for (index, row), customer_id, vehicle_id in zip(accepted, customer_ids, vehicle_ids):
+        basket = price_basket(row.items, prices_include_tax=row.prices_include_tax)
+        total_amount = basket.total
+        invoice_id = uuid.uuid4()
+        number = row.number or await invoice_numbers.next_number(tenant_id)
+        issued_at = _to_naive_utc(row.issued_at)
+        db_status = "paid" if row.status == "PAID" else "draft"
+
+        invoices.append({
+            "id": invoice_id,
+            "tenant_id": tenant_id,
+            "customer_id": customer_id,
+            "vehicle_id": vehicle_id,
+            "number": number,
+            "total_amount": float(total_amount),
+            "status": db_status,
+            "issued_at": issued_at
+        })
+        for item_data in basket.rows():
+            product_id = uuid.UUID(item_data["product_id"]) if item_data["product_id"] else None
+            invoice_items.append({
+                **item_data,
+                "id": uuid.uuid4(),
+                "invoice_id": invoice_id,
+                "product_id": product_id
+            })
+            if product_id:
+                stock_lines.append((product_id, item_data["qty"]))
+
+        key = (issued_at.date(), db_status)
+        count, amount = rollup.get(key, (0, 0))
+        rollup[key] = (count + 1, amount + total_amount)
+
+        results.append({"index": index, "ok": True, "id": str(invoice_id), "number": number})
+
+    await session.execute(insert(Invoice), invoices)
+    await session.execute(insert(InvoiceItem), invoice_items)
+    await apply_rollup_deltas(session, tenant_id, rollup)
+    if stock_policy:
+        await decrement_stock(session, tenant_id, stock_lines, policy=stock_policy)
+
+    return results
+
+
+async def _resolve_customers(session: AsyncSession, tenant_id: uuid.UUID, rows: list) -> list[uuid.UUID]:
+    """Find-or-create the chunk's customers in one upsert on (name, normalized phone)."""
+    return await upsert_customers(session, tenant_id, [
+        {"name": row.customer_name, "phone": row.mobile, "email": row.email}
+        for row in rows
+    ])
+
+
+async def _resolve_vehicles(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    rows: list,
+    customer_ids: list[uuid.UUID]
+) -> list[Optional[uuid.UUID]]:
+    """Find-or-create the chunk's vehicles in one upsert on the case-folded registration (Vehicle.vin)."""
+    ids = await upsert_vehicles(session, tenant_id, [
+        {"vin": row.vehicle_no, "customer_id": customer_id}
+        for row, customer_id in zip(rows, customer_ids)
+        if row.vehicle_no
+    ])
+    return [ids.get(normalize_vin(row.vehicle_no)) for row in rows]
@@ -1,6 +1,6 @@
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Numeric, UUID
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Date, Numeric, UUID, UniqueConstraint, Index, text
 from apps.core.db import Base
 import datetime as dt
 
@@ -10,12 +10,23 @@ class Invoice(Base):
     tenant_id: Mapped[str] = mapped_column(UUID, ForeignKey("tenants.id", ondelete="CASCADE"), index=True)
     customer_id: Mapped[str] = mapped_column(UUID, ForeignKey("customers.id", ondelete="SET NULL"), nullable=True, index=True)
     vehicle_id: Mapped[str] = mapped_column(UUID, ForeignKey("vehicles.id", ondelete="SET NULL"), nullable=True, index=True)
-    number: Mapped[str] = mapped_column(String(32), unique=True, index=True)
+    number: Mapped[str] = mapped_column(String(32), index=True)  # unique per tenant, see InvoiceSequence
     total_amount: Mapped[float] = mapped_column(Numeric(12,2), default=0)
     status: Mapped[str] = mapped_column(String(24), default="draft")  # draft, issued, paid, void
     issued_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
 
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "number", name="uq_invoices_tenant_number"),
+        # Backs keyset pagination of GET /invoices (ORDER BY issued_at DESC, id DESC)
+        Index("ix_invoices_tenant_issued_at_id", "tenant_id", text("issued_at DESC"), text("id DESC")),
+        # Same, filtered to one status (?status=PAID / PARTIAL)
+        Index(
+            "ix_invoices_tenant_status_issued_at_id",
+            "tenant_id", "status", text("issued_at DESC"), text("id DESC"),
+        ),
+    )
+
 class InvoiceItem(Base):
     __tablename__ = "invoice_items"
     id: Mapped[str] = mapped_column(UUID, primary_key=True)
@@ -25,7 +36,25 @@ class InvoiceItem(Base):
     qty: Mapped[int] = mapped_column(Integer, default=1)
     rate: Mapped[float] = mapped_column(Numeric(12,2), default=0)
     tax_rate: Mapped[float] = mapped_column(Numeric(5,2), default=0)  # percentage
-    amount: Mapped[float] = mapped_column(Numeric(12,2), default=0)  # qty * rate * (1 + tax_rate/100)
+    discount: Mapped[float] = mapped_column(Numeric(12,2), default=0)  # money off the line
+    taxable_value: Mapped[float] = mapped_column(Numeric(12,2), default=0)  # after discount, excluding tax
+    amount: Mapped[float] = mapped_column(Numeric(12,2), default=0)  # taxable_value + tax, see billing.pricing
+
+class DailySalesRollup(Base):
+    """Per-tenant, per-day, per-status invoice totals maintained alongside invoice writes"""
+    __tablename__ = "daily_sales_rollup"
+    tenant_id: Mapped[str] = mapped_column(UUID, ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True)  # UTC day of invoices.issued_at
+    status: Mapped[str] = mapped_column(String(24), primary_key=True)  # mirrors invoices.status
+    invoice_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_amount: Mapped[float] = mapped_column(Numeric(14,2), default=0)
+
+class InvoiceSequence(Base):
+    """Highest invoice number handed out per tenant and fiscal year (blocks are reserved ahead)"""
+    __tablename__ = "invoice_sequences"
+    tenant_id: Mapped[str] = mapped_column(UUID, ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    fiscal_year: Mapped[int] = mapped_column(Integer, primary_key=True)  # calendar year the FY starts in
+    last_value: Mapped[int] = mapped_column(Integer, default=0)
 
 class SubscriptionPlan(Base):
     __tablename__ = "subscription_plans"
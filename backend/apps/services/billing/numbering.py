@@ -0,0 +1,118 @@
+"""
+Per-tenant invoice number allocation.
+
+Numbers come from an invoice_sequences row per (tenant, fiscal year). Each worker
+reserves a block of numbers with a single autocommitted upsert and then hands
+them out from memory, so allocating a number costs no database round trip and
+holds no lock for the lifetime of the invoice transaction. Numbers reserved by a
+worker that exits unused are simply skipped: sequences are gap-tolerant, never
+duplicated.
+
+Format: "{prefix}/{fiscal year}/{sequence}", e.g. INV/2026-27/00042, where the
+prefix and the fiscal year start month come from the tenant row.
+"""
+from dataclasses import dataclass
+import asyncio
+import datetime as dt
+import uuid
+
+from sqlalchemy import select, case, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from apps.core.config import settings
+from apps.core.db import engine
+from apps.services.billing.models import InvoiceSequence
+from apps.services.dealers.models import Tenant
+
+DEFAULT_PREFIX = "INV"
+
+
+@dataclass
+class _Block:
+    prefix: str
+    fy_start_month: int
+    fiscal_year: int
+    next_value: int
+    last_value: int
+
+
+def fiscal_year_for(day: dt.date, start_month: int) -> int:
+    """Calendar year in which the fiscal year containing `day` starts."""
+    return day.year if day.month >= start_month else day.year - 1
+
+
+def format_invoice_number(prefix: str, fiscal_year: int, start_month: int, seq: int) -> str:
+    if start_month == 1:
+        fy_label = str(fiscal_year)
+    else:
+        fy_label = f"{fiscal_year}-{(fiscal_year + 1) % 100:02d}"
+    return f"{prefix}/{fy_label}/{seq:05d}"
+
+
+class InvoiceNumberAllocator:
+    def __init__(self, block_size: int) -> None:
+        self.block_size = block_size
+        self._blocks: dict[uuid.UUID, _Block] = {}
+        self._locks: dict[uuid.UUID, asyncio.Lock] = {}
+
+    async def next_number(self, tenant_id: uuid.UUID) -> str:
+        today = dt.datetime.utcnow().date()
+        lock = self._locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            block = self._blocks.get(tenant_id)
+            if (
+                block is None
+                or block.next_value > block.last_value
+                or fiscal_year_for(today, block.fy_start_month) != block.fiscal_year
+            ):
+                block = await self._reserve(tenant_id, today)
+                self._blocks[tenant_id] = block
+            seq = block.next_value
+            block.next_value += 1
+        return format_invoice_number(block.prefix, block.fiscal_year, block.fy_start_month, seq)
+
+    async def _reserve(self, tenant_id: uuid.UUID, today: dt.date) -> _Block:
+        """Reserve the next block_size numbers for the tenant's current fiscal year."""
+        size = self.block_size
+        start_month = Tenant.fiscal_year_start_month
+        fiscal_year = case(
+            (start_month <= today.month, today.year),
+            else_=today.year - 1,
+        )
+        stmt = pg_insert(InvoiceSequence).from_select(
+            ["tenant_id", "fiscal_year", "last_value"],
+            select(Tenant.id, fiscal_year, literal(size)).where(Tenant.id == tenant_id),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[InvoiceSequence.tenant_id, InvoiceSequence.fiscal_year],
+            set_={"last_value": InvoiceSequence.last_value + size},
+        ).returning(
+            InvoiceSequence.fiscal_year,
+            InvoiceSequence.last_value,
+            select(Tenant.invoice_prefix).where(Tenant.id == tenant_id).scalar_subquery(),
+            select(Tenant.fiscal_year_start_month).where(Tenant.id == tenant_id).scalar_subquery(),
+        )
+
+        # Autocommit on its own connection: the sequence row lock is released
+        # immediately instead of being held until the invoice commits.
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            row = (await conn.execute(stmt)).one_or_none()
+        if row is None:
+            raise LookupError(f"Tenant {tenant_id} not found")
+
+        fy, last_value, prefix, fy_start_month = row
+        return _Block(
+            prefix=prefix or DEFAULT_PREFIX,
+            fy_start_month=fy_start_month or 4,
+            fiscal_year=fy,
+            next_value=last_value - size + 1,
+            last_value=last_value,
+        )
+
+    def forget(self, tenant_id: uuid.UUID) -> None:
+        """Drop the in-memory block, e.g. after the tenant's numbering format changed."""
+        self._blocks.pop(tenant_id, None)
+
+
+invoice_numbers = InvoiceNumberAllocator(settings.INVOICE_NUMBER_BLOCK_SIZE)
@@ -0,0 +1,206 @@
+"""
+Invoice pricing: a whole basket in one call.
+
+All arithmetic runs on integer paise (and basis points for percentages), so a
+basket prices identically on every run and every machine, and the per-line cost
+is a handful of int operations instead of a chain of Decimal constructions.
+Every input value is converted exactly once and Decimals are only built on
+the way out. Rounding is half-up, per line, to the paisa, and invoice totals
+are sums of the rounded lines, so the lines on the invoice always add up to
+its total.
+
+Per line, with qty, rate, discount_pct and tax_rate:
+
+    gross    = qty * rate
+    discount = gross * discount_pct / 100
+    net      = gross - discount
+    exclusive prices: taxable = net,                         tax = taxable * tax_rate / 100
+    inclusive prices: taxable = net * 100 / (100 + tax_rate), tax = net - taxable
+    amount   = taxable + tax
+
+Benchmark: python -m apps.tools.bench_pricing
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Iterable, Optional
+
+_HUNDREDTH = Decimal("0.01")
+
+
+def _to_hundredths(value: Any) -> int:
+    """Money or percentage -> integer hundredths (paise / basis points), rounded half-up"""
+    if isinstance(value, float):
+        # Fast path: a float that is already a whole number of paise (what the API sends)
+        scaled = value * 100
+        nearest = round(scaled)
+        if -1e-6 < scaled - nearest < 1e-6:
+            return nearest
+    elif isinstance(value, int):
+        return value * 100
+    return int((value if isinstance(value, Decimal) else Decimal(str(value))).quantize(_HUNDREDTH, ROUND_HALF_UP).scaleb(2))
+
+
+def _div_round(numerator: int, denominator: int) -> int:
+    """numerator / denominator rounded half away from zero, in integers; the only rounding step"""
+    if numerator >= 0:
+        return (2 * numerator + denominator) // (2 * denominator)
+    return -((-2 * numerator + denominator) // (2 * denominator))
+
+
+def _money(paise: int) -> Decimal:
+    return Decimal(paise) * _HUNDREDTH  # exact, and cheaper than scaleb()
+
+
+# Tax rates and discounts come from a handful of slabs
+_PERCENT_CACHE: dict[int, Decimal] = {}
+
+
+def _percent(bp: int) -> Decimal:
+    value = _PERCENT_CACHE.get(bp)
+    if value is None:
+        value = _PERCENT_CACHE[bp] = _money(bp)
+    return value
+
+
+@dataclass(slots=True)
+class PricedLine:
+    """One priced line; money is held in paise, percentages in basis points"""
+    product_id: Optional[str]
+    name: str
+    qty: int
+    rate_paise: int          # unit price as entered (tax inclusive when the basket is)
+    discount_bp: int
+    tax_bp: int
+    discount_paise: int      # money off this line
+    taxable_paise: int
+    tax_paise: int
+
+    @property
+    def rate(self) -> Decimal:
+        return _money(self.rate_paise)
+
+    @property
+    def discount_pct(self) -> Decimal:
+        return _percent(self.discount_bp)
+
+    @property
+    def tax_rate(self) -> Decimal:
+        return _percent(self.tax_bp)
+
+    @property
+    def discount(self) -> Decimal:
+        return _money(self.discount_paise)
+
+    @property
+    def taxable_value(self) -> Decimal:
+        return _money(self.taxable_paise)
+
+    @property
+    def tax(self) -> Decimal:
+        return _money(self.tax_paise)
+
+    @property
+    def amount(self) -> Decimal:
+        """taxable_value + tax, what the customer pays for the line"""
+        return _money(self.taxable_paise + self.tax_paise)
+
+
+@dataclass(slots=True)
+class TaxBand:
+    tax_rate: Decimal
+    lines: int
+    taxable_value: Decimal
+    tax: Decimal
+
+
+@dataclass(slots=True)
+class PricedBasket:
+    lines: list[PricedLine]
+    tax_breakdown: list[TaxBand] = field(default_factory=list)  # ordered by tax_rate
+    gross: Decimal = Decimal("0.00")          # before discounts
+    discount: Decimal = Decimal("0.00")
+    taxable_value: Decimal = Decimal("0.00")
+    tax: Decimal = Decimal("0.00")
+    total: Decimal = Decimal("0.00")
+
+    def rows(self) -> list[dict]:
+        """Column values for InvoiceItem, one dict per line"""
+        return [{
+            "product_id": line.product_id,
+            "name": line.name,
+            "qty": line.qty,
+            "rate": _money(line.rate_paise),
+            "tax_rate": _percent(line.tax_bp),
+            "discount": _money(line.discount_paise),
+            "taxable_value": _money(line.taxable_paise),
+            "amount": _money(line.taxable_paise + line.tax_paise),
+        } for line in self.lines]
+
+
+def price_basket(items: Iterable, prices_include_tax: bool = False) -> PricedBasket:
+    """
+    Price a basket of lines.
+
+    `items` are objects with qty, rate, tax_rate and optionally name,
+    product_id and discount_pct (InvoiceItemRequest-shaped); numbers may be
+    int, float, Decimal or numeric strings.
+    """
+    lines = []
+    bands: dict[int, list[int]] = {}
+    gross_total = discount_total = 0
+    # Percentages repeat across lines: convert each distinct value once
+    percent: dict[Any, int] = {}
+
+    for item in items:
+        qty = int(item.qty)
+        rate = _to_hundredths(item.rate)
+        tax_raw = item.tax_rate
+        tax_bp = percent.get(tax_raw)
+        if tax_bp is None:
+            tax_bp = percent[tax_raw] = _to_hundredths(tax_raw)
+        disc_raw = getattr(item, "discount_pct", 0)
+        disc_bp = percent.get(disc_raw)
+        if disc_bp is None:
+            disc_bp = percent[disc_raw] = _to_hundredths(disc_raw or 0)
+
+        gross = qty * rate
+        discount = _div_round(gross * disc_bp, 10000) if disc_bp else 0
+        net = gross - discount
+        if prices_include_tax:
+            taxable = _div_round(net * 10000, 10000 + tax_bp) if tax_bp else net
+            tax = net - taxable
+        else:
+            taxable = net
+            tax = _div_round(taxable * tax_bp, 10000) if tax_bp else 0
+
+        gross_total += gross
+        discount_total += discount
+        band = bands.get(tax_bp)
+        if band is None:
+            band = bands[tax_bp] = [0, 0, 0]
+        band[0] += 1
+        band[1] += taxable
+        band[2] += tax
+
+        lines.append(PricedLine(
+            getattr(item, "product_id", None), getattr(item, "name", ""), qty,
+            rate, disc_bp, tax_bp, discount, taxable, tax
+        ))
+
+    taxable_total = sum(band[1] for band in bands.values())
+    tax_total = sum(band[2] for band in bands.values())
+
+    return PricedBasket(
+        lines=lines,
+        tax_breakdown=[
+            TaxBand(tax_rate=_percent(bp), lines=n, taxable_value=_money(taxable), tax=_money(tax))
+            for bp, (n, taxable, tax) in sorted(bands.items())
+        ],
+        gross=_money(gross_total),
+        discount=_money(discount_total),
+        taxable_value=_money(taxable_total),
+        tax=_money(tax_total),
+        total=_money(taxable_total + tax_total),
+    )
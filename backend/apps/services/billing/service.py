@@ -1 +1,102 @@
-# TODO: implement
+"""Billing service: daily sales rollup maintenance (line pricing lives in billing.pricing)"""
+from decimal import Decimal
+from typing import Iterable, Optional
+import datetime as dt
+import uuid
+
+from sqlalchemy import select, delete, insert, func, cast, Date
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.services.billing.models import Invoice, DailySalesRollup
+
+# Invoice statuses that count towards "pending payments"
+PENDING_STATUSES = ("draft", "partial")
+
+
+async def apply_invoice_to_rollup(
+    session: AsyncSession,
+    invoice: Invoice,
+    sign: int = 1
+) -> None:
+    """
+    Fold an invoice into the daily sales rollup (sign=1) or back out of it (sign=-1).
+
+    Executes inside the caller's transaction, so the rollup row commits or rolls
+    back together with the invoice write that triggered it.
+    """
+    issued_at = invoice.issued_at or dt.datetime.utcnow()
+    amount = Decimal(str(invoice.total_amount or 0)) * sign
+    await apply_rollup_deltas(
+        session,
+        invoice.tenant_id,
+        {(issued_at.date(), invoice.status or "draft"): (sign, amount)}
+    )
+
+
+async def apply_rollup_deltas(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    deltas: dict[tuple[dt.date, str], tuple[int, Decimal]]
+) -> None:
+    """Upsert (day, status) -> (invoice count, amount) deltas into the rollup in one statement."""
+    if not deltas:
+        return
+
+    stmt = pg_insert(DailySalesRollup).values([
+        {
+            "tenant_id": tenant_id,
+            "day": day,
+            "status": status,
+            "invoice_count": count,
+            "total_amount": amount,
+        }
+        for (day, status), (count, amount) in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySalesRollup.tenant_id, DailySalesRollup.day, DailySalesRollup.status],
+        set_={
+            "invoice_count": DailySalesRollup.invoice_count + stmt.excluded.invoice_count,
+            "total_amount": DailySalesRollup.total_amount + stmt.excluded.total_amount,
+        },
+    )
+    await session.execute(stmt)
+
+
+async def rebuild_daily_rollup(
+    session: AsyncSession,
+    tenant_id: Optional[uuid.UUID] = None
+) -> int:
+    """
+    Recompute the rollup from the invoices table, for one tenant or for all of them.
+
+    Existing rows in scope are replaced in a single transaction; returns the number
+    of rollup rows written. The caller commits.
+    """
+    day = cast(Invoice.issued_at, Date)
+    status = func.coalesce(Invoice.status, "draft")
+
+    source = (
+        select(
+            Invoice.tenant_id,
+            day,
+            status,
+            func.count(Invoice.id),
+            func.coalesce(func.sum(Invoice.total_amount), 0),
+        )
+        .where(Invoice.issued_at.isnot(None))
+        .group_by(Invoice.tenant_id, day, status)
+    )
+    clear = delete(DailySalesRollup)
+    if tenant_id is not None:
+        source = source.where(Invoice.tenant_id == tenant_id)
+        clear = clear.where(DailySalesRollup.tenant_id == tenant_id)
+
+    await session.execute(clear)
+    result = await session.execute(
+        insert(DailySalesRollup).from_select(
+            ["tenant_id", "day", "status", "invoice_count", "total_amount"],
+            source,
+        )
+    )
+    return result.rowcount
@@ -0,0 +1,171 @@
+"""
+GST / tax summary over invoice lines: taxable value, tax and gross per
+(period, tax_rate).
+
+Taxable value and gross are the stored per-line taxable_value and amount that
+billing.pricing computed to the paisa, so tax = gross - taxable reproduces the
+invoices exactly.
+
+Two interchangeable engines:
+
+- "sql": GROUP BY in Postgres; used for short ranges.
+- "columnar": for long ranges (a full filing year), the lines are streamed as
+  integer paise in chunks and reduced with NumPy int64 arrays, keeping the
+  heavy grouping work off the shared database during filing season. Integer
+  paise keep it exact; it falls back to "sql" when NumPy is not installed.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+import datetime as dt
+import uuid
+
+from sqlalchemy import select, func, cast, Date, Integer, BigInteger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.core.logging import logger
+from apps.services.billing.models import Invoice, InvoiceItem
+
+try:  # optional dependency, only needed for the columnar engine
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+PERIODS = ("month", "quarter")
+EXCLUDED_STATUSES = ("void",)
+COLUMNAR_CHUNK_ROWS = 50_000
+
+PAISA = Decimal("0.01")
+
+
+@dataclass
+class TaxSummaryRow:
+    period: dt.date  # first day of the month / quarter
+    tax_rate: Decimal
+    lines: int
+    taxable_value: Decimal
+    tax: Decimal
+    gross: Decimal
+
+
+def _line_filters(tenant_id: uuid.UUID, start: dt.datetime, end: dt.datetime):
+    return (
+        Invoice.tenant_id == tenant_id,
+        Invoice.issued_at >= start,
+        Invoice.issued_at < end,
+        Invoice.status.notin_(EXCLUDED_STATUSES),
+    )
+
+
+async def _summary_sql(session: AsyncSession, tenant_id, start, end, period: str) -> list[TaxSummaryRow]:
+    bucket = cast(func.date_trunc(period, Invoice.issued_at), Date)
+    result = await session.execute(
+        select(
+            bucket,
+            InvoiceItem.tax_rate,
+            func.count(),
+            func.sum(InvoiceItem.taxable_value),
+            func.sum(InvoiceItem.amount),
+        )
+        .join(Invoice, InvoiceItem.invoice_id == Invoice.id)
+        .where(*_line_filters(tenant_id, start, end))
+        .group_by(bucket, InvoiceItem.tax_rate)
+        .order_by(bucket, InvoiceItem.tax_rate)
+    )
+    return [
+        TaxSummaryRow(
+            period=day,
+            tax_rate=Decimal(rate).quantize(PAISA),
+            lines=lines,
+            taxable_value=Decimal(taxable).quantize(PAISA),
+            tax=(Decimal(gross) - Decimal(taxable)).quantize(PAISA),
+            gross=Decimal(gross).quantize(PAISA),
+        )
+        for day, rate, lines, taxable, gross in result.all()
+    ]
+
+
+def _period_index(period: str):
+    """Months (or quarters) since year 0, as an integer column"""
+    year = cast(func.extract("year", Invoice.issued_at), Integer)
+    if period == "quarter":
+        return year * 4 + cast(func.extract("quarter", Invoice.issued_at), Integer) - 1
+    return year * 12 + cast(func.extract("month", Invoice.issued_at), Integer) - 1
+
+
+def _period_start(index: int, period: str) -> dt.date:
+    if period == "quarter":
+        return dt.date(index // 4, (index % 4) * 3 + 1, 1)
+    return dt.date(index // 12, index % 12 + 1, 1)
+
+
+# Composite group key: period index * RATE_SPAN + tax rate in basis points (Numeric(5,2) < 1000%)
+RATE_SPAN = 100_000
+
+
+async def _summary_columnar(session: AsyncSession, tenant_id, start, end, period: str) -> list[TaxSummaryRow]:
+    query = (
+        select(
+            _period_index(period),
+            cast(InvoiceItem.tax_rate * 100, Integer),
+            cast(InvoiceItem.taxable_value * 100, BigInteger),
+            cast(InvoiceItem.amount * 100, BigInteger),
+        )
+        .join(Invoice, InvoiceItem.invoice_id == Invoice.id)
+        .where(*_line_filters(tenant_id, start, end))
+        .execution_options(yield_per=COLUMNAR_CHUNK_ROWS)
+    )
+
+    # key -> [lines, taxable paise, gross paise], merged across chunks as Python ints
+    groups: dict[int, list[int]] = {}
+    result = await session.stream(query)
+    async for chunk in result.partitions():
+        data = np.array(chunk, dtype=np.int64)
+        keys, inverse = np.unique(data[:, 0] * RATE_SPAN + data[:, 1], return_inverse=True)
+        lines = np.bincount(inverse, minlength=len(keys))
+        taxable = np.zeros(len(keys), dtype=np.int64)
+        gross = np.zeros(len(keys), dtype=np.int64)
+        np.add.at(taxable, inverse, data[:, 2])
+        np.add.at(gross, inverse, data[:, 3])
+        for key, n, t, g in zip(keys.tolist(), lines.tolist(), taxable.tolist(), gross.tolist()):
+            acc = groups.setdefault(key, [0, 0, 0])
+            acc[0] += n
+            acc[1] += t
+            acc[2] += g
+
+    rows = []
+    for key in sorted(groups):
+        lines, taxable, gross = groups[key]
+        rows.append(TaxSummaryRow(
+            period=_period_start(key // RATE_SPAN, period),
+            tax_rate=(Decimal(key % RATE_SPAN) / 100).quantize(PAISA),
+            lines=lines,
+            taxable_value=(Decimal(taxable) / 100).quantize(PAISA),
+            tax=(Decimal(gross - taxable) / 100).quantize(PAISA),
+            gross=(Decimal(gross) / 100).quantize(PAISA),
+        ))
+    return rows
+
+
+async def tax_summary(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    start: dt.datetime,
+    end: dt.datetime,
+    period: str = "month",
+    columnar_after_days: int = 93,
+) -> tuple[str, list[TaxSummaryRow]]:
+    """
+    Summarise invoice lines issued in [start, end) by period and tax rate.
+
+    Returns (engine, rows); ranges longer than `columnar_after_days` use the
+    columnar engine when NumPy is available.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+    if (end - start).days > columnar_after_days:
+        if np is not None:
+            return "columnar", await _summary_columnar(session, tenant_id, start, end, period)
+        logger.warning("numpy is not installed; tax summary falls back to SQL aggregation")
+    return "sql", await _summary_sql(session, tenant_id, start, end, period)
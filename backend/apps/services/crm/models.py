@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import UniqueConstraint, String, Integer, ForeignKey, DateTime, Boolean, UUID, Enum
+from sqlalchemy import UniqueConstraint, Index, Computed, String, Integer, ForeignKey, DateTime, Boolean, UUID, Enum, text
 from apps.core.db import Base
 import datetime as dt
 import enum
@@ -42,6 +42,12 @@ class Lead(Base):
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
 
+    __table_args__ = (
+        # GET /leads, newest first, unfiltered or filtered by status
+        Index("ix_leads_tenant_created_at", "tenant_id", text("created_at DESC")),
+        Index("ix_leads_tenant_status_created_at", "tenant_id", "status", text("created_at DESC")),
+    )
+
 class Customer(Base):
     __tablename__ = "customers"
     
@@ -52,6 +58,12 @@ class Customer(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     email: Mapped[str] = mapped_column(String(255), nullable=True)
     phone: Mapped[str] = mapped_column(String(20), nullable=True)
+    # Lookup key: last 10 digits of phone (see crm.service.normalize_phone)
+    phone_normalized: Mapped[str] = mapped_column(
+        String(20),
+        Computed("nullif(right(regexp_replace(phone, '[^0-9]', '', 'g'), 10), '')", persisted=True),
+        nullable=True
+    )
     
     address: Mapped[str] = mapped_column(String(500), nullable=True)
     city: Mapped[str] = mapped_column(String(100), nullable=True)
@@ -63,6 +75,18 @@ class Customer(Base):
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
 
+    __table_args__ = (
+        # GET /customers (newest first) and the dashboard's new-customer count
+        Index("ix_customers_tenant_created_at", "tenant_id", text("created_at DESC")),
+        # One customer per (name, phone) per tenant; walk-ins without a phone are matched by name in crm.service
+        Index(
+            "uq_customers_tenant_name_phone",
+            "tenant_id", "name", "phone_normalized",
+            unique=True,
+            postgresql_where=text("phone_normalized IS NOT NULL"),
+        ),
+    )
+
 class Vehicle(Base):
     __tablename__ = "vehicles"
     id: Mapped[str] = mapped_column(UUID, primary_key=True)
@@ -72,6 +96,12 @@ class Vehicle(Base):
     model: Mapped[str] = mapped_column(String(100), nullable=True)
     year: Mapped[int] = mapped_column(Integer, nullable=True)
     vin: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
+    # Lookup key: alphanumerics of vin, case-folded (see crm.service.normalize_vin)
+    vin_normalized: Mapped[str] = mapped_column(
+        String(64),
+        Computed("nullif(lower(regexp_replace(vin, '[^A-Za-z0-9]', '', 'g')), '')", persisted=True),
+        nullable=True
+    )
     van_number: Mapped[str] = mapped_column(String(64), nullable=True)
     chassis_number: Mapped[str] = mapped_column(String(64), nullable=True)
     purchase_date: Mapped[dt.datetime] = mapped_column(DateTime, nullable=True)
@@ -80,3 +110,7 @@ class Vehicle(Base):
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
 
     customer = relationship("Customer")
+
+    __table_args__ = (
+        UniqueConstraint("tenant_id", "vin_normalized", name="uq_vehicles_tenant_vin"),
+    )
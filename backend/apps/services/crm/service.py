@@ -1 +1,164 @@
-# TODO: implement
+"""CRM service: normalized find-or-create for customers and vehicles"""
+from typing import Optional
+import datetime as dt
+import re
+import uuid
+
+from sqlalchemy import Boolean, DateTime, String, UUID, and_, column, exists, false, literal, or_, select, tuple_, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.services.crm.models import Customer, Vehicle
+
+
+# Python mirrors of the generated columns in crm.models; keep them in lockstep.
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Last 10 digits, so '+91 98765-43210' and '9876543210' are the same customer."""
+    if not phone:
+        return None
+    return re.sub(r"[^0-9]", "", phone)[-10:] or None
+
+
+def normalize_vin(vin: Optional[str]) -> Optional[str]:
+    """Alphanumerics only, case-folded: 'KA-01 AB 1234' == 'ka01ab1234'."""
+    if not vin:
+        return None
+    return re.sub(r"[^A-Za-z0-9]", "", vin).lower() or None
+
+
+async def upsert_customers(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    customers: list[dict]
+) -> list[uuid.UUID]:
+    """
+    Find-or-create customers ({name, phone, email}); returns their ids in input order.
+
+    Customers with a phone are matched on (name, normalized phone): an existing
+    one's missing email is filled in and nothing else is overwritten. Customers
+    without a phone are matched by name to an existing customer without a phone
+    (the oldest, if there are several). Existing rows with nothing to fill in
+    are not written. One statement inserts what is new and reads back the rest.
+    """
+    if not customers:
+        return []
+    now = dt.datetime.utcnow()  # column defaults do not apply to INSERT ... SELECT
+    rows: dict[tuple[str, Optional[str]], dict] = {}
+    for c in customers:
+        rows.setdefault(_customer_key(c), c)
+
+    incoming = values(
+        column("id", UUID), column("name", String), column("phone", String), column("email", String),
+        column("created_at", DateTime), column("keyed", Boolean),
+        name="incoming",
+    ).data([
+        (uuid.uuid4(), name, c.get("phone"), c.get("email"), now, phone is not None)
+        for (name, phone), c in rows.items()
+    ])
+    walk_in = and_(Customer.tenant_id == tenant_id, Customer.phone_normalized.is_(None))
+    insert = pg_insert(Customer).from_select(
+        ["id", "tenant_id", "name", "phone", "email", "created_at", "updated_at"],
+        select(
+            incoming.c.id, literal(tenant_id, UUID), incoming.c.name, incoming.c.phone, incoming.c.email,
+            incoming.c.created_at, incoming.c.created_at,
+        )
+        .where(or_(
+            incoming.c.keyed,
+            ~exists().where(walk_in, Customer.name == incoming.c.name),
+        )),
+    )
+    insert = insert.on_conflict_do_update(
+        index_elements=[Customer.tenant_id, Customer.name, Customer.phone_normalized],
+        index_where=Customer.phone_normalized.isnot(None),
+        set_={"email": insert.excluded.email},
+        where=Customer.email.is_(None) & insert.excluded.email.isnot(None),
+    ).returning(Customer.id, Customer.name, Customer.phone_normalized, Customer.created_at)
+    written = insert.cte("written")
+
+    # RETURNING only has inserted and updated rows; existing rows come from the
+    # statement's snapshot, which does not see the inserts
+    keyed = [key for key in rows if key[1] is not None]
+    names = [name for name, phone in rows if phone is None]
+    stmt = select(written.c.id, written.c.name, written.c.phone_normalized, written.c.created_at).union_all(
+        select(Customer.id, Customer.name, Customer.phone_normalized, Customer.created_at).where(
+            Customer.tenant_id == tenant_id,
+            or_(
+                tuple_(Customer.name, Customer.phone_normalized).in_(keyed) if keyed else false(),
+                and_(walk_in, Customer.name.in_(names)) if names else false(),
+            ),
+        )
+    )
+    found: dict[tuple[str, Optional[str]], uuid.UUID] = {}
+    for customer_id, name, phone, _ in sorted((await session.execute(stmt)).all(), key=lambda r: r[3]):
+        found.setdefault((name, phone), customer_id)
+
+    # A key inserted by a concurrent transaction after the snapshot was taken
+    missing = [key for key in keyed if key not in found]
+    if missing:
+        result = await session.execute(
+            select(Customer.id, Customer.name, Customer.phone_normalized).where(
+                Customer.tenant_id == tenant_id,
+                tuple_(Customer.name, Customer.phone_normalized).in_(missing),
+            )
+        )
+        found.update({(name, phone): customer_id for customer_id, name, phone in result.all()})
+
+    return [found[_customer_key(c)] for c in customers]
+
+
+def _customer_key(customer: dict) -> tuple[str, Optional[str]]:
+    return customer["name"], normalize_phone(customer.get("phone"))
+
+
+async def upsert_vehicles(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    vehicles: list[dict]
+) -> dict[str, uuid.UUID]:
+    """
+    Find-or-create vehicles ({vin, customer_id}), keyed by the case-folded
+    registration/VIN. Existing vehicles are left untouched (and not written);
+    one statement inserts what is new and reads back the rest.
+
+    Returns {normalize_vin(vin): vehicle_id}.
+    """
+    rows = {}
+    for v in vehicles:
+        key = normalize_vin(v["vin"])
+        if key:
+            rows.setdefault(key, v)
+    if not rows:
+        return {}
+
+    insert = pg_insert(Vehicle).values([
+        {
+            "id": uuid.uuid4(),
+            "tenant_id": tenant_id,
+            "customer_id": v["customer_id"],
+            "vin": v["vin"],
+            "active": True,
+        }
+        for v in rows.values()
+    ])
+    written = insert.on_conflict_do_nothing(
+        index_elements=[Vehicle.tenant_id, Vehicle.vin_normalized],
+    ).returning(Vehicle.id, Vehicle.vin_normalized).cte("written")
+    stmt = select(written.c.id, written.c.vin_normalized).union_all(
+        select(Vehicle.id, Vehicle.vin_normalized).where(
+            Vehicle.tenant_id == tenant_id,
+            Vehicle.vin_normalized.in_(list(rows)),
+        )
+    )
+    found = {vin: vehicle_id for vehicle_id, vin in (await session.execute(stmt)).all()}
+
+    # A vehicle inserted by a concurrent transaction after the snapshot was taken
+    missing = [key for key in rows if key not in found]
+    if missing:
+        result = await session.execute(
+            select(Vehicle.id, Vehicle.vin_normalized).where(
+                Vehicle.tenant_id == tenant_id,
+                Vehicle.vin_normalized.in_(missing),
+            )
+        )
+        found.update({vin: vehicle_id for vehicle_id, vin in result.all()})
+    return found
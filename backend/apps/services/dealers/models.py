@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, DateTime, func
+from sqlalchemy import String, Integer, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from apps.core.db import Base
@@ -17,6 +17,10 @@ class Tenant(Base):
     subscription_start: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=True)
     subscription_end: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=True)
     is_active: Mapped[bool] = mapped_column(default=True)
+
+    # Invoice numbering: "{invoice_prefix}/{fiscal year}/{sequence}"
+    invoice_prefix: Mapped[str] = mapped_column(String(12), nullable=True, default="INV")
+    fiscal_year_start_month: Mapped[int] = mapped_column(Integer, default=4)  # 4 = April (Indian FY), 1 = calendar year
     
     created_at = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at = mapped_column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
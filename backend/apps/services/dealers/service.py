@@ -1 +1,58 @@
-# TODO: implement
+"""Dealer (tenant) service: identifier lookups used by login"""
+from collections import OrderedDict
+from typing import Optional
+import time
+import uuid
+
+from apps.core.config import settings
+
+
+class TenantLookupCache:
+    """
+    Small per-worker LRU from a login identifier (tenant code or UUID string)
+    to the tenant id.
+
+    Tenant updates and deletes call invalidate() after commit; the TTL bounds
+    how long another worker can keep a stale mapping, and login drops an entry
+    that no longer resolves, so a stale hit costs one extra query at worst.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[uuid.UUID, float]] = OrderedDict()
+
+    def get(self, identifier: str) -> Optional[uuid.UUID]:
+        entry = self._entries.get(identifier)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[identifier]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(identifier)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, identifier: str, tenant_id: uuid.UUID) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[identifier] = (tenant_id, time.monotonic() + self.ttl)
+        self._entries.move_to_end(identifier)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, identifier: str) -> None:
+        self._entries.pop(identifier, None)
+
+    def invalidate(self, tenant_id: uuid.UUID) -> None:
+        """Forget every identifier that maps to this tenant"""
+        for key in [k for k, (tid, _) in self._entries.items() if tid == tenant_id]:
+            del self._entries[key]
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+tenant_lookup = TenantLookupCache(settings.TENANT_LOOKUP_CACHE_SIZE, settings.TENANT_LOOKUP_CACHE_TTL)
@@ -0,0 +1,19 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime, Text, UUID
+from apps.core.db import Base
+from typing import Optional
+import datetime as dt
+
+class IdempotencyKey(Base):
+    """One claimed Idempotency-Key per tenant; see apps.core.idempotency"""
+    __tablename__ = "idempotency_keys"
+    tenant_id: Mapped[str] = mapped_column(UUID, primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)  # sha256 of method, path and body
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # NULL while in flight
+    content_type: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    response_body: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Set in the handler's own transaction when it commits, see apps.core.idempotency
+    committed_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime, nullable=True)
+    # In flight: end of the claim's lease; committed or finished: end of replay
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=False, index=True)
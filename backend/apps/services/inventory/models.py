@@ -1,8 +1,11 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Numeric, DateTime, ForeignKey, UUID
+from sqlalchemy import String, Integer, Numeric, DateTime, ForeignKey, UUID, Index, text
 from apps.core.db import Base
 import datetime as dt
 
+# Dashboard "low stock" cut-off; also the predicate of ix_inventory_items_tenant_low_stock
+LOW_STOCK_LIMIT = 10
+
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
     
@@ -16,3 +19,14 @@ class InventoryItem(Base):
     image_url: Mapped[str] = mapped_column(String(500), nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
     updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
+
+    __table_args__ = (
+        # Dashboard low-stock panel; queries must compare against the literal
+        # LOW_STOCK_LIMIT (not a bind parameter) for the planner to use it
+        Index(
+            "ix_inventory_items_tenant_low_stock",
+            "tenant_id",
+            postgresql_include=["name", "sku", "stock_quantity"],
+            postgresql_where=text(f"stock_quantity < {LOW_STOCK_LIMIT}"),
+        ),
+    )
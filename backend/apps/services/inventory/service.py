@@ -1 +1,113 @@
-# TODO: implement
+"""Inventory service: set-based stock movements"""
+from typing import Iterable, Literal, get_args
+import uuid
+
+from sqlalchemy import select, update, values, column, func, Integer, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.services.inventory.models import InventoryItem
+
+# What to do when a sale asks for more than is on hand
+StockPolicy = Literal["reject", "clamp", "backorder"]
+STOCK_POLICIES = get_args(StockPolicy)
+
+
+class InsufficientStock(Exception):
+    """Raised under the 'reject' policy; the caller must roll back."""
+
+    def __init__(self, shortfalls: list[dict]):
+        self.shortfalls = shortfalls
+        super().__init__(f"Insufficient stock for {len(shortfalls)} item(s)")
+
+
+async def decrement_stock(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    lines: Iterable[tuple[uuid.UUID, int]],
+    policy: StockPolicy = "clamp"
+) -> list[dict]:
+    """
+    Decrement stock for every (product_id, qty) line in one statement.
+
+    Lines for the same product are summed first. The affected rows are locked in
+    id order (so concurrent baskets cannot deadlock) and updated from the live
+    row values, which closes the read-modify-write race of decrementing in Python.
+
+    Policies:
+        reject    - raise InsufficientStock if any item would go below zero
+        clamp     - floor stock at zero
+        backorder - allow negative stock
+
+    Returns one result per requested product: requested, previous and remaining
+    quantity plus a status of ok / clamped / backordered / not_found, or
+    insufficient for the shortfalls carried by InsufficientStock.
+    """
+    if policy not in STOCK_POLICIES:
+        raise ValueError(f"Unknown stock policy: {policy}")
+
+    requested: dict[uuid.UUID, int] = {}
+    for product_id, qty in lines:
+        requested[product_id] = requested.get(product_id, 0) + qty
+    if not requested:
+        return []
+
+    basket = values(
+        column("id", UUID), column("qty", Integer), name="basket"
+    ).data(list(requested.items()))
+
+    locked = (
+        select(InventoryItem.id, InventoryItem.stock_quantity.label("before"), basket.c.qty)
+        .join(basket, InventoryItem.id == basket.c.id)
+        .where(InventoryItem.tenant_id == tenant_id)
+        .order_by(InventoryItem.id)
+        .with_for_update(of=InventoryItem)
+        .cte("locked")
+    )
+
+    items = InventoryItem.__table__
+    remaining = items.c.stock_quantity - locked.c.qty
+    if policy == "clamp":
+        remaining = func.greatest(remaining, 0)
+
+    # Core (not ORM-bulk) UPDATE: nothing in the identity map needs syncing
+    result = await session.execute(
+        update(items)
+        .where(items.c.id == locked.c.id)
+        .values(stock_quantity=remaining)
+        .returning(items.c.id, locked.c.before, items.c.stock_quantity)
+    )
+
+    results = []
+    shortfalls = []
+    found = {row.id: row for row in result.all()}
+    for product_id, qty in requested.items():
+        row = found.get(product_id)
+        if row is None:
+            results.append({
+                "product_id": str(product_id),
+                "requested": qty,
+                "previous": None,
+                "remaining": None,
+                "status": "not_found"
+            })
+            continue
+
+        short = qty > row.before
+        status = "ok"
+        if short:
+            status = {"reject": "insufficient", "clamp": "clamped", "backorder": "backordered"}[policy]
+        entry = {
+            "product_id": str(product_id),
+            "requested": qty,
+            "previous": row.before,
+            "remaining": row.stock_quantity,
+            "status": status
+        }
+        results.append(entry)
+        if short:
+            shortfalls.append(entry)
+
+    if policy == "reject" and shortfalls:
+        raise InsufficientStock(shortfalls)
+
+    return results
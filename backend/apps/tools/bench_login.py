@@ -0,0 +1,144 @@
+"""
+Login identifier resolution: round trips and latency, before and after.
+
+    python -m apps.tools.bench_login
+    python -m apps.tools.bench_login --rtt-ms 0.5 2 --logins 200
+
+Runs the previous sequential lookups and auth._resolve_login against a session
+that answers every query after a simulated database round trip, and reports
+queries per login and p50/p95 resolution latency for email, tenant code
+(first login and cached) and tenant UUID identifiers. bcrypt verification is
+the same on both sides and is left out; it still dominates a full login.
+"""
+from types import SimpleNamespace
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import select
+
+from apps.api.routers.auth import _resolve_login
+from apps.services.auth.models import User
+from apps.services.dealers.models import Tenant
+from apps.services.dealers.service import tenant_lookup
+
+
+class SimulatedSession:
+    """Answers every execute() with the same user/tenant after `rtt` seconds"""
+
+    def __init__(self, rtt: float, user, tenant) -> None:
+        self.rtt = rtt
+        self.queries = 0
+        self._user = user
+        self._tenant = tenant
+
+    async def execute(self, stmt):
+        self.queries += 1
+        await asyncio.sleep(self.rtt)
+        entities = [d.get("entity") for d in stmt.column_descriptions]
+        if entities == [User, Tenant]:
+            row = SimpleNamespace(User=self._user, Tenant=self._tenant)
+            return SimpleNamespace(first=lambda: row)
+        value = self._user if entities == [User] else self._tenant
+        return SimpleNamespace(
+            first=lambda: value,
+            scalar_one_or_none=lambda: value,
+            scalars=lambda: SimpleNamespace(first=lambda: value),
+        )
+
+
+class _CodeMissFirst:
+    """For UUID identifiers the legacy code-lookup query finds nothing"""
+
+    def __init__(self, session: SimulatedSession, uuid_identifier: bool) -> None:
+        self._session = session
+        self._uuid_identifier = uuid_identifier
+
+    @property
+    def queries(self) -> int:
+        return self._session.queries
+
+    @queries.setter
+    def queries(self, value: int) -> None:
+        self._session.queries = value
+
+    async def execute(self, stmt):
+        result = await self._session.execute(stmt)
+        if self._uuid_identifier and "tenants.code" in str(stmt.whereclause):
+            return SimpleNamespace(scalar_one_or_none=lambda: None)
+        return result
+
+
+async def legacy_resolve_login(session, identifier: str):
+    """The previous sequential lookups from auth._login, kept only as the benchmark baseline"""
+    user = None
+    tenant = None
+    if "@" in identifier:
+        result = await session.execute(select(User).where(User.email == identifier.lower()))
+        user = result.scalars().first()
+        if user:
+            tenant_res = await session.execute(select(Tenant).where(Tenant.id == user.tenant_id))
+            tenant = tenant_res.scalar_one_or_none()
+    if not user:
+        result = await session.execute(select(Tenant).where(Tenant.code == identifier))
+        tenant = result.scalar_one_or_none()
+        if not tenant:
+            try:
+                result = await session.execute(select(Tenant).where(Tenant.id == uuid.UUID(identifier)))
+                tenant = result.scalar_one_or_none()
+            except Exception:
+                pass
+        if tenant:
+            user_res = await session.execute(
+                select(User).where(User.tenant_id == tenant.id, User.role == "dealer_admin")
+            )
+            user = user_res.scalars().first()
+    return user, tenant
+
+
+async def _measure(resolve, session, identifier: str, logins: int, cold: bool) -> tuple[float, float, float]:
+    timings = []
+    session.queries = 0
+    for _ in range(logins):
+        if cold:
+            tenant_lookup.discard(identifier)
+        started = time.perf_counter()
+        await resolve(session, identifier)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return session.queries / logins, statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+async def main(rtts_ms: list[float], logins: int):
+    tenant = SimpleNamespace(id=uuid.uuid4(), code="dealer-001")
+    user = SimpleNamespace(id=uuid.uuid4(), tenant_id=tenant.id, email="admin@dealer.test", role="dealer_admin")
+    cases = [
+        ("email", user.email, True),
+        ("code, first", tenant.code, True),
+        ("code, cached", tenant.code, False),
+        ("uuid, cached", str(tenant.id), False),
+    ]
+    print(f"{'rtt':>6} {'identifier':<14} {'queries':>15} {'p50':>21} {'p95':>21}")
+    for rtt_ms in rtts_ms:
+        for label, identifier, cold in cases:
+            # The previous code never found a code/UUID via the email lookup, so
+            # it answers those with "no tenant" first, as the database did
+            legacy_session = SimulatedSession(rtt_ms / 1000, user, tenant)
+            if "@" not in identifier:
+                legacy_session = _CodeMissFirst(legacy_session, identifier == str(tenant.id))
+            session = SimulatedSession(rtt_ms / 1000, user, tenant)
+            await _resolve_login(session, identifier)  # warm the lookup cache for the cached cases
+            before = await _measure(legacy_resolve_login, legacy_session, identifier, logins, cold)
+            after = await _measure(_resolve_login, session, identifier, logins, cold)
+            print(f"{rtt_ms:>4.1f}ms {label:<14} {before[0]:>6.1f} -> {after[0]:<6.1f} "
+                  f"{before[1] * 1e3:>7.2f} -> {after[1] * 1e3:>6.2f}ms "
+                  f"{before[2] * 1e3:>7.2f} -> {after[2] * 1e3:>6.2f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login identifier resolution")
+    parser.add_argument("--rtt-ms", type=float, nargs="+", default=[0.5, 2.0])
+    parser.add_argument("--logins", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.rtt_ms, args.logins))
@@ -0,0 +1,112 @@
+"""
+Throughput of GET / through TenantMiddleware, pure ASGI vs BaseHTTPMiddleware.
+
+    python -m apps.tools.bench_middleware
+    python -m apps.tools.bench_middleware --requests 20000 --concurrency 1 50
+
+Builds the same FastAPI app (CORS, the root route) three times: without tenant
+middleware, with the previous BaseHTTPMiddleware-based TenantMiddleware and with
+the current one, and drives each in process through the ASGI interface with
+`concurrency` requests in flight, half of them carrying an X-Tenant-Id header.
+No sockets or HTTP parsing are involved, so the numbers isolate the app and
+middleware stack; a real server adds the same constant cost to every variant.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from apps.core.context import set_tenant_id, reset_tenant_id
+from apps.core.middleware import TenantMiddleware
+
+
+class LegacyTenantMiddleware(BaseHTTPMiddleware):
+    """The previous TenantMiddleware, kept only as the benchmark baseline"""
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        tenant_id_header = request.headers.get("X-Tenant-Id")
+        if tenant_id_header:
+            try:
+                set_tenant_id(uuid.UUID(tenant_id_header))
+            except ValueError:
+                pass
+        try:
+            return await call_next(request)
+        finally:
+            reset_tenant_id()
+
+
+def build_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_credentials=True,
+                       allow_methods=["*"], allow_headers=["*"])
+
+    @app.get("/")
+    async def root():
+        return {"ok": True, "app": "AutoServe360 API"}
+
+    return app
+
+
+def _scope(tenant: bool) -> dict:
+    headers = [(b"host", b"bench"), (b"accept", b"application/json")]
+    if tenant:
+        headers.append((b"x-tenant-id", str(uuid.uuid4()).encode()))
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"",
+        "headers": headers, "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+
+async def _request(app, scope: dict) -> None:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"GET / answered {message['status']}")
+
+    await app(scope, receive, send)
+
+
+async def _throughput(app, requests: int, concurrency: int) -> float:
+    scopes = [_scope(i % 2 == 0) for i in range(concurrency)]
+    for scope in scopes:  # warm up: builds the middleware stack, first-call caches
+        await _request(app, dict(scope))
+    started = time.perf_counter()
+    for _ in range(requests // concurrency):
+        await asyncio.gather(*(_request(app, dict(scope)) for scope in scopes))
+    return (requests // concurrency * concurrency) / (time.perf_counter() - started)
+
+
+async def main(requests: int, concurrencies: list[int], repeat: int):
+    variants = [
+        ("no tenant middleware", build_app()),
+        ("BaseHTTPMiddleware", build_app(LegacyTenantMiddleware)),
+        ("pure ASGI", build_app(TenantMiddleware)),
+    ]
+    print(f"{'concurrency':>11} {'variant':<22} {'req/s':>10} {'vs BaseHTTP':>12}")
+    for concurrency in concurrencies:
+        results = {}
+        for label, app in variants:
+            results[label] = max([await _throughput(app, requests, concurrency) for _ in range(repeat)])
+        for label, _ in variants:
+            print(f"{concurrency:>11} {label:<22} {results[label]:>10.0f} "
+                  f"{results[label] / results['BaseHTTPMiddleware']:>11.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TenantMiddleware on GET /")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 50])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.repeat))
@@ -0,0 +1,83 @@
+"""
+Microbenchmark for billing.pricing.price_basket.
+
+    python -m apps.tools.bench_pricing
+    python -m apps.tools.bench_pricing --sizes 1 100 5000 --repeat 7
+
+Prices synthetic workshop baskets (mixed GST slabs, some discounted lines) of
+each size and reports the best per-basket time next to the per-line Decimal
+loop that create_invoice used before: price_basket alone, price_basket plus
+the InvoiceItem rows (the like-for-like figure), per-line cost and speedup.
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+import argparse
+import random
+import timeit
+
+from apps.services.billing.pricing import price_basket
+
+TAX_SLABS = (0.0, 5.0, 12.0, 18.0, 28.0)
+
+
+def make_basket(size: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            product_id=None,
+            name=f"Part {i}",
+            qty=rng.randint(1, 12),
+            rate=round(rng.uniform(5, 25000), 2),
+            tax_rate=rng.choice(TAX_SLABS),
+            discount_pct=rng.choice((0.0, 0.0, 0.0, 5.0, 10.0)),
+        )
+        for i in range(size)
+    ]
+
+
+def legacy_price_items(items) -> tuple[Decimal, list[dict]]:
+    """The previous per-line loop from create_invoice, kept only as the benchmark baseline"""
+    total_amount = Decimal("0.00")
+    rows = []
+    for item in items:
+        item_amount = Decimal(str(item.qty)) * Decimal(str(item.rate)) * (1 + Decimal(str(item.tax_rate)) / 100)
+        total_amount += item_amount
+        rows.append({
+            "product_id": item.product_id,
+            "name": item.name,
+            "qty": item.qty,
+            "rate": item.rate,
+            "tax_rate": item.tax_rate,
+            "amount": float(item_amount)
+        })
+    return total_amount, rows
+
+
+def current_price_items(items) -> tuple[Decimal, list[dict]]:
+    """price_basket plus InvoiceItem rows, i.e. what create_invoice does now"""
+    basket = price_basket(items)
+    return basket.total, basket.rows()
+
+
+def _best(fn, repeat: int) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(sizes: list[int], repeat: int):
+    print(f"{'lines':>6} {'legacy':>12} {'price_basket':>14} {'+ rows':>12} {'per line':>10} {'speedup':>8}")
+    for size in sizes:
+        basket = make_basket(size)
+        legacy = _best(lambda: legacy_price_items(basket), repeat)
+        priced = _best(lambda: price_basket(basket), repeat)
+        current = _best(lambda: current_price_items(basket), repeat)
+        print(f"{size:>6} {legacy * 1e6:>10.1f}us {priced * 1e6:>12.1f}us {current * 1e6:>10.1f}us "
+              f"{current / size * 1e6:>8.2f}us {legacy / current:>7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark invoice basket pricing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
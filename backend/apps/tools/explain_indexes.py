@@ -0,0 +1,203 @@
+"""
+Check that the tenant-scoped hot queries are served by their indexes.
+
+    python -m apps.tools.explain_indexes
+    python -m apps.tools.explain_indexes --tenant <id> --force-index
+
+EXPLAINs each hot query of the routers for one tenant (by default the one with
+the most invoices), built from the same models and helpers with the same
+parameters, and prints the indexes each plan reads and whether it sorts. Exits
+1 if any query does not read its expected index, or sorts rows the index
+should already return in order.
+
+On a small development database Postgres rightly prefers sequential scans;
+--force-index disables sequential and bitmap scans for the session to show the
+index is at least usable. The planner's real choice only shows with realistic
+volumes (tens of thousands of rows per tenant) and fresh statistics (ANALYZE).
+"""
+from dataclasses import dataclass
+import argparse
+import asyncio
+import datetime as dt
+import json
+import sys
+import uuid
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from apps.api.routers.dashboard import _stats_query
+from apps.api.routers.invoices import _apply_invoice_filters
+from apps.core.db import async_session, engine
+from apps.services.billing.models import Invoice, InvoiceItem
+from apps.services.billing.tax_summary import _line_filters
+from apps.services.crm.models import Customer, Lead
+from apps.services.dealers.models import Tenant
+from apps.services.inventory.models import InventoryItem, LOW_STOCK_LIMIT
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <statement>, keeping the statement's bind parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+@dataclass
+class HotQuery:
+    name: str
+    statement: object
+    indexes: tuple[str, ...]  # any of these satisfies the check
+    ordered: bool = False  # the index should return rows in ORDER BY order, no Sort node
+
+
+def hot_queries(tenant_id: uuid.UUID, now: dt.datetime) -> list[HotQuery]:
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    invoice_page = (
+        select(Invoice, Customer)
+        .outerjoin(Customer, Invoice.customer_id == Customer.id)
+        .where(Invoice.tenant_id == tenant_id)
+    )
+    newest_first = (Invoice.issued_at.desc(), Invoice.id.desc())
+    return [
+        HotQuery(
+            "GET /invoices",
+            _apply_invoice_filters(invoice_page).order_by(*newest_first).limit(21),
+            ("ix_invoices_tenant_issued_at_id",),
+            ordered=True,
+        ),
+        HotQuery(
+            "GET /invoices?status=PAID",
+            _apply_invoice_filters(invoice_page, status="PAID").order_by(*newest_first).limit(21),
+            ("ix_invoices_tenant_status_issued_at_id",),
+            ordered=True,
+        ),
+        HotQuery(
+            "GET /invoices?status=PAID&start_date&end_date",
+            _apply_invoice_filters(
+                invoice_page,
+                start_date=(today_start - dt.timedelta(days=90)).date().isoformat(),
+                end_date=today_start.date().isoformat(),
+                status="PAID",
+            ).order_by(*newest_first).limit(21),
+            ("ix_invoices_tenant_status_issued_at_id",),
+            ordered=True,
+        ),
+        HotQuery(
+            "GET /customers",
+            select(Customer).where(Customer.tenant_id == tenant_id).order_by(Customer.created_at.desc()),
+            ("ix_customers_tenant_created_at",),
+            ordered=True,
+        ),
+        HotQuery(
+            "GET /leads",
+            select(Lead).where(Lead.tenant_id == tenant_id).order_by(Lead.created_at.desc()),
+            ("ix_leads_tenant_created_at",),
+            ordered=True,
+        ),
+        HotQuery(
+            "GET /leads?status=NEW",
+            select(Lead).where(Lead.tenant_id == tenant_id, Lead.status == "NEW").order_by(Lead.created_at.desc()),
+            ("ix_leads_tenant_status_created_at",),
+            ordered=True,
+        ),
+        HotQuery(
+            "GET /dashboard/stats (headline numbers)",
+            _stats_query(tenant_id, today_start, today_start - dt.timedelta(days=6), now - dt.timedelta(days=30)),
+            ("ix_customers_tenant_created_at",),
+        ),
+        HotQuery(
+            "GET /dashboard/stats (recent invoices)",
+            select(Invoice, Customer)
+            .outerjoin(Customer, Invoice.customer_id == Customer.id)
+            .where(Invoice.tenant_id == tenant_id)
+            .order_by(Invoice.issued_at.desc())
+            .limit(10),
+            ("ix_invoices_tenant_issued_at_id",),
+            ordered=True,
+        ),
+        HotQuery(
+            "GET /dashboard/stats (low stock)",
+            select(InventoryItem.name, InventoryItem.stock_quantity, InventoryItem.sku)
+            .where(
+                InventoryItem.tenant_id == tenant_id,
+                InventoryItem.stock_quantity < literal(LOW_STOCK_LIMIT, literal_execute=True),
+            )
+            .limit(5),
+            ("ix_inventory_items_tenant_low_stock",),
+        ),
+        HotQuery(
+            "GET /reports/tax-summary",
+            select(InvoiceItem.tax_rate, func.count())
+            .join(Invoice, InvoiceItem.invoice_id == Invoice.id)
+            .where(*_line_filters(tenant_id, today_start - dt.timedelta(days=90), today_start))
+            .group_by(InvoiceItem.tax_rate),
+            ("ix_invoices_tenant_issued_at_id", "ix_invoices_tenant_status_issued_at_id"),
+        ),
+    ]
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _walk(child)
+
+
+def plan_summary(plan: dict) -> tuple[list[str], bool]:
+    """(indexes read, whether any node sorts)"""
+    nodes = list(_walk(plan))
+    indexes = list(dict.fromkeys(n["Index Name"] for n in nodes if "Index Name" in n))
+    sorts = any(n["Node Type"] in ("Sort", "Incremental Sort") for n in nodes)
+    return indexes, sorts
+
+
+async def _busiest_tenant(session) -> uuid.UUID | None:
+    tenant_id = await session.scalar(
+        select(Invoice.tenant_id).group_by(Invoice.tenant_id).order_by(func.count().desc()).limit(1)
+    )
+    return tenant_id or await session.scalar(select(Tenant.id).limit(1))
+
+
+async def main(tenant_id: uuid.UUID | None, force_index: bool) -> int:
+    failures = 0
+    async with async_session() as s:
+        tenant_id = tenant_id or await _busiest_tenant(s)
+        if tenant_id is None:
+            print("No tenants in the database")
+            return 1
+        if force_index:
+            # Local to this transaction, which is rolled back at the end
+            await s.execute(select(func.set_config("enable_seqscan", "off", True)))
+            await s.execute(select(func.set_config("enable_bitmapscan", "off", True)))
+
+        print(f"tenant {tenant_id}{' (sequential and bitmap scans disabled)' if force_index else ''}")
+        for query in hot_queries(tenant_id, dt.datetime.utcnow()):
+            raw = await s.scalar(Explain(query.statement))
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            indexes, sorts = plan_summary(plan)
+            problems = []
+            if not set(indexes) & set(query.indexes):
+                problems.append(f"expected {' or '.join(query.indexes)}")
+            if query.ordered and sorts:
+                problems.append("sorts")
+            failures += bool(problems)
+            print(f"{'FAIL' if problems else 'ok':>4}  {query.name}")
+            print(f"      indexes: {', '.join(indexes) or 'none'}; top node: {plan['Node Type']}"
+                  f"{'; ' + '; '.join(problems) if problems else ''}")
+        await s.rollback()
+    await engine.dispose()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the tenant-scoped hot queries and check their indexes")
+    parser.add_argument("--tenant", type=uuid.UUID, default=None, help="Tenant to plan for (default: most invoices)")
+    parser.add_argument("--force-index", action="store_true", help="Disable sequential and bitmap scans")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.tenant, args.force_index)))
@@ -0,0 +1,27 @@
+"""
+Backfill / rebuild the daily_sales_rollup table from invoices.
+
+    python -m apps.tools.rebuild_sales_rollup                # every tenant
+    python -m apps.tools.rebuild_sales_rollup --tenant <id>  # one tenant
+"""
+import argparse
+import asyncio
+import uuid
+
+from apps.core.db import async_session, engine
+from apps.services.billing.service import rebuild_daily_rollup
+
+
+async def main(tenant_id: uuid.UUID | None):
+    async with async_session() as s:
+        rows = await rebuild_daily_rollup(s, tenant_id)
+        await s.commit()
+    await engine.dispose()
+    scope = f"tenant {tenant_id}" if tenant_id else "all tenants"
+    print(f"Rebuilt daily_sales_rollup for {scope}: {rows} rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollup from invoices")
+    parser.add_argument("--tenant", type=uuid.UUID, default=None, help="Only rebuild this tenant")
+    args = parser.parse_args()
+    asyncio.run(main(args.tenant))
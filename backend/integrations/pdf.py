@@ -1 +1,291 @@
-# TODO
+"""
+Invoice PDF rendering.
+
+A small, dependency-free PDF writer for A4 invoices using the standard PDF base
+fonts (Helvetica for text, Courier for the item table so columns line up). The
+output is a pure function of the invoice document: no timestamps or random ids
+are embedded, so the same document always renders to the same bytes.
+
+Rendering is CPU-bound and is meant to run in a worker process, see
+workers/pdf_worker.py. Both entry points take and return plain data so they
+pickle, and this module imports nothing from the app.
+"""
+from decimal import Decimal
+from typing import Any
+import os
+import tempfile
+
+# Bump when the layout changes so cached PDFs are rendered again
+RENDER_VERSION = 1
+
+PAGE_WIDTH = 595  # A4, points
+PAGE_HEIGHT = 842
+MARGIN = 50
+LINE_HEIGHT = 14
+ITEMS_FIRST_PAGE = 34
+ITEMS_PER_PAGE = 48
+
+# Item table (Courier 9pt): column widths in characters
+TABLE_FONT_SIZE = 9
+COLUMNS = [("#", 3, "r"), ("Item", 38, "l"), ("Qty", 5, "r"), ("Rate", 11, "r"), ("Tax%", 6, "r"), ("Amount", 12, "r")]
+
+
+def _money(value: Any) -> str:
+    return f"{Decimal(str(value)).quantize(Decimal('0.01')):,}"
+
+
+def _escape(text: str) -> str:
+    # Base fonts use WinAnsiEncoding; anything outside Latin-1 degrades to '?'
+    text = str(text).encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x: float, y: float, text: str, font: str = "F1", size: float = 10) -> str:
+    return f"BT /{font} {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET"
+
+
+def _row(cells: list[str]) -> str:
+    out = []
+    for (_, width, align), cell in zip(COLUMNS, cells):
+        cell = cell[:width]
+        out.append(cell.rjust(width) if align == "r" else cell.ljust(width))
+    return " ".join(out)
+
+
+def _totals(items: list[dict]) -> tuple[Decimal, Decimal]:
+    subtotal = Decimal("0")
+    tax = Decimal("0")
+    for item in items:
+        base = Decimal(str(item["taxable_value"]))
+        subtotal += base
+        tax += Decimal(str(item["amount"])) - base
+    return subtotal, tax
+
+
+def _header(doc: dict) -> tuple[list[str], float]:
+    ops = []
+    y = PAGE_HEIGHT - MARGIN
+    ops.append(_text(MARGIN, y, doc.get("dealer") or "", "F2", 16))
+    ops.append(_text(PAGE_WIDTH - MARGIN - 110, y, "TAX INVOICE", "F2", 14))
+    y -= LINE_HEIGHT * 2
+    for label, value in (
+        ("Invoice No", doc.get("number")),
+        ("Date", doc.get("date")),
+        ("Status", doc.get("status")),
+    ):
+        ops.append(_text(PAGE_WIDTH - MARGIN - 200, y, f"{label}: {value or '-'}"))
+        y -= LINE_HEIGHT
+    y += LINE_HEIGHT * 3
+    ops.append(_text(MARGIN, y, "Bill to", "F2"))
+    y -= LINE_HEIGHT
+    for value in (doc.get("customer"), doc.get("customer_phone"), doc.get("customer_email")):
+        if value:
+            ops.append(_text(MARGIN, y, value))
+            y -= LINE_HEIGHT
+    if doc.get("vehicle_no"):
+        ops.append(_text(MARGIN, y, f"Vehicle: {doc['vehicle_no']}"))
+        y -= LINE_HEIGHT
+    return ops, min(y, PAGE_HEIGHT - MARGIN - LINE_HEIGHT * 5) - LINE_HEIGHT
+
+
+def _page_content(doc: dict, items: list[dict], first_index: int, page: int, pages: int) -> str:
+    if page == 1:
+        ops, y = _header(doc)
+    else:
+        ops = [_text(MARGIN, PAGE_HEIGHT - MARGIN, f"{doc.get('dealer') or ''} - {doc.get('number') or ''} (continued)", "F2", 11)]
+        y = PAGE_HEIGHT - MARGIN - LINE_HEIGHT * 2
+
+    ops.append(_text(MARGIN, y, _row([c[0] for c in COLUMNS]), "F4", TABLE_FONT_SIZE))
+    y -= 4
+    ops.append(f"{MARGIN} {y:.2f} m {PAGE_WIDTH - MARGIN} {y:.2f} l S")
+    y -= LINE_HEIGHT
+    for offset, item in enumerate(items):
+        ops.append(_text(MARGIN, y, _row([
+            str(first_index + offset + 1),
+            item.get("name") or "",
+            str(item["qty"]),
+            _money(item["rate"]),
+            f"{Decimal(str(item.get('tax_rate') or 0)):g}",
+            _money(item["amount"]),
+        ]), "F3", TABLE_FONT_SIZE))
+        y -= LINE_HEIGHT
+
+    if page == pages:
+        subtotal, tax = _totals(doc.get("items") or [])
+        y -= 4
+        ops.append(f"{MARGIN} {y + LINE_HEIGHT - 4:.2f} m {PAGE_WIDTH - MARGIN} {y + LINE_HEIGHT - 4:.2f} l S")
+        for label, value, font in (
+            ("Subtotal", subtotal, "F3"),
+            ("Tax", tax, "F3"),
+            ("Total", doc.get("amount", subtotal + tax), "F4"),
+        ):
+            ops.append(_text(PAGE_WIDTH - MARGIN - 190, y, f"{label:<10}{_money(value):>20}", font, 10))
+            y -= LINE_HEIGHT
+
+    ops.append(_text(PAGE_WIDTH - MARGIN - 60, MARGIN - 20, f"Page {page} of {pages}", "F1", 8))
+    return "\n".join(ops)
+
+
+def _paginate(items: list[dict]) -> list[list[dict]]:
+    pages = [items[:ITEMS_FIRST_PAGE]]
+    rest = items[ITEMS_FIRST_PAGE:]
+    while rest:
+        pages.append(rest[:ITEMS_PER_PAGE])
+        rest = rest[ITEMS_PER_PAGE:]
+    return pages
+
+
+def _build_pdf(pages: list[str]) -> bytes:
+    """Assemble page content streams into a PDF document"""
+    fonts = ["Helvetica", "Helvetica-Bold", "Courier", "Courier-Bold"]
+
+    # Object numbers: 1 catalog, 2 page tree, 3..6 fonts, then (page, content) pairs
+    first_page_obj = 3 + len(fonts)
+    page_refs = " ".join(f"{first_page_obj + 2 * i} 0 R" for i in range(len(pages)))
+    font_refs = " ".join(f"/F{i + 1} {3 + i} 0 R" for i in range(len(fonts)))
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{page_refs}] /Count {len(pages)} >>".encode(),
+    ]
+    for name in fonts:
+        objects.append(f"<< /Type /Font /Subtype /Type1 /BaseFont /{name} /Encoding /WinAnsiEncoding >>".encode())
+
+    for page, text in enumerate(pages, start=1):
+        content = text.encode("latin-1")
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << {font_refs} >> >> /Contents {first_page_obj + 2 * page - 1} 0 R >>"
+        ).encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def render_invoice(doc: dict) -> bytes:
+    """
+    Render an invoice document to PDF bytes.
+
+    `doc` keys: dealer, number, date, status, customer, customer_phone,
+    customer_email, vehicle_no, amount and items (dicts with name, qty, rate,
+    tax_rate, taxable_value, amount). Amounts may be Decimal, float or numeric strings.
+    """
+    chunks = _paginate(list(doc.get("items") or []))
+    pages = []
+    index = 0
+    for page, chunk in enumerate(chunks, start=1):
+        pages.append(_page_content(doc, chunk, index, page, len(chunks)))
+        index += len(chunk)
+    return _build_pdf(pages)
+
+
+# Statement table (Courier 9pt): Date, Invoice No, Status, Tax, Amount
+STATEMENT_COLUMNS = [("Date", 10, "l"), ("Invoice No", 22, "l"), ("Status", 8, "l"), ("Tax", 14, "r"), ("Amount", 16, "r")]
+
+
+def _statement_row(cells: list[str]) -> str:
+    out = []
+    for (_, width, align), cell in zip(STATEMENT_COLUMNS, cells):
+        cell = cell[:width]
+        out.append(cell.rjust(width) if align == "r" else cell.ljust(width))
+    return " ".join(out)
+
+
+def _statement_page(doc: dict, invoices: list[dict], page: int, pages: int) -> str:
+    y = PAGE_HEIGHT - MARGIN
+    if page == 1:
+        ops = [
+            _text(MARGIN, y, doc.get("dealer") or "", "F2", 16),
+            _text(PAGE_WIDTH - MARGIN - 150, y, "ACCOUNT STATEMENT", "F2", 12),
+        ]
+        y -= LINE_HEIGHT * 2
+        ops.append(_text(PAGE_WIDTH - MARGIN - 200, y, f"Period: {doc.get('period_start')} to {doc.get('period_end')}"))
+        ops.append(_text(MARGIN, y, "Statement for", "F2"))
+        y -= LINE_HEIGHT
+        for value in (doc.get("customer"), doc.get("customer_phone"), doc.get("customer_email")):
+            if value:
+                ops.append(_text(MARGIN, y, value))
+                y -= LINE_HEIGHT
+        y -= LINE_HEIGHT
+    else:
+        ops = [_text(MARGIN, y, f"{doc.get('customer') or ''} - statement {doc.get('period_start')} (continued)", "F2", 11)]
+        y -= LINE_HEIGHT * 2
+
+    ops.append(_text(MARGIN, y, _statement_row([c[0] for c in STATEMENT_COLUMNS]), "F4", TABLE_FONT_SIZE))
+    y -= 4
+    ops.append(f"{MARGIN} {y:.2f} m {PAGE_WIDTH - MARGIN} {y:.2f} l S")
+    y -= LINE_HEIGHT
+    for invoice in invoices:
+        ops.append(_text(MARGIN, y, _statement_row([
+            invoice.get("date") or "",
+            invoice.get("number") or "",
+            invoice.get("status") or "",
+            _money(invoice.get("tax") or 0),
+            _money(invoice["amount"]),
+        ]), "F3", TABLE_FONT_SIZE))
+        y -= LINE_HEIGHT
+
+    if page == pages:
+        if not doc.get("invoices"):
+            ops.append(_text(MARGIN, y, "No invoices in this period.", "F1", 9))
+            y -= LINE_HEIGHT
+        y -= 4
+        ops.append(f"{MARGIN} {y + LINE_HEIGHT - 4:.2f} m {PAGE_WIDTH - MARGIN} {y + LINE_HEIGHT - 4:.2f} l S")
+        for label, value, font in (
+            ("Invoiced this period", doc.get("invoiced", 0), "F3"),
+            ("Paid this period", doc.get("paid", 0), "F3"),
+            ("Outstanding balance", doc.get("outstanding", 0), "F4"),
+        ):
+            ops.append(_text(PAGE_WIDTH - MARGIN - 250, y, f"{label:<22}{_money(value):>18}", font, 10))
+            y -= LINE_HEIGHT
+
+    ops.append(_text(PAGE_WIDTH - MARGIN - 60, MARGIN - 20, f"Page {page} of {pages}", "F1", 8))
+    return "\n".join(ops)
+
+
+def render_statement(doc: dict) -> bytes:
+    """
+    Render a customer's monthly statement to PDF bytes.
+
+    `doc` keys: dealer, customer, customer_phone, customer_email, period_start,
+    period_end, invoiced, paid, outstanding and invoices (dicts with date,
+    number, status, tax, amount).
+    """
+    chunks = _paginate(list(doc.get("invoices") or []))
+    return _build_pdf([
+        _statement_page(doc, chunk, page, len(chunks))
+        for page, chunk in enumerate(chunks, start=1)
+    ])
+
+
+def _publish(data: bytes, path: str) -> str:
+    """Write to a temp file in the target directory, then rename into place"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+def render_invoice_to_file(doc: dict, path: str) -> str:
+    return _publish(render_invoice(doc), path)
+
+
+def render_statement_to_file(doc: dict, path: str) -> str:
+    return _publish(render_statement(doc), path)
@@ -19,6 +19,7 @@ from apps.services.crm import models as crm_models
 from apps.services.vehicles import models as vehicle_models
 from apps.services.inventory import models as inventory_models
 from apps.services.features import models as feature_models
+from apps.services.idempotency import models as idempotency_models
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,27 @@
+"""add_invoice_item_discount_taxable
+
+Revision ID: 3e8b5d1a7c64
+Revises: 7a4c2e9b1d05
+Create Date: 2026-10-17 18:12:07.441902
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3e8b5d1a7c64'
+down_revision = '7a4c2e9b1d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('invoice_items', sa.Column('discount', sa.Numeric(12, 2), nullable=True, server_default='0'))
+    op.add_column('invoice_items', sa.Column('taxable_value', sa.Numeric(12, 2), nullable=True))
+    # Lines priced before discounts and tax-inclusive rates existed: taxable = qty * rate
+    op.execute("UPDATE invoice_items SET taxable_value = qty * rate")
+
+
+def downgrade():
+    op.drop_column('invoice_items', 'taxable_value')
+    op.drop_column('invoice_items', 'discount')
@@ -0,0 +1,38 @@
+"""add_auth_state_and_token_revocations
+
+Revision ID: 4b7f2d9c6a18
+Revises: 3e8b5d1a7c64
+Create Date: 2026-10-17 19:04:51.208337
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '4b7f2d9c6a18'
+down_revision = '3e8b5d1a7c64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('auth_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO auth_state (id, version) VALUES (1, 0)")
+
+    op.create_table('token_revocations',
+    sa.Column('subject_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(length=10), nullable=False),
+    sa.Column('revoked_before', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('subject_id')
+    )
+    op.create_index(op.f('ix_token_revocations_revoked_before'), 'token_revocations', ['revoked_before'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_token_revocations_revoked_before'), table_name='token_revocations')
+    op.drop_table('token_revocations')
+    op.drop_table('auth_state')
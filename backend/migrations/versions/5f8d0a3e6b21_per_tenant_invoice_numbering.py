@@ -0,0 +1,41 @@
+"""per_tenant_invoice_numbering
+
+Revision ID: 5f8d0a3e6b21
+Revises: b7e41c2d9a10
+Create Date: 2026-10-17 11:40:03.572911
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5f8d0a3e6b21'
+down_revision = 'b7e41c2d9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('invoice_sequences',
+    sa.Column('tenant_id', sa.UUID(), nullable=False),
+    sa.Column('fiscal_year', sa.Integer(), nullable=False),
+    sa.Column('last_value', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('tenant_id', 'fiscal_year')
+    )
+    op.add_column('tenants', sa.Column('invoice_prefix', sa.String(length=12), server_default='INV', nullable=True))
+    op.add_column('tenants', sa.Column('fiscal_year_start_month', sa.Integer(), server_default='4', nullable=False))
+
+    # Invoice numbers only need to be unique within a tenant
+    op.drop_index('ix_invoices_number', table_name='invoices')
+    op.create_index('ix_invoices_number', 'invoices', ['number'], unique=False)
+    op.create_unique_constraint('uq_invoices_tenant_number', 'invoices', ['tenant_id', 'number'])
+
+
+def downgrade():
+    op.drop_constraint('uq_invoices_tenant_number', 'invoices', type_='unique')
+    op.drop_index('ix_invoices_number', table_name='invoices')
+    op.create_index('ix_invoices_number', 'invoices', ['number'], unique=True)
+    op.drop_column('tenants', 'fiscal_year_start_month')
+    op.drop_column('tenants', 'invoice_prefix')
+    op.drop_table('invoice_sequences')
@@ -0,0 +1,83 @@
+"""normalized_customer_vehicle_keys
+
+Revision ID: 7a4c2e9b1d05
+Revises: 0d6a9f1c8e42
+Create Date: 2026-10-17 16:48:30.915536
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7a4c2e9b1d05'
+down_revision = '0d6a9f1c8e42'
+branch_labels = None
+depends_on = None
+
+# Groups sharing a key the unique indexes below would reject
+DUPLICATE_QUERIES = {
+    "customers (tenant_id, name, phone_normalized)": """
+        SELECT tenant_id, name || ' / ' || phone_normalized, count(*), string_agg(id::text, ', ' ORDER BY created_at, id)
+        FROM customers
+        WHERE phone_normalized IS NOT NULL
+        GROUP BY tenant_id, name, phone_normalized
+        HAVING count(*) > 1
+        ORDER BY count(*) DESC
+    """,
+    "vehicles (tenant_id, vin_normalized)": """
+        SELECT tenant_id, vin_normalized, count(*), string_agg(id::text, ', ' ORDER BY created_at, id)
+        FROM vehicles
+        WHERE vin_normalized IS NOT NULL
+        GROUP BY tenant_id, vin_normalized
+        HAVING count(*) > 1
+        ORDER BY count(*) DESC
+    """,
+}
+REPORT_LIMIT = 20
+
+
+def _fail_on_duplicates():
+    if context.is_offline_mode():
+        return
+    conn = op.get_bind()
+    report = []
+    for key, query in DUPLICATE_QUERIES.items():
+        groups = conn.execute(sa.text(query)).all()
+        if groups:
+            report.append(f"{len(groups)} duplicate group(s) in {key}:")
+            report += [f"  tenant {tenant}: {value!r} x{n}: {ids}" for tenant, value, n, ids in groups[:REPORT_LIMIT]]
+            if len(groups) > REPORT_LIMIT:
+                report.append(f"  ... and {len(groups) - REPORT_LIMIT} more")
+    if report:
+        raise RuntimeError(
+            "Cannot add the normalized customer/vehicle keys: merge these rows by hand "
+            "(repoint invoices/vehicles to the row you keep), then re-run the upgrade.\n"
+            + "\n".join(report)
+        )
+
+
+def upgrade():
+    op.add_column('customers', sa.Column(
+        'phone_normalized', sa.String(length=20),
+        sa.Computed("nullif(right(regexp_replace(phone, '[^0-9]', '', 'g'), 10), '')", persisted=True),
+        nullable=True))
+    op.add_column('vehicles', sa.Column(
+        'vin_normalized', sa.String(length=64),
+        sa.Computed("nullif(lower(regexp_replace(vin, '[^A-Za-z0-9]', '', 'g')), '')", persisted=True),
+        nullable=True))
+
+    # Rows that already share a key are real customer data: never merge or delete
+    # them here. Stop with a report instead, so they can be merged by hand.
+    _fail_on_duplicates()
+
+    op.create_index('uq_customers_tenant_name_phone', 'customers',
+                    ['tenant_id', 'name', 'phone_normalized'], unique=True,
+                    postgresql_where=sa.text('phone_normalized IS NOT NULL'))
+    op.create_unique_constraint('uq_vehicles_tenant_vin', 'vehicles', ['tenant_id', 'vin_normalized'])
+
+
+def downgrade():
+    op.drop_constraint('uq_vehicles_tenant_vin', 'vehicles', type_='unique')
+    op.drop_index('uq_customers_tenant_name_phone', table_name='customers')
+    op.drop_column('vehicles', 'vin_normalized')
+    op.drop_column('customers', 'phone_normalized')
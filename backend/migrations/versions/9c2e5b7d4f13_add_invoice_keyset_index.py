@@ -0,0 +1,50 @@
+"""add_invoice_keyset_index
+
+Revision ID: 9c2e5b7d4f13
+Revises: 5f8d0a3e6b21
+Create Date: 2026-10-17 14:05:51.204377
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9c2e5b7d4f13'
+down_revision = '5f8d0a3e6b21'
+branch_labels = None
+depends_on = None
+
+INVALID_INDEX = sa.text(
+    "SELECT 1 FROM pg_index i"
+    " JOIN pg_class c ON c.oid = i.indexrelid"
+    " JOIN pg_namespace n ON n.oid = c.relnamespace"
+    " WHERE c.relname = :name AND n.nspname = current_schema() AND NOT i.indisvalid"
+)
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction. A failed concurrent build
+    # leaves an INVALID index that if_not_exists would keep: rebuild it.
+    with op.get_context().autocommit_block():
+        if not context.is_offline_mode() and op.get_bind().scalar(
+            INVALID_INDEX, {'name': 'ix_invoices_tenant_issued_at_id'}
+        ):
+            op.drop_index('ix_invoices_tenant_issued_at_id', table_name='invoices', postgresql_concurrently=True)
+        op.create_index(
+            'ix_invoices_tenant_issued_at_id',
+            'invoices',
+            ['tenant_id', sa.text('issued_at DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_invoices_tenant_issued_at_id',
+            table_name='invoices',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,40 @@
+"""add_daily_sales_rollup
+
+Revision ID: b7e41c2d9a10
+Revises: e3219467f775
+Create Date: 2026-10-17 09:12:40.118204
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41c2d9a10'
+down_revision = 'e3219467f775'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales_rollup',
+    sa.Column('tenant_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=24), nullable=False),
+    sa.Column('invoice_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('tenant_id', 'day', 'status')
+    )
+    # Backfill from existing invoices
+    op.execute("""
+        INSERT INTO daily_sales_rollup (tenant_id, day, status, invoice_count, total_amount)
+        SELECT tenant_id, CAST(issued_at AS DATE), COALESCE(status, 'draft'),
+               count(id), COALESCE(sum(total_amount), 0)
+        FROM invoices
+        WHERE issued_at IS NOT NULL
+        GROUP BY tenant_id, CAST(issued_at AS DATE), COALESCE(status, 'draft')
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_sales_rollup')
@@ -0,0 +1,76 @@
+"""add_tenant_composite_indexes
+
+Revision ID: d8a1f4c7e250
+Revises: 4b7f2d9c6a18
+Create Date: 2026-10-17 21:12:37.604118
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd8a1f4c7e250'
+down_revision = '4b7f2d9c6a18'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, extra create_index kwargs); see the models for what each one serves
+INDEXES = [
+    ('ix_invoices_tenant_status_issued_at_id', 'invoices',
+     ['tenant_id', 'status', sa.text('issued_at DESC'), sa.text('id DESC')], {}),
+    ('ix_customers_tenant_created_at', 'customers',
+     ['tenant_id', sa.text('created_at DESC')], {}),
+    ('ix_leads_tenant_created_at', 'leads',
+     ['tenant_id', sa.text('created_at DESC')], {}),
+    ('ix_leads_tenant_status_created_at', 'leads',
+     ['tenant_id', 'status', sa.text('created_at DESC')], {}),
+    # Must match inventory.models.LOW_STOCK_LIMIT
+    ('ix_inventory_items_tenant_low_stock', 'inventory_items',
+     ['tenant_id'], {'postgresql_include': ['name', 'sku', 'stock_quantity'],
+                     'postgresql_where': sa.text('stock_quantity < 10')}),
+]
+
+INVALID_INDEX = sa.text(
+    "SELECT 1 FROM pg_index i"
+    " JOIN pg_class c ON c.oid = i.indexrelid"
+    " JOIN pg_namespace n ON n.oid = c.relnamespace"
+    " WHERE c.relname = :name AND n.nspname = current_schema() AND NOT i.indisvalid"
+)
+
+
+def _drop_if_invalid(name, table):
+    """
+    A failed or interrupted concurrent build leaves an INVALID index behind,
+    which if_not_exists would then keep: drop it so it is built again.
+    """
+    if context.is_offline_mode():
+        return  # nothing to inspect; drop any invalid index by hand before running the SQL
+    if op.get_bind().scalar(INVALID_INDEX, {'name': name}):
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            _drop_if_invalid(name, table)
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
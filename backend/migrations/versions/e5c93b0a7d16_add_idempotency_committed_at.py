@@ -0,0 +1,23 @@
+"""add_idempotency_committed_at
+
+Revision ID: e5c93b0a7d16
+Revises: d8a1f4c7e250
+Create Date: 2026-10-18 10:41:09.318522
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e5c93b0a7d16'
+down_revision = 'd8a1f4c7e250'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('idempotency_keys', sa.Column('committed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('idempotency_keys', 'committed_at')
@@ -0,0 +1,41 @@
+"""
+TenantCache (apps.core.cache) with the in-process backend.
+"""
+import asyncio
+
+from apps.core import cache
+from apps.core.cache import TenantCache, _MemoryBackend
+
+
+def test_stale_generation_is_never_served_or_stored():
+    async def run():
+        c = TenantCache("test", ttl=60, backend=_MemoryBackend())
+        value, version = await c.get("t1")
+        assert value is None
+        await c.invalidate("t1")  # a write lands while the result is computed
+        await c.set("t1", version, {"n": 1})
+        assert (await c.get("t1"))[0] is None
+
+        value, version = await c.get("t1")
+        await c.set("t1", version, {"n": 2})
+        assert (await c.get("t1"))[0] == {"n": 2}
+    asyncio.run(run())
+
+
+def test_cache_is_off_without_a_shared_backend(monkeypatch):
+    monkeypatch.setattr(cache, "enabled", False)
+    c = TenantCache("test", ttl=60)
+    assert c.ttl == 0
+    assert "CACHE_IN_PROCESS" in cache.startup_warning()
+
+    async def run():
+        _, version = await c.get("t1")
+        await c.set("t1", version, {"n": 1})
+        return (await c.get("t1"))[0]
+    assert asyncio.run(run()) is None
+
+
+def test_cache_runs_in_process_when_allowed(monkeypatch):
+    monkeypatch.setattr(cache, "enabled", True)
+    assert TenantCache("test", ttl=60).ttl == 60
+    assert cache.startup_warning() is None
@@ -0,0 +1,103 @@
+"""
+Find-or-create of customers and vehicles (crm.service) against the database.
+"""
+import uuid
+
+from sqlalchemy import literal_column, select
+
+from apps.services.crm.models import Customer
+from apps.services.crm.service import upsert_customers, upsert_vehicles
+
+
+def _call(client, fn, *args):
+    async def run():
+        from apps.core.db import async_session
+
+        async with async_session() as s:
+            result = await fn(s, *args)
+            await s.commit()
+        return result
+    return client.portal.call(run)
+
+
+async def _customer_versions(session, ids):
+    """(id, email, xmin) per customer; xmin changes whenever the row is rewritten"""
+    rows = await session.execute(
+        select(Customer.id, Customer.email, literal_column("customers.xmin::text")).where(Customer.id.in_(ids))
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def test_existing_customers_are_matched_and_not_rewritten(client, seed):
+    tenant_id = seed["tenant_id"]
+    phone = f"9{uuid.uuid4().int % 10**9:09d}"
+    [first] = _call(client, upsert_customers, tenant_id, [{"name": "Upsert test", "phone": phone, "email": None}])
+    before = _call(client, _customer_versions, [first])
+
+    ids = _call(client, upsert_customers, tenant_id, [
+        {"name": "Upsert test", "phone": f"+91 {phone[:5]} {phone[5:]}", "email": None},
+        {"name": "Upsert test", "phone": phone, "email": None},
+    ])
+    assert ids == [first, first]
+    assert _call(client, _customer_versions, [first]) == before
+
+
+def test_missing_email_is_filled_in_but_never_overwritten(client, seed):
+    tenant_id = seed["tenant_id"]
+    phone = f"9{uuid.uuid4().int % 10**9:09d}"
+    [customer] = _call(client, upsert_customers, tenant_id, [{"name": "Email test", "phone": phone, "email": None}])
+    _call(client, upsert_customers, tenant_id, [{"name": "Email test", "phone": phone, "email": "a@example.com"}])
+    _call(client, upsert_customers, tenant_id, [{"name": "Email test", "phone": phone, "email": "b@example.com"}])
+    [(email, _)] = _call(client, _customer_versions, [customer]).values()
+    assert email == "a@example.com"
+
+
+def test_customers_without_a_phone_are_matched_by_name(client, seed):
+    tenant_id = seed["tenant_id"]
+    name = f"Walk-in {uuid.uuid4().hex[:8]}"
+    walk_in = {"name": name, "phone": None, "email": None}
+    [first, again] = _call(client, upsert_customers, tenant_id, [walk_in, walk_in])
+    assert first == again
+    before = _call(client, _customer_versions, [first])
+
+    # Re-ingested: the existing row, unchanged; a customer with a phone is someone else
+    [existing, other] = _call(client, upsert_customers, tenant_id, [walk_in, {**walk_in, "phone": "9812345678"}])
+    assert existing == first and other != first
+    assert _call(client, _customer_versions, [first]) == before
+
+
+def test_one_statement_resolves_new_and_existing_rows(client, seed):
+    from apps.core.db import engine
+    from sqlalchemy import event
+
+    tenant_id = seed["tenant_id"]
+    phone = f"9{uuid.uuid4().int % 10**9:09d}"
+    [owner] = _call(client, upsert_customers, tenant_id, [{"name": "Round trip", "phone": phone, "email": None}])
+    _call(client, upsert_vehicles, tenant_id, [{"vin": f"ka06rt{phone[-6:]}", "customer_id": owner}])
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        ids = _call(client, upsert_customers, tenant_id, [
+            {"name": "Round trip", "phone": phone, "email": None},
+            {"name": "Round trip new", "phone": phone, "email": None},
+        ])
+        vehicles = _call(client, upsert_vehicles, tenant_id, [
+            {"vin": f"KA06RT{phone[-6:]}", "customer_id": ids[0]},
+            {"vin": f"ka07rt{phone[-6:]}", "customer_id": ids[1]},
+        ])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert len(set(ids)) == 2 and len(vehicles) == 2
+    assert len([s for s in statements if s.lstrip().startswith("WITH")]) == 2
+    assert len(statements) == 2
+
+
+def test_vehicles_are_matched_case_insensitively(client, seed):
+    tenant_id = seed["tenant_id"]
+    [owner] = _call(client, upsert_customers, tenant_id, [{"name": "Vehicle owner", "phone": None, "email": None}])
+    vin = f"ka05up{uuid.uuid4().hex[:6]}"
+    created = _call(client, upsert_vehicles, tenant_id, [{"vin": vin, "customer_id": owner}])
+    found = _call(client, upsert_vehicles, tenant_id, [{"vin": vin.upper(), "customer_id": owner}])
+    assert list(found.values()) == list(created.values())
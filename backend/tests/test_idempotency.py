@@ -0,0 +1,144 @@
+"""
+Idempotency-Key bookkeeping (apps.core.idempotency).
+"""
+import datetime as dt
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+from apps.core import idempotency
+from apps.services.idempotency.models import IdempotencyKey
+
+
+def test_only_responses_with_a_text_body_are_stored():
+    assert idempotency._stored_body(JSONResponse({"ok": True}, status_code=201)) == '{"ok":true}'
+    assert idempotency._stored_body(None) is None
+    assert idempotency._stored_body(JSONResponse({"detail": "down"}, status_code=503)) is None
+    assert idempotency._stored_body(StreamingResponse(iter([b"a,b\n"]), media_type="text/csv")) is None
+    assert idempotency._stored_body(Response(b"\xff\xfe", media_type="application/octet-stream")) is None
+
+
+def _request(tenant_id: uuid.UUID) -> Request:
+    from apps.core.security import create_access_token
+
+    token = create_access_token(sub=str(uuid.uuid4()), tenant_id=str(tenant_id), role="dealer_admin", email="a@b.test")
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+@pytest.mark.parametrize("denied, status", [("revoked", 401), ("suspended", 403)])
+def test_denied_tokens_are_refused_before_any_replay(monkeypatch, denied, status):
+    from apps.core.access import access_table
+
+    tenant_id = uuid.uuid4()
+    assert idempotency._tenant_from_request(_request(tenant_id)) == tenant_id
+    monkeypatch.setattr(access_table, "denies", lambda claims: denied)
+    with pytest.raises(HTTPException) as e:
+        idempotency._tenant_from_request(_request(tenant_id))
+    assert e.value.status_code == status
+
+
+# --- against the database ----------------------------------------------------
+
+def _row(client, tenant_id, key):
+    async def load():
+        from apps.core.db import async_session
+
+        async with async_session() as s:
+            return await s.scalar(
+                select(IdempotencyKey).where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key)
+            )
+    return client.portal.call(load)
+
+
+def test_unstorable_response_releases_the_claim(client, seed):
+    tenant_id, key = seed["tenant_id"], f"test-{uuid.uuid4()}"
+
+    async def claim_and_finish():
+        assert await idempotency._claim(tenant_id, key, "f") is None
+        await idempotency._finish(tenant_id, key, StreamingResponse(iter([b""])))
+    client.portal.call(claim_and_finish)
+    assert _row(client, tenant_id, key) is None
+
+
+def test_stuck_claim_is_taken_over_after_its_lease(client, seed):
+    tenant_id, key = seed["tenant_id"], f"test-{uuid.uuid4()}"
+
+    async def claim():
+        return await idempotency._claim(tenant_id, key, "f")
+
+    async def expire_lease():
+        from apps.core.db import async_session
+
+        async with async_session() as s:
+            await s.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key)
+                .values(expires_at=dt.datetime.utcnow() - dt.timedelta(seconds=1))
+            )
+            await s.commit()
+
+    assert client.portal.call(claim) is None
+    assert client.portal.call(claim).status_code is None  # in flight: a retry gets a 409
+    client.portal.call(expire_lease)
+    assert client.portal.call(claim) is None
+
+
+def test_stored_response_outlives_the_lease(client, seed):
+    tenant_id, key = seed["tenant_id"], f"test-{uuid.uuid4()}"
+
+    async def claim_and_finish():
+        await idempotency._claim(tenant_id, key, "f")
+        await idempotency._finish(tenant_id, key, JSONResponse({"id": 1}, status_code=201))
+    client.portal.call(claim_and_finish)
+    row = _row(client, tenant_id, key)
+    assert (row.status_code, row.response_body) == (201, '{"id":1}')
+    assert row.expires_at > dt.datetime.utcnow() + dt.timedelta(hours=1)
+
+
+def test_handler_commit_marks_the_claim_in_its_transaction(client, seed):
+    tenant_id, key = seed["tenant_id"], f"test-{uuid.uuid4()}"
+
+    async def claim_commit_and_fail():
+        from apps.core.db import async_session
+
+        assert await idempotency._claim(tenant_id, key, "f") is None
+        held = idempotency._held.set((tenant_id, key))
+        try:
+            async with async_session() as s:  # the handler's write
+                await s.commit()
+        finally:
+            idempotency._held.reset(held)
+        # Storing the response failed: the claim must survive the release
+        await idempotency._release(tenant_id, key)
+        return await idempotency._claim(tenant_id, key, "f")
+
+    existing = client.portal.call(claim_commit_and_fail)
+    assert existing is not None and existing.committed_at is not None and existing.status_code is None
+    assert existing.expires_at > dt.datetime.utcnow() + dt.timedelta(hours=1)
+
+
+def test_retry_after_an_unrecorded_commit_is_not_run_again(client, dealer_headers, seed):
+    key = f"test-{uuid.uuid4()}"
+
+    async def lose_the_response():
+        from apps.core.db import async_session
+
+        async with async_session() as s:
+            await s.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.tenant_id == seed["tenant_id"], IdempotencyKey.key == key)
+                .values(status_code=None, response_body=None)
+            )
+            await s.commit()
+
+    payload = {"customer_name": "Idempotency test", "items": [{"name": "Labour", "qty": 1, "rate": 100}]}
+    headers = {**dealer_headers, "Idempotency-Key": key}
+    assert client.post("/api/invoices", json=payload, headers=headers).status_code == 201
+    client.portal.call(lose_the_response)  # as if the process died before storing it
+    retry = client.post("/api/invoices", json=payload, headers=headers)
+    assert retry.status_code == 409
+    assert "already processed" in retry.json()["detail"]
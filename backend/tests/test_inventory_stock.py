@@ -0,0 +1,131 @@
+"""
+Stock decrements and the sale policies (inventory.service.decrement_stock).
+"""
+import asyncio
+import uuid
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from apps.core.config import Settings
+from apps.services.inventory.service import InsufficientStock, decrement_stock
+
+
+def test_unknown_policy_is_rejected_before_touching_the_database():
+    with pytest.raises(ValueError, match="Unknown stock policy"):
+        asyncio.run(decrement_stock(None, uuid.uuid4(), [(uuid.uuid4(), 1)], policy="refuse"))
+
+
+def test_stock_policy_setting_is_validated_at_startup():
+    with pytest.raises(ValidationError):
+        Settings(DB_URL="postgresql+asyncpg://localhost/x", JWT_SECRET="x", STOCK_POLICY="refuse")
+
+
+# --- against the database ----------------------------------------------------
+
+class Stock:
+    """Runs decrement_stock for the seeded tenant on the app's event loop"""
+
+    def __init__(self, client, tenant_id: uuid.UUID) -> None:
+        self.client = client
+        self.tenant_id = tenant_id
+
+    def items(self, *quantities: int) -> list[uuid.UUID]:
+        return self.client.portal.call(self._items, quantities)
+
+    def decrement(self, lines, policy: str) -> list[dict]:
+        return self.client.portal.call(self._decrement, lines, policy)
+
+    def on_hand(self, *product_ids: uuid.UUID) -> list[int]:
+        return self.client.portal.call(self._on_hand, product_ids)
+
+    async def _items(self, quantities):
+        from apps.core.db import async_session
+        from apps.services.inventory.models import InventoryItem
+
+        items = [
+            InventoryItem(id=uuid.uuid4(), tenant_id=self.tenant_id, name="Stock test", stock_quantity=q, price=1)
+            for q in quantities
+        ]
+        async with async_session() as s:
+            s.add_all(items)
+            await s.commit()
+        return [item.id for item in items]
+
+    async def _decrement(self, lines, policy):
+        from apps.core.db import async_session
+
+        async with async_session() as s:
+            results = await decrement_stock(s, self.tenant_id, lines, policy=policy)
+            await s.commit()
+        return results
+
+    async def _on_hand(self, product_ids):
+        from apps.core.db import async_session
+        from apps.services.inventory.models import InventoryItem
+
+        async with async_session() as s:
+            rows = dict((await s.execute(
+                select(InventoryItem.id, InventoryItem.stock_quantity).where(InventoryItem.id.in_(product_ids))
+            )).all())
+        return [rows.get(product_id) for product_id in product_ids]
+
+
+@pytest.fixture
+def stock(client, seed):
+    return Stock(client, seed["tenant_id"])
+
+
+def test_lines_for_one_product_are_summed(stock):
+    [part] = stock.items(10)
+    [result] = stock.decrement([(part, 3), (part, 4)], "reject")
+    assert result == {"product_id": str(part), "requested": 7, "previous": 10, "remaining": 3, "status": "ok"}
+    assert stock.on_hand(part) == [3]
+
+
+def test_clamp_floors_stock_at_zero(stock):
+    plenty, short = stock.items(10, 2)
+    results = stock.decrement([(plenty, 1), (short, 5)], "clamp")
+    assert [r["status"] for r in results] == ["ok", "clamped"]
+    assert stock.on_hand(plenty, short) == [9, 0]
+
+
+def test_backorder_lets_stock_go_negative(stock):
+    [short] = stock.items(2)
+    [result] = stock.decrement([(short, 5)], "backorder")
+    assert (result["status"], result["remaining"]) == ("backordered", -3)
+    assert stock.on_hand(short) == [-3]
+
+
+def test_reject_raises_with_the_shortfalls_only(stock):
+    plenty, short = stock.items(10, 2)
+    with pytest.raises(InsufficientStock) as e:
+        stock.decrement([(plenty, 1), (short, 5)], "reject")
+    assert [(s["product_id"], s["status"]) for s in e.value.shortfalls] == [(str(short), "insufficient")]
+    # The session was not committed
+    assert stock.on_hand(plenty, short) == [10, 2]
+
+
+def test_unknown_and_other_tenants_products_are_not_found(stock, client):
+    other = Stock(client, uuid.uuid4())
+    [mine] = stock.items(5)
+    results = other.decrement([(mine, 1), (uuid.uuid4(), 1)], "backorder")
+    assert [r["status"] for r in results] == ["not_found", "not_found"]
+    assert stock.on_hand(mine) == [5]
+
+
+def test_rejected_sale_is_a_409_naming_the_short_items(client, dealer_headers, stock, monkeypatch):
+    from apps.core.config import settings
+
+    monkeypatch.setattr(settings, "STOCK_POLICY", "reject")
+    [short] = stock.items(1)
+    response = client.post("/api/invoices", headers=dealer_headers, json={
+        "customer_name": "Stock test customer",
+        "items": [{"product_id": str(short), "name": "Part", "qty": 3, "rate": 100}],
+        "stock_policy": "backorder",  # not the client's choice: ignored
+    })
+    assert response.status_code == 409
+    [item] = response.json()["detail"]["items"]
+    assert (item["product_id"], item["status"]) == (str(short), "insufficient")
+    assert stock.on_hand(short) == [1]
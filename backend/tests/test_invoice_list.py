@@ -0,0 +1,12 @@
+"""
+GET /invoices paging parameters.
+"""
+
+
+def test_page_size_is_clamped_not_rejected(client, dealer_headers, seed):
+    from apps.api.routers.invoices import MAX_PAGE_SIZE
+
+    for limit in (0, MAX_PAGE_SIZE + 1, 10_000):
+        response = client.get(f"/api/invoices?limit={limit}", headers=dealer_headers)
+        assert response.status_code == 200, response.text
+        assert 1 <= len(response.json()) <= MAX_PAGE_SIZE
@@ -0,0 +1,79 @@
+"""
+Basket pricing (billing.pricing.price_basket) against a plain Decimal reference.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from types import SimpleNamespace
+import random
+
+import pytest
+
+from apps.services.billing.pricing import price_basket
+
+PAISA = Decimal("0.01")
+
+
+def _round(value: Decimal) -> Decimal:
+    return value.quantize(PAISA, ROUND_HALF_UP)
+
+
+def reference_line(qty, rate, tax_rate, discount_pct, prices_include_tax) -> tuple[Decimal, Decimal, Decimal]:
+    """(discount, taxable, tax) per the formulas in the pricing module docstring"""
+    rate, tax_rate, discount_pct = (_round(Decimal(str(v))) for v in (rate, tax_rate, discount_pct))
+    gross = qty * rate
+    discount = _round(gross * discount_pct / 100)
+    net = gross - discount
+    if prices_include_tax:
+        taxable = _round(net * 100 / (100 + tax_rate))
+        tax = net - taxable
+    else:
+        taxable = net
+        tax = _round(taxable * tax_rate / 100)
+    return discount, taxable, tax
+
+
+def _basket(size: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            qty=rng.randint(1, 40),
+            rate=round(rng.uniform(0.01, 25000), 2),
+            tax_rate=rng.choice((0.0, 5.0, 12.0, 18.0, 28.0)),
+            discount_pct=rng.choice((0.0, 2.5, 5.0, 7.5, 10.0, 12.5, 33.33)),
+        )
+        for _ in range(size)
+    ]
+
+
+@pytest.mark.parametrize("prices_include_tax", [False, True])
+@pytest.mark.parametrize("seed", range(5))
+def test_lines_match_the_decimal_reference(prices_include_tax, seed):
+    items = _basket(200, seed)
+    basket = price_basket(items, prices_include_tax=prices_include_tax)
+    for item, line in zip(items, basket.lines):
+        expected = reference_line(item.qty, item.rate, item.tax_rate, item.discount_pct, prices_include_tax)
+        assert (line.discount, line.taxable_value, line.tax) == expected
+    assert basket.total == sum(line.amount for line in basket.lines)
+    assert basket.taxable_value + basket.tax == basket.total
+
+
+@pytest.mark.parametrize("prices_include_tax", [False, True])
+def test_half_paisa_rounds_up(prices_include_tax):
+    # 5% of 0.10 and 18% of 0.25 are both exactly half a paisa
+    items = [
+        SimpleNamespace(qty=1, rate="0.10", tax_rate=0, discount_pct=5),
+        SimpleNamespace(qty=1, rate="0.25", tax_rate=18, discount_pct=0),
+        SimpleNamespace(qty=3, rate=Decimal("99.99"), tax_rate="28", discount_pct="12.5"),
+    ]
+    basket = price_basket(items, prices_include_tax=prices_include_tax)
+    for item, line in zip(items, basket.lines):
+        expected = reference_line(item.qty, item.rate, item.tax_rate, item.discount_pct, prices_include_tax)
+        assert (line.discount, line.taxable_value, line.tax) == expected
+    assert basket.lines[0].discount == Decimal("0.01")
+
+
+def test_tax_breakdown_adds_up_to_the_basket():
+    basket = price_basket(_basket(50, 7))
+    assert sum(band.lines for band in basket.tax_breakdown) == 50
+    assert sum(band.taxable_value for band in basket.tax_breakdown) == basket.taxable_value
+    assert sum(band.tax for band in basket.tax_breakdown) == basket.tax
+    assert [band.tax_rate for band in basket.tax_breakdown] == sorted(band.tax_rate for band in basket.tax_breakdown)
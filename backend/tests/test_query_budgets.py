@@ -0,0 +1,152 @@
+"""
+Per-endpoint SQL statement budgets.
+
+The app runs with QUERY_BUDGET_MODE=raise, so a request that exceeds its
+route's @query_budget, or repeats one statement shape N_PLUS_ONE_THRESHOLD
+times, fails with QueryBudgetExceeded. The numbers are also pinned here so
+that raising a budget in the router shows up in review, and the endpoint tests
+assert the counts measured against PostgreSQL exactly, so an endpoint that gets
+cheaper has its budget lowered too.
+"""
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from apps.core import querybudget
+from apps.core.querybudget import QueryBudgetExceeded, QueryBudgetMiddleware, QueryLog, query_budget, statement_shape
+
+BUDGETS = {
+    "dashboard.get_dashboard_stats": 3,
+    "invoices.create_invoice": 7,
+    "vehicles.list_vehicles": 1,
+    "saas_admin.get_admin_stats": 7,
+    "saas_admin.get_revenue_trend": 1,
+    "reports.get_admin_stats": 6,
+    "reports.get_revenue_trend": 1,
+    "reports.get_expiring_dealers": 1,
+}
+
+
+def query_count(response) -> int:
+    return int(response.headers["x-query-count"])
+
+
+# --- detector ----------------------------------------------------------------
+
+def test_statement_shape_folds_parameters_and_in_lists():
+    a = "SELECT * FROM vehicles WHERE vehicles.tenant_id = $1::UUID AND vehicles.id IN ($2::UUID, $3::UUID)"
+    b = "SELECT *\n  FROM vehicles WHERE vehicles.tenant_id = $1::UUID AND vehicles.id IN ($2::UUID)"
+    assert statement_shape(a) == statement_shape(b)
+    assert statement_shape(a) == "SELECT * FROM vehicles WHERE vehicles.tenant_id = ?::UUID AND vehicles.id IN (?...)"
+
+
+def test_query_log_flags_budget_and_repeats():
+    @query_budget(2)
+    def endpoint():
+        pass
+
+    log = QueryLog()
+    log.statements += ["SELECT 1 FROM tenants"] + ["SELECT * FROM customers WHERE id = $1::UUID"] * 3
+    problems = log.problems(endpoint)
+    assert problems[0] == "4 SQL statements, budget is 2"
+    assert problems[1].startswith("possible N+1: executed 3 times: SELECT * FROM customers WHERE id = ?")
+
+    query_budget(None, allow_repeats=True)(endpoint)
+    assert log.problems(endpoint) == []
+
+
+def _app_issuing(statements: list[str], budget: int) -> Starlette:
+    @query_budget(budget)
+    async def endpoint(request):
+        # Stands in for the engine hook, which appends every executed statement
+        querybudget._current.get().statements.extend(statements)
+        return PlainTextResponse("ok")
+
+    return Starlette(routes=[Route("/", endpoint)])
+
+
+def test_middleware_reports_count_and_raises_over_budget():
+    ok = TestClient(QueryBudgetMiddleware(_app_issuing(["SELECT 1", "SELECT 2"], 2), mode="raise"))
+    assert query_count(ok.get("/")) == 2
+
+    over = TestClient(QueryBudgetMiddleware(_app_issuing(["SELECT 1", "SELECT 2", "SELECT 3"], 2), mode="raise"))
+    with pytest.raises(QueryBudgetExceeded, match="3 SQL statements, budget is 2"):
+        over.get("/")
+
+
+def test_middleware_warn_mode_only_logs(caplog):
+    app = QueryBudgetMiddleware(_app_issuing(["SELECT x FROM t WHERE id = $1::UUID"] * 4, 10), mode="warn")
+    response = TestClient(app).get("/")
+    assert response.status_code == 200
+    assert "possible N+1: executed 4 times" in caplog.text
+
+
+# --- declared budgets --------------------------------------------------------
+
+def test_declared_budgets_match_pinned_values():
+    from apps.api.routers import dashboard, invoices, reports, saas_admin, vehicles
+
+    modules = {"dashboard": dashboard, "invoices": invoices, "reports": reports,
+               "saas_admin": saas_admin, "vehicles": vehicles}
+    for name, budget in BUDGETS.items():
+        module, endpoint = name.split(".")
+        assert querybudget.budget_of(getattr(modules[module], endpoint)) == budget, name
+
+
+# --- endpoints, against the test database -------------------------------------
+
+def test_create_invoice(client, dealer_headers, seed):
+    payload = {
+        "customer_name": "Customer 1",
+        "mobile": "9876543201",
+        "vehicle_no": "KA01BT0001",
+        "status": "PAID",
+        "items": [
+            {"name": "Oil filter", "qty": 2, "rate": 350.0, "tax_rate": 18.0, "product_id": seed["product_ids"][0]},
+            {"name": "Brake pads", "qty": 1, "rate": 1800.0, "tax_rate": 28.0, "product_id": seed["product_ids"][1]},
+            {"name": "Labour", "qty": 1, "rate": 500.0, "tax_rate": 18.0},
+        ],
+    }
+    counts = []
+    for _ in range(3):  # existing customer/vehicle, and numbers from the reserved block
+        response = client.post("/api/invoices", json=payload, headers=dealer_headers)
+        assert response.status_code == 201, response.text
+        counts.append(query_count(response))
+    # Customer and vehicle upserts, invoice, rollup, items, stock; reserving a
+    # block of invoice numbers costs one more
+    assert max(counts) <= BUDGETS["invoices.create_invoice"]
+    assert counts[1:] == [6, 6]
+
+
+def test_dashboard_stats(client, dealer_headers, seed):
+    from apps.core.cache import dashboard_cache
+
+    client.portal.call(dashboard_cache.invalidate, seed["tenant_id"])
+    response = client.get("/api/dashboard/stats", headers=dealer_headers)
+    assert response.status_code == 200, response.text
+    assert query_count(response) == BUDGETS["dashboard.get_dashboard_stats"]
+
+    cached = client.get("/api/dashboard/stats", headers=dealer_headers)
+    assert query_count(cached) == 0
+
+
+def test_list_vehicles(client, dealer_headers):
+    response = client.get("/api/vehicles", headers=dealer_headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) >= 5
+    assert query_count(response) == BUDGETS["vehicles.list_vehicles"]
+
+
+@pytest.mark.parametrize("path, budget", [
+    ("/api/v1/saas/reports/stats", "saas_admin.get_admin_stats"),
+    ("/api/v1/saas/reports/revenue-trend?months=12", "saas_admin.get_revenue_trend"),
+    ("/api/saas/reports/stats", "reports.get_admin_stats"),
+    ("/api/saas/reports/revenue-trend?months=12", "reports.get_revenue_trend"),
+    ("/api/saas/reports/dealers-expiring?days=120", "reports.get_expiring_dealers"),
+])
+def test_saas_admin_reports(client, saas_headers, path, budget):
+    response = client.get(path, headers=saas_headers)
+    assert response.status_code == 200, response.text
+    assert query_count(response) == BUDGETS[budget]
@@ -0,0 +1,65 @@
+"""
+Read-replica routing decisions. These do not touch a database: the lag probe
+is replaced, and read_engine only needs to be set for routing to be considered.
+"""
+import asyncio
+import inspect
+
+import pytest
+
+from apps.core import db
+from apps.core.db import ReplicaRouter
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(db, "read_engine", object())
+    router = ReplicaRouter(max_lag=2, check_every=60)
+
+    async def no_probe():
+        pass
+
+    monkeypatch.setattr(router, "refresh", no_probe)
+    return router
+
+
+def use_replica(router: ReplicaRouter) -> bool:
+    async def decide():
+        return router.use_replica()
+    return asyncio.run(decide())
+
+
+def test_primary_when_no_replica_is_configured(monkeypatch):
+    monkeypatch.setattr(db, "read_engine", None)
+    router = ReplicaRouter(max_lag=2, check_every=1)
+    assert router.use_replica() is False
+    assert router.stats()["configured"] == 0
+
+
+def test_primary_until_lag_is_known(router):
+    assert use_replica(router) is False
+    assert router.fallbacks == 1
+
+
+def test_replica_while_caught_up(router):
+    router.lag, router._measured_at = 0.5, db.time.monotonic()
+    assert use_replica(router) is True
+
+
+def test_primary_while_lagging(router):
+    router.lag, router._measured_at = 5.0, db.time.monotonic()
+    assert use_replica(router) is False
+
+
+def test_primary_when_measurement_is_stale(router):
+    router.lag, router._measured_at = 0.0, db.time.monotonic() - 3 * router.check_every
+    assert use_replica(router) is False
+
+
+def test_cached_dashboard_reads_the_primary():
+    # Its cache files results under the generation read before the query; a
+    # replica read could predate the write that bumped it
+    from apps.api.routers.dashboard import get_dashboard_stats
+
+    defaults = [p.default for p in inspect.signature(get_dashboard_stats).parameters.values()]
+    assert db.get_session in [getattr(d, "dependency", None) for d in defaults]
@@ -1 +1,75 @@
-# TODO
+"""
+Invoice PDF rendering off the event loop, with a content-addressed disk cache.
+
+Layout work runs in a small process pool (spawned, so children import nothing
+but integrations.pdf), never on the asyncio loop. Each PDF is stored under the
+SHA-256 of its canonical document plus the renderer version, so:
+
+- re-downloads of an unchanged invoice are a stat() and a file send;
+- any edit to the invoice (or a layout change) yields a new hash, so there is
+  nothing to invalidate;
+- concurrent requests for the same document share one render.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+
+from apps.core.config import settings
+from apps.core.logging import logger
+from integrations.pdf import RENDER_VERSION, render_invoice_to_file
+
+
+def content_hash(doc: dict) -> str:
+    """Stable digest of everything that ends up on the page"""
+    canonical = json.dumps(
+        {"v": RENDER_VERSION, "doc": doc},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class InvoicePdfRenderer:
+    def __init__(self, cache_dir: str, workers: int) -> None:
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.pdf")
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def render(self, doc: dict) -> tuple[str, str]:
+        """Return (path, digest) of the PDF for `doc`, rendering it only on a cache miss"""
+        digest = content_hash(doc)
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            return path, digest
+
+        pending = self._inflight.get(digest)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = loop.run_in_executor(self._executor(), render_invoice_to_file, doc, path)
+            self._inflight[digest] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(digest, None))
+            logger.info("Rendering invoice PDF %s", digest[:12])
+        await asyncio.shield(pending)
+        return path, digest
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+pdf_renderer = InvoicePdfRenderer(settings.PDF_CACHE_DIR, settings.PDF_RENDER_WORKERS)
@@ -0,0 +1,212 @@
+"""
+Month-end customer statements.
+
+    python -m workers.statement_worker --tenant <id>                   # last month
+    python -m workers.statement_worker --tenant <id> --month 2026-09
+
+Customers are walked in id order, STATEMENT_BATCH_SIZE at a time. Each batch
+costs three set-based queries (customers, the period's invoices with their tax
+from invoice_items, and outstanding balances); its PDFs are rendered across a
+process pool while the next batch is being fetched. After a batch is written a
+checkpoint with the last customer id is saved next to the output, so a run that
+is interrupted picks up where it stopped when started again.
+
+Customers with no invoices in the period and nothing outstanding get no
+statement. There is no payments ledger yet, so "paid" is the total of the
+period's invoices in status paid, and the outstanding balance is the full
+amount of every draft/partial invoice issued up to the end of the period.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+import argparse
+import asyncio
+import datetime as dt
+import json
+import multiprocessing
+import os
+import tempfile
+import uuid
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from apps.core.config import settings
+from apps.core.db import async_session, engine
+from apps.core.logging import logger
+from apps.services.billing.models import Invoice, InvoiceItem
+from apps.services.billing.service import PENDING_STATUSES
+from apps.services.crm.models import Customer
+from apps.services.dealers.models import Tenant
+from integrations.pdf import render_statement_to_file
+
+STATEMENT_BATCH_SIZE = 500
+CHECKPOINT_FILE = "_checkpoint.json"
+
+
+def month_bounds(month: str) -> tuple[dt.datetime, dt.datetime]:
+    """'2026-09' -> [2026-09-01, 2026-10-01) as naive UTC datetimes"""
+    start = dt.datetime.strptime(month, "%Y-%m")
+    end = (start + dt.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def previous_month(today: dt.date) -> str:
+    return (today.replace(day=1) - dt.timedelta(days=1)).strftime("%Y-%m")
+
+
+def _load_checkpoint(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, CHECKPOINT_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"last_customer_id": None, "statements": 0, "completed": False}
+
+
+def _save_checkpoint(out_dir: str, state: dict) -> None:
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, os.path.join(out_dir, CHECKPOINT_FILE))
+
+
+async def _fetch_batch(
+    session: AsyncSession,
+    tenant_id: uuid.UUID,
+    after_id: uuid.UUID | None,
+    start: dt.datetime,
+    end: dt.datetime
+) -> tuple[list, list, dict]:
+    """Next page of customers plus their period invoices and outstanding balances"""
+    query = select(Customer.id, Customer.name, Customer.phone, Customer.email).where(Customer.tenant_id == tenant_id)
+    if after_id is not None:
+        query = query.where(Customer.id > after_id)
+    customers = (await session.execute(query.order_by(Customer.id).limit(STATEMENT_BATCH_SIZE))).all()
+    if not customers:
+        return [], [], {}
+    ids = [c.id for c in customers]
+
+    invoices = (await session.execute(
+        select(
+            Invoice.customer_id,
+            Invoice.number,
+            Invoice.issued_at,
+            Invoice.status,
+            Invoice.total_amount,
+            func.coalesce(func.sum(InvoiceItem.amount - InvoiceItem.taxable_value), 0)
+        )
+        .outerjoin(InvoiceItem, InvoiceItem.invoice_id == Invoice.id)
+        .where(
+            Invoice.tenant_id == tenant_id,
+            Invoice.customer_id.in_(ids),
+            Invoice.issued_at >= start,
+            Invoice.issued_at < end
+        )
+        .group_by(Invoice.id)
+        .order_by(Invoice.customer_id, Invoice.issued_at, Invoice.id)
+    )).all()
+
+    outstanding = dict((await session.execute(
+        select(Invoice.customer_id, func.sum(Invoice.total_amount))
+        .where(
+            Invoice.tenant_id == tenant_id,
+            Invoice.customer_id.in_(ids),
+            Invoice.status.in_(PENDING_STATUSES),
+            Invoice.issued_at < end
+        )
+        .group_by(Invoice.customer_id)
+    )).all())
+    return customers, invoices, outstanding
+
+
+def _statement_docs(dealer: str, customers, invoices, outstanding: dict, start: dt.datetime, end: dt.datetime):
+    """Yield (customer_id, doc) for every customer in the batch that has activity"""
+    by_customer: dict = {}
+    for customer_id, number, issued_at, status, amount, tax in invoices:
+        by_customer.setdefault(customer_id, []).append((number, issued_at, status, amount, tax))
+
+    for customer in customers:
+        rows = by_customer.get(customer.id, [])
+        balance = outstanding.get(customer.id) or Decimal("0")
+        if not rows and not balance:
+            continue
+        yield customer.id, {
+            "dealer": dealer,
+            "customer": customer.name,
+            "customer_phone": customer.phone,
+            "customer_email": customer.email,
+            "period_start": start.date().isoformat(),
+            "period_end": (end - dt.timedelta(days=1)).date().isoformat(),
+            "invoiced": str(sum((r[3] for r in rows), Decimal("0"))),
+            "paid": str(sum((r[3] for r in rows if r[2] == "paid"), Decimal("0"))),
+            "outstanding": str(balance),
+            "invoices": [{
+                "date": issued_at.date().isoformat() if issued_at else "",
+                "number": number,
+                "status": "PAID" if status == "paid" else "PARTIAL" if status == "partial" else "DUE",
+                "tax": str(tax),
+                "amount": str(amount),
+            } for number, issued_at, status, amount, tax in rows],
+        }
+
+
+async def generate_statements(tenant_id: uuid.UUID, month: str, out_root: str, workers: int) -> dict:
+    start, end = month_bounds(month)
+    out_dir = os.path.join(out_root, str(tenant_id), month)
+    os.makedirs(out_dir, exist_ok=True)
+    state = _load_checkpoint(out_dir)
+    if state["completed"]:
+        logger.info("Statements for %s %s already complete", tenant_id, month)
+        return state
+
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        async with async_session() as session:
+            dealer = await session.scalar(select(Tenant.name).where(Tenant.id == tenant_id))
+            if dealer is None:
+                raise SystemExit(f"Unknown tenant {tenant_id}")
+
+            after = uuid.UUID(state["last_customer_id"]) if state["last_customer_id"] else None
+            batch = await _fetch_batch(session, tenant_id, after, start, end)
+            while batch[0]:
+                customers, invoices, outstanding = batch
+                renders = [
+                    loop.run_in_executor(
+                        pool, render_statement_to_file, doc, os.path.join(out_dir, f"{customer_id}.pdf")
+                    )
+                    for customer_id, doc in _statement_docs(dealer, customers, invoices, outstanding, start, end)
+                ]
+                # Fetch the next page while this one renders
+                next_batch = await _fetch_batch(session, tenant_id, customers[-1].id, start, end)
+                await asyncio.gather(*renders)
+
+                state["last_customer_id"] = str(customers[-1].id)
+                state["statements"] += len(renders)
+                _save_checkpoint(out_dir, state)
+                logger.info("Statements %s %s: %d written, up to customer %s",
+                            tenant_id, month, state["statements"], state["last_customer_id"])
+                batch = next_batch
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    state["completed"] = True
+    _save_checkpoint(out_dir, state)
+    return state
+
+
+async def main(tenant_id: uuid.UUID, month: str, out_root: str, workers: int):
+    try:
+        state = await generate_statements(tenant_id, month, out_root, workers)
+    finally:
+        await engine.dispose()
+    print(f"Statements for tenant {tenant_id}, {month}: {state['statements']} written to "
+          f"{os.path.join(out_root, str(tenant_id), month)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate month-end customer statements for a tenant")
+    parser.add_argument("--tenant", type=uuid.UUID, required=True)
+    parser.add_argument("--month", default=previous_month(dt.date.today()), help="YYYY-MM, defaults to last month")
+    parser.add_argument("--out", default=settings.STATEMENT_DIR, help="Output root directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Render processes")
+    args = parser.parse_args()
+    asyncio.run(main(args.tenant, args.month, args.out, args.workers))